@@ -0,0 +1,276 @@
+"""Iteration orders of the matrix multiply kernels and a cache model for them.
+
+A `LoopNest` describes `C[i][j] += A[i][k] * B[k][j]` with any loop order and
+any set of blocked (tiled) loops, e.g., the kernels in `workloads/matmul`.
+Iterating over it lazily yields the (i, j, k) steps, so it can drive the
+animations in `mm_visualization.py`:
+
+    steps = LoopNest(3, order="ikj", tile_sizes={"j": 2, "k": 2})
+    create_animation(A, B, C, steps, vis_params, "mm_blocked.gif")
+
+`miss_ratio` estimates how the same iteration order behaves in a cache of a
+given size from the LRU stack distances of its memory accesses. Running this
+file compares the block sizes of a blocking scheme, for example:
+
+    python loop_nest.py --size 128 --order ikj --blocked jk \\
+        --block-sizes 4 8 16 32 --cache-sizes 32KiB 256KiB
+"""
+
+import argparse
+import itertools
+
+import numpy as np
+
+DIMS = "ijk"
+
+
+class LoopNest:
+    """A matrix multiply loop nest over `size` x `size` matrices.
+
+    :param order: the order of the loops from outermost to innermost, e.g.,
+    "ijk" or "ikj".
+    :param tile_sizes: maps each blocked loop to its block size. Every
+    blocked loop is split into a loop over the blocks and a loop inside a
+    block.
+    :param tile_order: the order of the loops over the blocks. They are
+    always outside of the loops in `order`. Defaults to the order in which
+    the blocked loops appear in `order`.
+    """
+
+    def __init__(self, size, order="ijk", tile_sizes=None, tile_order=None):
+        self.size = size
+        self.order = order
+        self.tile_sizes = dict(tile_sizes or {})
+        if tile_order is None:
+            tile_order = "".join(
+                dim for dim in order if dim in self.tile_sizes
+            )
+        self.tile_order = tile_order
+        if sorted(order) != sorted(DIMS):
+            raise ValueError(f"{order} is not an order of the loops {DIMS}")
+        if sorted(tile_order) != sorted(self.tile_sizes):
+            raise ValueError(
+                f"{tile_order} is not an order of the blocked loops "
+                f"{''.join(sorted(self.tile_sizes))}"
+            )
+
+        # Each level is (dimension, range, stride). The value of a
+        # dimension is the sum of the index times the stride of its levels.
+        self.levels = []
+        for dim in tile_order:
+            tile = self.tile_sizes[dim]
+            self.levels.append((dim, -(-size // tile), tile))
+        for dim in order:
+            self.levels.append((dim, self.tile_sizes.get(dim, size), 1))
+
+    def __iter__(self):
+        for indices in itertools.product(
+            *(range(length) for _, length, _ in self.levels)
+        ):
+            step = {dim: 0 for dim in DIMS}
+            for (dim, _, stride), index in zip(self.levels, indices):
+                step[dim] += index * stride
+            # Skip the overhang of blocks that do not divide the size.
+            if max(step.values()) < self.size:
+                yield step["i"], step["j"], step["k"]
+
+    def __len__(self):
+        return self.size**3
+
+    def to_arrays(self):
+        """Return the i, j, and k of every step as NumPy arrays."""
+        grids = np.meshgrid(
+            *(np.arange(length) for _, length, _ in self.levels),
+            indexing="ij",
+            sparse=True,
+        )
+        values = {dim: 0 for dim in DIMS}
+        for (dim, _, stride), grid in zip(self.levels, grids):
+            values[dim] = values[dim] + grid * stride
+        shape = tuple(length for _, length, _ in self.levels)
+        i, j, k = (
+            np.broadcast_to(values[dim], shape).ravel() for dim in DIMS
+        )
+        inside = (i < self.size) & (j < self.size) & (k < self.size)
+        return i[inside], j[inside], k[inside]
+
+    def __str__(self):
+        if not self.tile_sizes:
+            return self.order
+        tiles = ", ".join(
+            f"{dim}={self.tile_sizes[dim]}" for dim in self.tile_order
+        )
+        return f"{self.order} blocked over {tiles}"
+
+
+def get_line_addresses(loop_nest, line_size=64, element_size=8):
+    """Return the cache line of every memory access of `loop_nest`.
+
+    Every step loads A[i][k], B[k][j], and C[i][j] and then stores C[i][j].
+    Like in `mm.cpp`, the matrices are separate row-major arrays. They are
+    placed one after the other, each starting on a new cache line.
+    """
+    i, j, k = loop_nest.to_arrays()
+    size = loop_nest.size
+    lines_per_matrix = -(-size * size * element_size // line_size)
+    a = (i * size + k) * element_size // line_size
+    b = (k * size + j) * element_size // line_size + lines_per_matrix
+    c = (i * size + j) * element_size // line_size + 2 * lines_per_matrix
+    return np.stack([a, b, c, c], axis=1).ravel()
+
+
+def count_prefix_below(values, ends, limits):
+    """For every query q, count the s < ends[q] with values[s] < limits[q].
+
+    The prefix [0, ends[q]) is split into aligned blocks of power of two
+    sizes, one per set bit of ends[q]. The values of every block are sorted
+    ahead of time, so the count in each block is a binary search. All
+    queries are answered together, one block size at a time.
+    """
+    padded_size = 1 << max(len(values) - 1, 0).bit_length()
+    # Larger than every limit, so padding is never counted.
+    top = padded_size + 1
+    padded = np.full(padded_size, top - 1, dtype=np.int64)
+    padded[: len(values)] = values
+
+    counts = np.zeros(len(ends), dtype=np.int64)
+    level = 0
+    while (1 << level) < padded_size:
+        block_size = 1 << level
+        blocks = np.sort(padded.reshape(-1, block_size), axis=1)
+        # Offset every block so that the whole array is sorted.
+        blocks += (np.arange(len(blocks), dtype=np.int64) * top)[:, None]
+        queries = np.flatnonzero((ends >> level) & 1)
+        block = (ends[queries] >> level) - 1
+        counts[queries] += (
+            np.searchsorted(blocks.ravel(), block * top + limits[queries])
+            - block * block_size
+        )
+        level += 1
+    return counts
+
+
+def get_stack_distances(lines):
+    """Return the LRU stack distance of every access to `lines`.
+
+    The stack distance of an access is the number of distinct other lines
+    accessed since the previous access to the same line, or -1 if the line
+    was not accessed before. In a fully associative LRU cache with room for
+    `n` lines, an access hits exactly when its distance is in [0, n).
+    """
+    lines = np.asarray(lines)
+    # Accessing the line of the previous access again is at distance 0 and
+    # does not change the distance of any other access, so those accesses
+    # are left out of the search.
+    repeats = np.zeros(len(lines), dtype=bool)
+    repeats[1:] = lines[1:] == lines[:-1]
+    lines = lines[~repeats]
+
+    num_accesses = len(lines)
+    order = np.argsort(lines, kind="stable")
+    sorted_lines = lines[order]
+    same = sorted_lines[1:] == sorted_lines[:-1]
+    prev = np.full(num_accesses, -1, dtype=np.int64)
+    prev[order[1:][same]] = order[:-1][same]
+    next_ = np.full(num_accesses, num_accesses, dtype=np.int64)
+    next_[order[:-1][same]] = order[1:][same]
+
+    # An access s between the previous access p and this access t is the
+    # last access to its line in (p, t) unless the line is accessed again
+    # before t, i.e., next_[s] < t. Every s with next_[s] < t has s < t, so
+    # the ones in (p, t) are all of them minus the ones up to p.
+    reuses = np.flatnonzero(prev >= 0)
+    starts = prev[reuses]
+    repeated = np.searchsorted(np.sort(next_), reuses) - count_prefix_below(
+        next_, starts + 1, reuses
+    )
+    distances = np.full(num_accesses, -1, dtype=np.int64)
+    distances[reuses] = reuses - starts - 1 - repeated
+
+    all_distances = np.zeros(len(repeats), dtype=np.int64)
+    all_distances[~repeats] = distances
+    return all_distances
+
+
+def miss_ratio(distances, cache_size, line_size=64):
+    """Estimate the miss ratio of a fully associative LRU cache of
+    `cache_size` bytes from the stack distances of the accesses.
+
+    Conflict misses are not modeled, so this is a lower bound for a set
+    associative cache of the same size.
+    """
+    capacity = cache_size // line_size
+    misses = np.count_nonzero((distances < 0) | (distances >= capacity))
+    return misses / len(distances)
+
+
+def parse_size(size):
+    """Parse a size such as "32KiB" or "1MiB" into bytes."""
+    units = {"B": 1, "KiB": 1 << 10, "MiB": 1 << 20, "GiB": 1 << 30}
+    for unit, factor in sorted(units.items(), key=lambda item: -len(item[0])):
+        if size.endswith(unit):
+            return int(size[: -len(unit)]) * factor
+    return int(size)
+
+
+def get_inputs():
+    argparser = argparse.ArgumentParser(
+        description="Estimate the cache miss ratio of matrix multiply loop "
+        "orders and block sizes."
+    )
+    argparser.add_argument("--size", type=int, default=128)
+    argparser.add_argument(
+        "--order",
+        type=str,
+        default="ijk",
+        help="Loop order from outermost to innermost.",
+    )
+    argparser.add_argument(
+        "--blocked",
+        type=str,
+        default="",
+        help="The blocked loops, e.g., `jk` for block_jk_multiply.",
+    )
+    argparser.add_argument(
+        "--block-sizes",
+        type=int,
+        nargs="+",
+        default=[8],
+        help="Block sizes to compare. Ignored without --blocked.",
+    )
+    argparser.add_argument(
+        "--cache-sizes",
+        type=str,
+        nargs="+",
+        default=["32KiB"],
+        help="Cache sizes to estimate the miss ratio for.",
+    )
+    argparser.add_argument("--line-size", type=int, default=64)
+    args = argparser.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    args = get_inputs()
+    cache_sizes = [parse_size(size) for size in args.cache_sizes]
+    block_sizes = args.block_sizes if args.blocked else [None]
+    print(
+        f"{'loop nest':<32}"
+        + "".join(f"{size:>12}" for size in args.cache_sizes)
+    )
+    for block_size in block_sizes:
+        loop_nest = LoopNest(
+            args.size,
+            args.order,
+            {dim: block_size for dim in args.blocked},
+        )
+        distances = get_stack_distances(
+            get_line_addresses(loop_nest, args.line_size)
+        )
+        print(
+            f"{str(loop_nest):<32}"
+            + "".join(
+                f"{miss_ratio(distances, size, args.line_size):>12.4f}"
+                for size in cache_sizes
+            )
+        )
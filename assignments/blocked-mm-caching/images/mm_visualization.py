@@ -1,7 +1,12 @@
 import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
 import imageio
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.transforms import Bbox
 
 
 class VizParams:
@@ -125,146 +130,373 @@ def make_axes(fig, vis_params):
     return VisAxes(a_ax, b_ax, c_ax, t_ax)
 
 
-def print_highlight(
-    vis_params, vis_axes, a_coord=None, b_coord=None, c_coord=None
-):
-    a_bg = np.zeros((vis_params.a_h, vis_params.a_w))
-    if not a_coord is None:
-        a_bg[a_coord[0], a_coord[1]] = 1
-    vis_axes.a_ax.imshow(a_bg)
-
-    b_bg = np.zeros((vis_params.b_h, vis_params.b_w))
-    if not b_coord is None:
-        b_bg[b_coord[0], b_coord[1]] = 1
-    vis_axes.b_ax.imshow(b_bg)
-
-    c_bg = np.zeros((vis_params.c_h, vis_params.c_w))
-    if not c_coord is None:
-        c_bg[c_coord[0], c_coord[1]] = 1
-    vis_axes.c_ax.imshow(c_bg)
-
-
-def print_matrices(A, B, C, vis_params, vis_axes):
-    for row in range(vis_params.a_h):
-        for col in range(vis_params.a_w):
-            vis_axes.a_ax.annotate(
-                A[row][col],
-                xy=(col, row),
-                fontsize=12,
-                color="red",
-                xycoords="data",
-            )
-
-    for row in range(vis_params.b_h):
-        for col in range(vis_params.b_w):
-            vis_axes.b_ax.annotate(
-                B[row][col],
-                xy=(col, row),
-                fontsize=12,
-                color="red",
-                xycoords="data",
-            )
-
-    for row in range(vis_params.c_h):
-        for col in range(vis_params.c_w):
-            vis_axes.c_ax.annotate(
-                C[row][col],
-                xy=(col, row),
-                fontsize=12,
-                color="red",
-                xycoords="data",
-            )
+# One animation frame. Coordinates are None when that matrix has no
+# highlighted cell. `madd` is the pair of lines shown for the multiply-add,
+# `wb` is the line shown for the write back, and `c_cell` is the (row, col,
+# value) of the cell of C that the frame shows.
+Frame = namedtuple(
+    "Frame", ["a_coord", "b_coord", "c_coord", "madd", "wb", "c_cell"]
+)
 
 
-def print_madd_operation(A, B, C, i, j, k, vis_params, vis_axes):
-    vis_axes.t_ax.annotate(
+def get_step_frames(A, B, C, i, j, k):
+    """Return the five frames for the step C[i][j] += A[i][k] * B[k][j] and
+    apply the step to C.
+    """
+    madd = (
         f"C[{i}][{j}] = C[{i}][{j}] + A[{i}][{k}] * B[{k}][{j}]",
-        xy=(0, 0.6),
-        fontsize=12,
-        color="blue",
-        fontweight="bold",
-        xycoords="data",
-    )
-    vis_axes.t_ax.annotate(
         f"C[{i}][{j}] = {C[i, j]} + {A[i, k]} * {B[k, j]}",
-        xy=(0, 0.4),
-        fontsize=12,
-        color="blue",
-        fontweight="bold",
-        xycoords="data",
     )
+    wb = f"C[{i}][{j}] = {C[i, j] + A[i, k] * B[k, j]}"
+    before = (i, j, C[i][j])
+    frames = [
+        Frame(None, None, None, None, None, before),
+        Frame((i, k), (k, j), (i, j), None, None, before),
+        Frame((i, k), (k, j), (i, j), madd, None, before),
+        Frame(None, None, (i, j), None, wb, before),
+    ]
+    C[i][j] += A[i][k] * B[k][j]
+    frames.append(Frame(None, None, (i, j), None, None, (i, j, C[i][j])))
+    return frames
 
 
-def print_wb_result(A, B, C, i, j, k, vis_params, vis_axes):
-    vis_axes.t_ax.annotate(
-        f"C[{i}][{j}] = {C[i, j] + A[i, k] * B[k, j]}",
-        xy=(0, 0.5),
-        fontsize=12,
-        color="blue",
-        fontweight="bold",
-        xycoords="data",
-    )
+class FrameRenderer:
+    """Draws animation frames on a single figure.
 
+    The figure, the axes, the highlight images, and the annotations of every
+    cell are created once. Drawing a frame only updates the highlight image
+    data and the text of the artists that change, and saving a frame only
+    redraws the parts of the figure that changed since the previous one.
+    """
 
-def multiply_and_create_frames(A, B, C, i, j, k, frame_number, vis_params):
-    fig = plt.figure()
-    fig.set_size_inches(vis_params.fig_width, vis_params.fig_height)
-    vis_axes = make_axes(fig, vis_params)
-    print_highlight(vis_params, vis_axes)
-    print_matrices(A, B, C, vis_params, vis_axes)
-    fig.savefig(f"{vis_params.outdir}/{frame_number}.png")
-    plt.close()
-    frame_number += 1
-
-    fig = plt.figure()
-    fig.set_size_inches(vis_params.fig_width, vis_params.fig_height)
-    vis_axes = make_axes(fig, vis_params)
-    print_highlight(
-        vis_params, vis_axes, a_coord=(i, k), b_coord=(k, j), c_coord=(i, j)
-    )
-    print_matrices(A, B, C, vis_params, vis_axes)
-    fig.savefig(f"{vis_params.outdir}/{frame_number}.png")
-    plt.close()
-    frame_number += 1
-
-    fig = plt.figure()
-    fig.set_size_inches(vis_params.fig_width, vis_params.fig_height)
-    vis_axes = make_axes(fig, vis_params)
-    print_highlight(
-        vis_params, vis_axes, a_coord=(i, k), b_coord=(k, j), c_coord=(i, j)
-    )
-    print_matrices(A, B, C, vis_params, vis_axes)
-    print_madd_operation(A, B, C, i, j, k, vis_params, vis_axes)
-    fig.savefig(f"{vis_params.outdir}/{frame_number}.png")
-    plt.close()
-    frame_number += 1
-
-    fig = plt.figure()
-    fig.set_size_inches(vis_params.fig_width, vis_params.fig_height)
-    vis_axes = make_axes(fig, vis_params)
-    print_highlight(vis_params, vis_axes, c_coord=(i, j))
-    print_matrices(A, B, C, vis_params, vis_axes)
-    print_wb_result(A, B, C, i, j, k, vis_params, vis_axes)
-    fig.savefig(f"{vis_params.outdir}/{frame_number}.png")
-    plt.close()
-    frame_number += 1
+    def __init__(self, A, B, C, vis_params):
+        self.vis_params = vis_params
+        self.fig = plt.figure()
+        self.fig.set_size_inches(vis_params.fig_width, vis_params.fig_height)
+        FigureCanvasAgg(self.fig)
+        self.vis_axes = make_axes(self.fig, vis_params)
 
-    C[i][j] += A[i][k] * B[k][j]
+        self.a_image = self._make_image(
+            self.vis_axes.a_ax, vis_params.a_h, vis_params.a_w
+        )
+        self.b_image = self._make_image(
+            self.vis_axes.b_ax, vis_params.b_h, vis_params.b_w
+        )
+        self.c_image = self._make_image(
+            self.vis_axes.c_ax, vis_params.c_h, vis_params.c_w
+        )
+
+        self._annotate(self.vis_axes.a_ax, A)
+        self._annotate(self.vis_axes.b_ax, B)
+        self.c_texts = self._annotate(self.vis_axes.c_ax, C)
+
+        self.madd_texts = [
+            self._make_operation_text(0.6),
+            self._make_operation_text(0.4),
+        ]
+        self.wb_text = self._make_operation_text(0.5)
+
+        self._make_regions()
+        self.frame = Frame(None, None, None, None, None, None)
+        self.dirty = set()
+
+    def _make_regions(self):
+        """Split the figure into the regions that are redrawn independently.
+
+        The regions are separated in the middle of the padding between the
+        matrices so that annotations spilling over the edge of their axes
+        stay in their region. The operation text can run over B, so the two
+        share the top region.
+        """
+        params = self.vis_params
+        canvas = self.fig.canvas
+        width, height = canvas.get_width_height()
+        split_x = round(
+            width * (params.a_w + params.padding / 2) / params.total_cols
+        )
+        split_y = round(
+            height * (params.c_h + params.padding / 2) / params.total_rows
+        )
+        bboxes = {
+            "a": Bbox([[0, 0], [split_x, split_y]]),
+            "c": Bbox([[split_x, 0], [width, split_y]]),
+            "top": Bbox([[0, split_y], [width, height]]),
+        }
+        self.region_axes = {
+            "a": [self.vis_axes.a_ax],
+            "c": [self.vis_axes.c_ax],
+            "top": [self.vis_axes.b_ax, self.vis_axes.t_ax],
+        }
+
+        # Keep an empty copy of every region to clear it before redrawing.
+        for ax in self.fig.axes:
+            ax.set_visible(False)
+        canvas.draw()
+        self.backgrounds = {
+            region: canvas.copy_from_bbox(bbox)
+            for region, bbox in bboxes.items()
+        }
+        for ax in self.fig.axes:
+            ax.set_visible(True)
+        canvas.draw()
+
+    def _make_image(self, ax, height, width):
+        # Fix the color limits so that updating the data does not rescale.
+        return ax.imshow(np.zeros((height, width)), vmin=0, vmax=1)
+
+    def _annotate(self, ax, matrix):
+        height, width = np.shape(matrix)
+        return [
+            [
+                ax.annotate(
+                    matrix[row][col],
+                    xy=(col, row),
+                    fontsize=12,
+                    color="red",
+                    xycoords="data",
+                    # Every cell is inside the axes, so skip the check.
+                    annotation_clip=False,
+                )
+                for col in range(width)
+            ]
+            for row in range(height)
+        ]
+
+    def _make_operation_text(self, y):
+        return self.vis_axes.t_ax.annotate(
+            "",
+            xy=(0, y),
+            fontsize=12,
+            color="blue",
+            fontweight="bold",
+            xycoords="data",
+            annotation_clip=False,
+        )
+
+    def _set_highlight(self, image, coord):
+        data = np.zeros(image.get_array().shape)
+        if coord is not None:
+            data[coord[0], coord[1]] = 1
+        image.set_data(data)
+
+    def _set_c_text(self, row, col, value):
+        text = self.c_texts[row][col]
+        if text.get_text() != str(value):
+            text.set_text(value)
+            self.dirty.add("c")
+
+    def set_c(self, C):
+        for row, texts in enumerate(self.c_texts):
+            for col in range(len(texts)):
+                self._set_c_text(row, col, C[row][col])
+
+    def draw(self, frame):
+        if frame.a_coord != self.frame.a_coord:
+            self._set_highlight(self.a_image, frame.a_coord)
+            self.dirty.add("a")
+        if frame.b_coord != self.frame.b_coord:
+            self._set_highlight(self.b_image, frame.b_coord)
+            self.dirty.add("top")
+        if frame.c_coord != self.frame.c_coord:
+            self._set_highlight(self.c_image, frame.c_coord)
+            self.dirty.add("c")
+
+        self._set_c_text(*frame.c_cell)
+
+        if frame.madd != self.frame.madd or frame.wb != self.frame.wb:
+            for text, line in zip(self.madd_texts, frame.madd or ("", "")):
+                text.set_text(line)
+            self.wb_text.set_text(frame.wb or "")
+            self.dirty.add("top")
+        self.frame = frame
+
+    def render(self):
+        """Redraw what changed and return the canvas as an RGBA array.
+
+        The array is a view of the canvas, so it is only valid until the
+        next frame is rendered.
+        """
+        canvas = self.fig.canvas
+        renderer = canvas.get_renderer()
+        for region in sorted(self.dirty):
+            canvas.restore_region(self.backgrounds[region])
+            for ax in self.region_axes[region]:
+                ax.draw(renderer)
+        self.dirty.clear()
+        return np.asarray(canvas.buffer_rgba())
+
+    def save(self, frame_number):
+        imageio.imwrite(
+            f"{self.vis_params.outdir}/{frame_number}.png", self.render()
+        )
 
-    fig = plt.figure()
-    fig.set_size_inches(vis_params.fig_width, vis_params.fig_height)
-    vis_axes = make_axes(fig, vis_params)
-    print_highlight(vis_params, vis_axes, c_coord=(i, j))
-    print_matrices(A, B, C, vis_params, vis_axes)
-    fig.savefig(f"{vis_params.outdir}/{frame_number}.png")
-    plt.close()
-    frame_number += 1
+    def close(self):
+        plt.close(self.fig)
 
+
+def multiply_and_create_frames(
+    A, B, C, i, j, k, frame_number, vis_params, renderer=None
+):
+    """Write the frames for one multiply-add step starting at frame_number.
+
+    Pass a FrameRenderer built for the same matrices to reuse its figure
+    across steps.
+    """
+    own_renderer = renderer is None
+    if own_renderer:
+        renderer = FrameRenderer(A, B, C, vis_params)
+    for frame in get_step_frames(A, B, C, i, j, k):
+        renderer.draw(frame)
+        renderer.save(frame_number)
+        frame_number += 1
+    if own_renderer:
+        renderer.close()
     return frame_number
 
 
+# Each worker process draws on its own renderer.
+_worker_renderer = None
+
+
+def _init_worker(A, B, C, vis_params):
+    global _worker_renderer
+    _worker_renderer = FrameRenderer(A, B, C, vis_params)
+
+
+def _render_frames(first_frame_number, C, frames):
+    _worker_renderer.set_c(C)
+    for frame_number, frame in enumerate(frames, first_frame_number):
+        _worker_renderer.draw(frame)
+        _worker_renderer.save(frame_number)
+
+
+def create_frames(A, B, C, steps, vis_params, processes=None, batch_size=20):
+    """Write the frames for multiplying A and B into C with the multiply-add
+    steps `steps`, an iterable of (i, j, k).
+
+    The frames are split into batches of consecutive frame numbers that are
+    rendered across a pool of `processes` workers (all cores by default).
+    C is updated in place.
+
+    :return: the number of frames written.
+    """
+    initial_C = np.copy(C)
+    frames = []
+    for i, j, k in steps:
+        frames.extend(get_step_frames(A, B, C, i, j, k))
+
+    # Every batch starts from the state of C after the frames before it.
+    batches = []
+    batch_C = np.copy(initial_C)
+    for start in range(0, len(frames), batch_size):
+        batch = frames[start : start + batch_size]
+        batches.append((start, np.copy(batch_C), batch))
+        for frame in batch:
+            row, col, value = frame.c_cell
+            batch_C[row][col] = value
+
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(A, B, initial_C, vis_params),
+    ) as executor:
+        futures = [executor.submit(_render_frames, *batch) for batch in batches]
+        for future in futures:
+            future.result()
+
+    return len(frames)
+
+
+class FfmpegWriter:
+    """Appending writer that pipes RGBA frames to ffmpeg.
+
+    ffmpeg is started when the first frame arrives, since that is when the
+    frame size is known. This needs the imageio-ffmpeg package.
+    """
+
+    def __init__(self, path, fps, codec, output_params=None):
+        self.path = path
+        self.fps = fps
+        self.codec = codec
+        self.output_params = output_params or []
+        self.frames = None
+
+    def append_data(self, frame):
+        if self.frames is None:
+            import imageio_ffmpeg
+
+            height, width = frame.shape[:2]
+            self.frames = imageio_ffmpeg.write_frames(
+                self.path,
+                (width, height),
+                pix_fmt_in="rgba",
+                fps=self.fps,
+                codec=self.codec,
+                # yuv420p needs even dimensions.
+                macro_block_size=2,
+                output_params=self.output_params,
+            )
+            self.frames.send(None)
+        self.frames.send(np.ascontiguousarray(frame))
+
+    def close(self):
+        if self.frames is not None:
+            self.frames.close()
+
+
+def get_animation_writer(path, duration=0.5):
+    """Return an appending writer for an animation at `path` that shows each
+    frame for `duration` seconds.
+
+    The format follows the extension of `path`: `.gif`, `.mp4`, or `.webp`.
+    Every writer encodes frames as they are appended, so only one frame is
+    held in memory. MP4 and WebP are much smaller than GIF for long loop
+    orders such as the blocked ones.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".gif":
+        # Unlike the default GIF plugin, which buffers every frame until the
+        # file is closed, the legacy Pillow GIF writer writes each frame as
+        # it is appended.
+        return imageio.get_writer(
+            path, format="GIF-PIL", mode="I", duration=duration, loop=0
+        )
+    if extension == ".mp4":
+        return FfmpegWriter(path, 1 / duration, "libx264")
+    if extension == ".webp":
+        return FfmpegWriter(
+            path, 1 / duration, "libwebp_anim", output_params=["-loop", "0"]
+        )
+    raise ValueError(f"Unknown animation format: {extension}")
+
+
+def create_animation(A, B, C, steps, vis_params, path, duration=0.5):
+    """Render the frames for multiplying A and B into C with the multiply-add
+    steps `steps`, an iterable of (i, j, k), straight into the animation at
+    `path`.
+
+    Each canvas is handed to the writer as soon as it is drawn, so no frame
+    files are written and only one frame is held in memory. C is updated in
+    place.
+
+    :return: the number of frames written.
+    """
+    renderer = FrameRenderer(A, B, C, vis_params)
+    writer = get_animation_writer(path, duration)
+    frame_count = 0
+    try:
+        for i, j, k in steps:
+            for frame in get_step_frames(A, B, C, i, j, k):
+                renderer.draw(frame)
+                writer.append_data(renderer.render())
+                frame_count += 1
+    finally:
+        writer.close()
+        renderer.close()
+    return frame_count
+
+
 def create_gif_from_frames(frames_dir, frame_number):
-    images = []
-    for i in range(frame_number):
-        images.append(imageio.imread(f"{frames_dir}/{i}.png"))
-    imageio.mimsave(f"{frames_dir}/animation.gif", images, duration=0.5)
+    with get_animation_writer(f"{frames_dir}/animation.gif") as writer:
+        for i in range(frame_number):
+            writer.append_data(imageio.imread(f"{frames_dir}/{i}.png"))
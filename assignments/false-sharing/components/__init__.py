@@ -5,39 +5,77 @@ from gem5.components.boards.simple_board import SimpleBoard
 from gem5.components.memory.dram_interfaces.ddr4 import DDR4_2400_8x8
 from gem5.components.memory.memory import ChanneledMemory
 from gem5.components.processors.cpu_types import CPUTypes
-from gem5.components.processors.simple_processor import SimpleProcessor
+from gem5.components.processors.base_cpu_processor import BaseCPUProcessor
+from gem5.components.processors.simple_core import SimpleCore
 from gem5.isas import ISA
 
+from typing import Optional
+
 from .cache_hierarchies import MESITwoLevelCacheHierarchy
+from .sharing_profile import create_sharing_profile_simulator
+
+import sys
+from pathlib import Path
+
+# util/roi.py is at the root of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "util"))
+from roi import create_roi_simulator
 
 X86Board = SimpleBoard
 
 class DDR4(ChanneledMemory):
     """
-    DDR4 models a 1 GiB single channel DDR4 DRAM memory with a data
-    bus clocked at 2400MHz.
+    DDR4 models a 1 GiB DDR4 DRAM memory with a data bus clocked at 2400MHz.
+    With more than one channel, the addresses are interleaved across the
+    channels every 128 bytes, and the cache hierarchy has one directory per
+    channel.
     """
 
-    def __init__(self):
-        super().__init__(DDR4_2400_8x8, 1, 128, size="1GiB")
+    def __init__(self, num_channels: int = 1):
+        """
+        :param num_channels: Number of memory channels.
+        """
+        super().__init__(DDR4_2400_8x8, num_channels, 128, size="1GiB")
 
 
-class O3CPU(SimpleProcessor):
-    def __init__(self, num_cores: int):
+class O3CPU(BaseCPUProcessor):
+    def __init__(
+        self, num_cores: int, extra_core: Optional[CPUTypes] = CPUTypes.O3
+    ):
         """
         O3CPU is an out of order processor with a configurable number of
         cores. Note that because of limitations of SE mode and OpenMP we need
         to have one more core than specified. E.g., for 4 threads you need 5
         cores. You should ignore the "first" core's stats.
 
-        :param num_cores: Number of cores in the processor.
+        The extra core doesn't have to be an out of order core. With
+        `extra_core=CPUTypes.TIMING` it is a much cheaper simple core, and
+        with `extra_core=None` there is no extra core at all, which only works
+        for workloads that don't need it (e.g., ones that don't use OpenMP).
+
+        :param num_cores: Number of out of order cores in the processor.
+        :param extra_core: The CPU type of the extra core, or None for no
+        extra core.
         """
-        super().__init__(
-            cpu_type=CPUTypes.O3, num_cores=num_cores + 1, isa=ISA.X86
-        )
+        self._num_cores = num_cores
+        cores = []
+        if extra_core is not None:
+            cores.append(
+                SimpleCore(cpu_type=extra_core, core_id=0, isa=ISA.X86)
+            )
+        cores += [
+            SimpleCore(
+                cpu_type=CPUTypes.O3, core_id=len(cores) + i, isa=ISA.X86
+            )
+            for i in range(num_cores)
+        ]
+        super().__init__(cores=cores)
 
     def get_actual_num_cores(self):
-        return len(self.cores) - 1
+        return self._num_cores
+
+    def has_extra_core(self):
+        return len(self.cores) > self._num_cores
 
 
 __all__ = [
@@ -45,4 +83,6 @@ __all__ = [
     "DDR4",
     "O3CPU",
     "MESITwoLevelCacheHierarchy",
+    "create_sharing_profile_simulator",
+    "create_roi_simulator",
 ]
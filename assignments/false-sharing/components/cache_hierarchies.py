@@ -34,7 +34,9 @@ from gem5.isas import ISA
 from gem5.components.boards.abstract_board import AbstractBoard
 from gem5.utils.requires import requires
 
-from .network import L1L2ClusterTree
+from typing import Optional
+
+from .network import NETWORKS, TOPOLOGIES
 from gem5.components.cachehierarchies.ruby.\
     caches.mesi_two_level.l1_cache import L1Cache
 from gem5.components.cachehierarchies.ruby.\
@@ -50,6 +52,8 @@ from m5.objects import (
     DMASequencer,
     RubyPortProxy,
 )
+from m5.util.convert import toMemorySize
+
 
 class MESITwoLevelCacheHierarchy(
     AbstractRubyCacheHierarchy, AbstractTwoLevelCacheHierarchy
@@ -57,12 +61,75 @@ class MESITwoLevelCacheHierarchy(
     """A two level private L1 shared L2 MESI hierarchy.
 
     In addition to the normal two level parameters, you can also change the
-    number of L2 banks in this protocol.
-
-    The on-chip network is a crossbar with a configurable latency.
+    number of L2 banks in this protocol, independently of the number of
+    cores, and the total capacity of the L2, which is split evenly across the
+    banks. The L1s pick the bank of a line with the address bits just above
+    the line offset (MESI_Two_Level has no parameter for this), so the banks
+    are interleaved every cache line. The stdlib `L2Cache` indexes the sets
+    of a bank with the address bits above the bank bits. Neither the
+    interleaving nor the set index can be changed here: Ruby's `CacheMemory`
+    only selects the set with a range of address bits, so a hashed (e.g.,
+    XOR-folded) set index would need changes to gem5 itself.
+
+    The on-chip network is a crossbar with a configurable latency by default.
+    It can also be a mesh, a ring, or a two level tree of crossbars, and it
+    can use gem5's simple network model or garnet (see `network.py`).
     """
 
-    def __init__(self, xbar_latency: int):
+    def __init__(
+        self,
+        xbar_latency: int,
+        topology: str = "crossbar",
+        link_bandwidth: Optional[int] = None,
+        topology_options: Optional[dict] = None,
+        network: str = "simple",
+        num_l2_banks: Optional[int] = None,
+        l2_size: Optional[str] = None,
+    ):
+        """
+        :param xbar_latency: The latency in cycles of the links between the
+        routers of the network (e.g., between the L2s and the crossbar).
+        :param topology: "crossbar", "mesh", "ring", or
+        "hierarchical_crossbar".
+        :param link_bandwidth: The bandwidth in bytes per cycle of the links
+        between the routers, or None for the gem5 default (16).
+        :param topology_options: More keyword arguments of the topology, e.g.,
+        {"num_columns": 4} for the mesh or {"cluster_size": 4} for the
+        hierarchical crossbar.
+        :param network: "simple" for gem5's simple network model, or "garnet"
+        to also model the router pipelines and the contention of the flits.
+        The ring only works with the simple network.
+        :param num_l2_banks: The number of L2 banks, a power of two. By
+        default, there is one bank for each core.
+        :param l2_size: The total size of the L2, split evenly across the
+        banks. By default, each bank is 512 KiB, so the L2 grows with the
+        number of banks.
+        """
+        if topology not in TOPOLOGIES:
+            raise ValueError(
+                f"Invalid topology {topology}. Choose from "
+                f"{', '.join(TOPOLOGIES)}"
+            )
+        if network not in NETWORKS:
+            raise ValueError(
+                f"Invalid network {network}. Choose from "
+                f"{', '.join(NETWORKS)}"
+            )
+        if topology == "ring" and network == "garnet":
+            # Garnet routes the shortest way around the ring in both
+            # directions, which makes a cycle of channel dependencies, and
+            # the ring has no dateline to break it, so it can deadlock.
+            raise ValueError(
+                "The ring topology can deadlock with garnet. Use the simple "
+                "network or another topology"
+            )
+        if num_l2_banks is not None and (
+            num_l2_banks < 1 or num_l2_banks & (num_l2_banks - 1)
+        ):
+            raise ValueError(
+                f"Invalid number of L2 banks {num_l2_banks}. It must be a "
+                "power of two"
+            )
         AbstractRubyCacheHierarchy.__init__(self=self)
         AbstractTwoLevelCacheHierarchy.__init__(
             self,
@@ -75,6 +142,12 @@ class MESITwoLevelCacheHierarchy(
         )
 
         self._xbar_latency = xbar_latency
+        self._topology = topology
+        self._link_bandwidth = link_bandwidth
+        self._topology_options = topology_options or {}
+        self._network = network
+        self._l2_banks = num_l2_banks
+        self._l2_total_size = l2_size
 
     def incorporate_cache(self, board: AbstractBoard) -> None:
 
@@ -87,12 +160,27 @@ class MESITwoLevelCacheHierarchy(
         # MESI_Two_Level needs 5 virtual networks
         self.ruby_system.number_of_virtual_networks = 5
 
-        self.ruby_system.network = L1L2ClusterTree(
-            self.ruby_system, self._xbar_latency
+        topology = TOPOLOGIES[self._topology](
+            self._xbar_latency,
+            self._link_bandwidth,
+            **self._topology_options,
+        )
+        self.ruby_system.network = NETWORKS[self._network](
+            self.ruby_system, topology
         )
         self.ruby_system.network.number_of_virtual_networks = 5
 
-        self._num_l2_banks = board.get_processor().get_actual_num_cores()
+        num_cores = board.get_processor().get_actual_num_cores()
+        self._num_l2_banks = self._l2_banks or num_cores
+        l2_bank_size = self._l2_size
+        if self._l2_total_size is not None:
+            l2_size = toMemorySize(self._l2_total_size)
+            if l2_size % self._num_l2_banks:
+                raise ValueError(
+                    f"The L2 size {self._l2_total_size} can't be split "
+                    f"evenly across {self._num_l2_banks} banks"
+                )
+            l2_bank_size = f"{l2_size // self._num_l2_banks}B"
         runtime_isa = board.get_processor().get_isa()
 
         self._l1_controllers = []
@@ -141,7 +229,7 @@ class MESITwoLevelCacheHierarchy(
 
         self._l2_controllers = [
             L2Cache(
-                self._l2_size,
+                l2_bank_size,
                 self._l2_assoc,
                 self.ruby_system.network,
                 self._num_l2_banks,
@@ -182,11 +270,15 @@ class MESITwoLevelCacheHierarchy(
         if len(self._dma_controllers) != 0:
             self.ruby_system.dma_controllers = self._dma_controllers
 
-        # Create the network and connect the controllers.
+        # Create the network and connect the controllers. The L1s of the
+        # cores beyond the actual number of cores (e.g., the extra core of
+        # O3CPU) come first.
+        num_extra_l1s = len(self._l1_controllers) - num_cores
         self.ruby_system.network.connectControllers(
-            self._l1_controllers,
+            self._l1_controllers[num_extra_l1s:],
             self._l2_controllers,
-            self._directory_controllers[0],
+            self._directory_controllers,
+            self._l1_controllers[:num_extra_l1s],
         )
 
         self.ruby_system.network.setup_buffers()
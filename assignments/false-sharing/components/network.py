@@ -1,163 +1,371 @@
-from itertools import zip_longest
-from m5.objects import SimpleNetwork, Switch, SimpleExtLink, SimpleIntLink
+import math
 
+from m5.objects import (
+    SimpleNetwork,
+    Switch,
+    SimpleExtLink,
+    SimpleIntLink,
+    GarnetNetwork,
+    GarnetRouter,
+    GarnetExtLink,
+    GarnetIntLink,
+    GarnetNetworkInterface,
+)
 
-class L1L2ClusterTree(SimpleNetwork):
-    """A simple tree network. This doesn't not use garnet.
 
-    Assumptions:
-      - The number of L1 controllers is the same as the number of L2
-        controllers.
-      - There is one directory
+class L1L2Topology:
+    """The base class of the topologies of the networks of
+    `MESITwoLevelCacheHierarchy`.
+
+    Each L2 bank is paired with an L1 controller in a *tile*. The order of the
+    controllers in the two lists determines the pairing. Each controller of a
+    tile has its own router, and the two routers are connected to each
+    other. If there are fewer L2 banks than L1s (or the other way around),
+    there is one tile for each L1 (or L2) and the L2s (or L1s) are spread
+    evenly over them. The L2 router of a tile without an L2 has no
+    controller. Subclasses connect the L2 routers of the tiles to each other
+    in `connectTiles` and choose the routers of the directories, one for each
+    memory channel. All of the links of the topology between the tiles have
+    the latency `xbar_latency` and the bandwidth `link_bandwidth`.
+
+    The extra L1s (e.g., of the extra core of `O3CPU`) have no tile and are
+    connected to the router of the first directory.
+
+    A topology only decides what is connected to what. The network (e.g.,
+    `L1L2SimpleNetwork` or `L1L2GarnetNetwork`) creates the routers and
+    links.
+    """
+
+    def __init__(self, xbar_latency, link_bandwidth=None):
+        """
+        :param xbar_latency: The latency in cycles of the links between the
+        tiles.
+        :param link_bandwidth: The bandwidth in bytes per cycle of the links
+        between the tiles, or None for the default of the network.
+        """
+        self._xbar_latency = xbar_latency
+        self._link_bandwidth = link_bandwidth
+
+    def _createRouter(self):
+        # The router ids are the indices of the routers in `self._routers`.
+        router = self._network.createRouter(len(self._routers))
+        self._routers.append(router)
+        return router
+
+    def _connectController(self, ctrl, router):
+        self._ext_links.append(
+            self._network.createExtLink(len(self._ext_links), ctrl, router)
+        )
+
+    def _connectRouters(self, router1, router2, network_link=True, weight=1):
+        """Connect two routers with a link in each direction.
+
+        :param network_link: The link is part of the topology between the
+        tiles, and has its latency and bandwidth. Otherwise, it has the
+        defaults of the network.
+        :param weight: The weight of the links when the routing tables are
+        computed. Routes take the path with the lowest total weight.
+        """
+        for src, dst in [(router1, router2), (router2, router1)]:
+            if network_link:
+                link = self._network.createIntLink(
+                    len(self._int_links),
+                    src,
+                    dst,
+                    weight,
+                    self._xbar_latency,
+                    self._link_bandwidth,
+                )
+            else:
+                link = self._network.createIntLink(
+                    len(self._int_links), src, dst, weight
+                )
+            self._int_links.append(link)
+
+    def _spread(self, items, num):
+        """Return `num` of `items`, spread evenly over them."""
+        return [items[i * len(items) // num] for i in range(num)]
+
+    def connectTiles(self, l2_routers, num_directories):
+        """Connect the L2 routers of the tiles to each other.
+
+        :return: the routers to connect each directory to.
+        """
+        raise NotImplementedError
+
+    def connectControllers(
+        self, network, l1_ctrls, l2_ctrls, dir_ctrls, extra_l1_ctrls=()
+    ):
+        """Connect all of the controllers to routers of `network` and connect
+        the routers together as specified in the docstring of the class.
+
+        :param dir_ctrls: The directories, one for each memory channel.
+        :param extra_l1_ctrls: The L1s without a tile.
+        :return: the routers, the internal links, and the external links.
+        """
+        assert len(l1_ctrls) > 0 and len(l2_ctrls) > 0
+        assert len(dir_ctrls) > 0
+
+        self._network = network
+        self._routers = []
+        self._int_links = []
+        self._ext_links = []
+
+        tiles = range(max(len(l1_ctrls), len(l2_ctrls)))
+        tile_l1s = dict(zip(self._spread(tiles, len(l1_ctrls)), l1_ctrls))
+        tile_l2s = dict(zip(self._spread(tiles, len(l2_ctrls)), l2_ctrls))
+        l2_routers = []
+        for tile in tiles:
+            l1_router = None
+            if tile in tile_l1s:
+                l1_router = self._createRouter()
+                self._connectController(tile_l1s[tile], l1_router)
+            l2_router = self._createRouter()
+            if tile in tile_l2s:
+                self._connectController(tile_l2s[tile], l2_router)
+            if l1_router is not None:
+                self._connectRouters(l1_router, l2_router, network_link=False)
+            l2_routers.append(l2_router)
+
+        dir_routers = self.connectTiles(l2_routers, len(dir_ctrls))
+        for dir_ctrl, dir_router in zip(dir_ctrls, dir_routers):
+            self._connectController(dir_ctrl, dir_router)
+
+        # HACK: Connect the L1s without a tile (the extra core for SE mode)
+        # to the router of the first directory
+        for l1 in extra_l1_ctrls:
+            self._connectController(l1, dir_routers[0])
+
+        return self._routers, self._int_links, self._ext_links
+
+
+class CrossbarTopology(L1L2Topology):
+    """A simple tree network.
 
-    Each L2 bank is paired with an L1 controller. The order of the controllers
-    in the two lists determines the pairing.
     The L2s are connected to a single router (crossbar).
-    The directory is then also connected to this router.
+    The directories are then also connected to this router.
+    """
+
+    def connectTiles(self, l2_routers, num_directories):
+        xbar = self._createRouter()
+        for l2_router in l2_routers:
+            self._connectRouters(l2_router, xbar)
+        return [xbar] * num_directories
+
+
+class MeshTopology(L1L2Topology):
+    """A 2D mesh of tiles.
+
+    The L2 routers are laid out row by row in a grid and connected to their
+    neighbors. Messages go along the row first and then along the column
+    (XY routing). The directories are spread evenly over the routers of the
+    tiles, starting with the first tile, in a corner of the mesh.
+    """
+
+    def __init__(self, xbar_latency, link_bandwidth=None, num_columns=None):
+        """
+        :param num_columns: The number of tiles in each row of the mesh. By
+        default, the mesh is as square as possible.
+        """
+        super().__init__(xbar_latency, link_bandwidth)
+        self._num_columns = num_columns
+
+    def connectTiles(self, l2_routers, num_directories):
+        num_columns = self._num_columns or math.ceil(
+            math.sqrt(len(l2_routers))
+        )
+        for i, l2_router in enumerate(l2_routers):
+            # The links along the rows weigh less than the ones along the
+            # columns, so the shortest paths are the XY routes.
+            if i % num_columns != 0:
+                self._connectRouters(l2_routers[i - 1], l2_router, weight=1)
+            if i >= num_columns:
+                self._connectRouters(
+                    l2_routers[i - num_columns], l2_router, weight=2
+                )
+        return self._spread(l2_routers, num_directories)
+
+
+class RingTopology(L1L2Topology):
+    """A bidirectional ring of tiles.
+
+    Each L2 router is connected to the L2 routers of the previous and the next
+    tile. The directories are spread evenly over the routers of the tiles,
+    starting with the first tile.
+
+    The ring has no dateline (i.e., no virtual channel classes to break the
+    cycle of channel dependencies around the ring), so it can deadlock with
+    garnet and `MESITwoLevelCacheHierarchy` only allows it with the simple
+    network.
+    """
+
+    def connectTiles(self, l2_routers, num_directories):
+        num_tiles = len(l2_routers)
+        # The ring of two tiles is a single pair of links.
+        num_links = num_tiles if num_tiles > 2 else num_tiles - 1
+        for i in range(num_links):
+            self._connectRouters(
+                l2_routers[i], l2_routers[(i + 1) % num_tiles]
+            )
+        return self._spread(l2_routers, num_directories)
+
+
+class HierarchicalCrossbarTopology(L1L2Topology):
+    """A two level tree of crossbars.
+
+    The L2s of every `cluster_size` consecutive tiles are connected to a
+    crossbar of their cluster. The cluster crossbars are connected to a
+    global crossbar, which the directories are connected to.
     """
 
-    _intLinkId = 0
-    _extLinkId = 0
-    _routerId = 0
+    def __init__(self, xbar_latency, link_bandwidth=None, cluster_size=4):
+        """
+        :param cluster_size: The number of tiles connected to each cluster
+        crossbar.
+        """
+        super().__init__(xbar_latency, link_bandwidth)
+        self._cluster_size = cluster_size
+
+    def connectTiles(self, l2_routers, num_directories):
+        global_xbar = self._createRouter()
+        for first in range(0, len(l2_routers), self._cluster_size):
+            cluster_xbar = self._createRouter()
+            for l2_router in l2_routers[first : first + self._cluster_size]:
+                self._connectRouters(l2_router, cluster_xbar)
+            self._connectRouters(cluster_xbar, global_xbar)
+        return [global_xbar] * num_directories
 
-    @classmethod
-    def _getIntLinkId(cls):
-        cls._intLinkId += 1
-        return cls._intLinkId - 1
 
-    @classmethod
-    def _getExtLinkId(cls):
-        cls._extLinkId += 1
-        return cls._extLinkId - 1
+# The topologies that `MESITwoLevelCacheHierarchy` can use by name.
+TOPOLOGIES = {
+    "crossbar": CrossbarTopology,
+    "mesh": MeshTopology,
+    "ring": RingTopology,
+    "hierarchical_crossbar": HierarchicalCrossbarTopology,
+}
 
-    @classmethod
-    def _getRouterId(cls):
-        cls._routerId += 1
-        return cls._routerId - 1
 
-    def __init__(self, ruby_system, xbar_latency):
+class L1L2SimpleNetwork(SimpleNetwork):
+    """A network of `MESITwoLevelCacheHierarchy` with gem5's simple network
+    model, which doesn't use garnet. Its links have a latency and a bandwidth,
+    but its routers have no pipeline and no flit-level contention.
+    """
+
+    def __init__(self, ruby_system, topology):
+        """
+        :param ruby_system: The RubySystem of the network.
+        :param topology: The `L1L2Topology` of the network.
+        """
         super().__init__()
         self.netifs = []
-        self._xbar_latency = xbar_latency
+        self._topology = topology
 
         # TODO: These should be in a base class
         # https://gem5.atlassian.net/browse/GEM5-1039
         self.ruby_system = ruby_system
 
-    def connectControllers(self, l1_ctrls, l2_ctrls, dir_ctrl):
-        """Connect all of the controllers to routers and connect the routers
-        together as specified in the docstring of the class.
-        Assumptions:
-        - The number of L1 controllers is the same as the number of L2
-            controllers.
-        - There is one directory
-        """
-        # NOTE: Hack for SE mode with a `- 1` here and the first two L1s
-        # are connected to a single L2
-        assert len(l1_ctrls) - 1 == len(l2_ctrls)
-
-        routers = []
-        int_links = []
-        ext_links = []
-
-        self.xbar = Switch(router_id=self._getRouterId())
-        routers.append(self.xbar)
-
-        # for every l1/l2 pair create a connection. Then, connect this to a
-        # xbar.
-        for i, (l1, l2) in enumerate(zip(l1_ctrls[1:], l2_ctrls)):
-            # Create the router/switch
-            l1_switch = Switch(router_id=self._getRouterId())
-            setattr(self, f"l1_switch_{i}", l1_switch)
-            routers.append(getattr(self, f"l1_switch_{i}"))
-            # Connect the l1
-            setattr(
-                self,
-                f"l1_link_{i}",
-                SimpleExtLink(
-                    link_id=self._getExtLinkId(),
-                    ext_node=l1,
-                    int_node=l1_switch,
-                ),
-            )
-            ext_links.append(getattr(self, f"l1_link_{i}"))
-
-            # Add router for L2
-            l2_switch = Switch(router_id=self._getRouterId())
-            setattr(self, f"l2_switch_{i}", l2_switch)
-            routers.append(getattr(self, f"l2_switch_{i}"))
-            # Connect the L2
-            setattr(
-                self,
-                f"l2_link_{i}",
-                SimpleExtLink(
-                    link_id=self._getExtLinkId(),
-                    ext_node=l2,
-                    int_node=l2_switch,
-                ),
-            )
-            ext_links.append(getattr(self, f"l2_link_{i}"))
-
-            # Connect L1 router to L2 router
-            setattr(
-                self,
-                f"l1_l2_link{i}",
-                SimpleIntLink(
-                    link_id=self._getIntLinkId(),
-                    src_node=l1_switch,
-                    dst_node=l2_switch,
-                ),
-            )
-            int_links.append(getattr(self, f"l1_l2_link{i}"))
-            setattr(
-                self,
-                f"l2_l1_link{i}",
-                SimpleIntLink(
-                    link_id=self._getIntLinkId(),
-                    src_node=l2_switch,
-                    dst_node=l1_switch,
-                ),
-            )
-            int_links.append(getattr(self, f"l2_l1_link{i}"))
-
-            # Connect the L2 router to the xbar
-            setattr(
-                self,
-                f"l2_xbar_link{i}",
-                SimpleIntLink(
-                    link_id=self._getIntLinkId(),
-                    src_node=l2_switch,
-                    dst_node=self.xbar,
-                    latency=self._xbar_latency,
-                ),
-            )
-            int_links.append(getattr(self, f"l2_xbar_link{i}"))
-            setattr(
-                self,
-                f"xbar_l2_link{i}",
-                SimpleIntLink(
-                    link_id=self._getIntLinkId(),
-                    src_node=self.xbar,
-                    dst_node=l2_switch,
-                    latency=self._xbar_latency,
-                ),
-            )
-            int_links.append(getattr(self, f"xbar_l2_link{i}"))
+    def createRouter(self, router_id):
+        return Switch(router_id=router_id)
+
+    def createExtLink(self, link_id, ctrl, router):
+        return SimpleExtLink(link_id=link_id, ext_node=ctrl, int_node=router)
+
+    def createIntLink(
+        self, link_id, src, dst, weight, latency=None, bandwidth=None
+    ):
+        link = SimpleIntLink(
+            link_id=link_id, src_node=src, dst_node=dst, weight=weight
+        )
+        if latency is not None:
+            link.latency = latency
+        if bandwidth is not None:
+            link.bandwidth_factor = bandwidth
+        return link
 
-        # Connect the directory to the xbar
-        self.dir_ext_link = SimpleExtLink(
-            link_id=self._getExtLinkId(), ext_node=dir_ctrl, int_node=self.xbar
+    def connectControllers(
+        self, l1_ctrls, l2_ctrls, dir_ctrls, extra_l1_ctrls=()
+    ):
+        routers, int_links, ext_links = self._topology.connectControllers(
+            self, l1_ctrls, l2_ctrls, dir_ctrls, extra_l1_ctrls
         )
-        ext_links.append(self.dir_ext_link)
+        self.ext_links = ext_links
+        self.int_links = int_links
+        self.routers = routers
+
+
+class L1L2GarnetNetwork(GarnetNetwork):
+    """A network of `MESITwoLevelCacheHierarchy` with garnet, which models
+    the pipeline of the routers, their virtual channels, and the contention of
+    the flits on the links. Its stats include the utilization of every
+    router and link and the queueing latency of the packets (see
+    `network_report.py`).
+
+    Routes come from the routing tables, which follow the link weights of the
+    topology. The routers, the network interfaces, and the links inside the
+    tiles are `flit_size` bytes wide. A link between the tiles with another
+    `link_bandwidth` in the topology is that many bytes wide, and has a
+    serializer-deserializer at each end to convert the flits, so the
+    packets have the same number of flits with any `link_bandwidth`.
+    """
+
+    def __init__(self, ruby_system, topology, router_latency=1, flit_size=16):
+        """
+        :param ruby_system: The RubySystem of the network.
+        :param topology: The `L1L2Topology` of the network.
+        :param router_latency: The number of cycles of the router pipeline.
+        :param flit_size: The size of the flits in bytes.
+        """
+        super().__init__()
+        self._topology = topology
+        self._router_latency = router_latency
+        self._flit_size = flit_size
+        self.ni_flit_size = flit_size
+
+        # TODO: These should be in a base class
+        # https://gem5.atlassian.net/browse/GEM5-1039
+        self.ruby_system = ruby_system
+
+    def createRouter(self, router_id):
+        return GarnetRouter(router_id=router_id, latency=self._router_latency)
 
-        # HACK: Connect first L1 directory to the xbar
-        self.hack_ext_link = SimpleExtLink(
-            link_id=self._getExtLinkId(),
-            ext_node=l1_ctrls[0],
-            int_node=self.xbar,
+    def createExtLink(self, link_id, ctrl, router):
+        return GarnetExtLink(link_id=link_id, ext_node=ctrl, int_node=router)
+
+    def createIntLink(
+        self, link_id, src, dst, weight, latency=None, bandwidth=None
+    ):
+        link = GarnetIntLink(
+            link_id=link_id, src_node=src, dst_node=dst, weight=weight
         )
-        ext_links.append(self.hack_ext_link)
+        if latency is not None:
+            link.latency = latency
+        if bandwidth is not None and bandwidth != self._flit_size:
+            # Garnet models the bandwidth of a link by its width. The
+            # serializer-deserializers convert the flits of the routers to
+            # the width of the link and back.
+            link.width = bandwidth
+            link.src_serdes = True
+            link.dst_serdes = True
+        return link
 
+    def connectControllers(
+        self, l1_ctrls, l2_ctrls, dir_ctrls, extra_l1_ctrls=()
+    ):
+        routers, int_links, ext_links = self._topology.connectControllers(
+            self, l1_ctrls, l2_ctrls, dir_ctrls, extra_l1_ctrls
+        )
         self.ext_links = ext_links
         self.int_links = int_links
         self.routers = routers
+        # One network interface for every controller.
+        self.netifs = [
+            GarnetNetworkInterface(id=i) for i in range(len(ext_links))
+        ]
+
+    def setup_buffers(self):
+        # Unlike the simple network, garnet creates its own buffers.
+        pass
+
+
+# The networks that `MESITwoLevelCacheHierarchy` can use by name.
+NETWORKS = {"simple": L1L2SimpleNetwork, "garnet": L1L2GarnetNetwork}
@@ -0,0 +1,63 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Trace the coherence transitions of the region of interest.
+
+While the workload is between its work begin and work end annotations, every
+transition of every Ruby controller is written to a trace file with gem5's
+`ProtocolTrace` debug flag. `sharing_report.py` turns the trace into the
+ownership transfers and invalidations of every cache line, so the lines that
+bounce between the L1s can be found.
+
+The debug flags are compiled out of `gem5.fast`, so this needs `gem5.opt` (or
+`gem5.debug`). The trace of a whole region of interest is large, so it is
+compressed when its name ends with `.gz`, and the simulation is slower than
+without the trace.
+"""
+
+from gem5.simulate.exit_event import ExitEvent
+from gem5.simulate.simulator import Simulator
+
+from typing import Optional
+
+import m5
+from m5 import debug, trace
+
+
+def create_sharing_profile_simulator(
+    board,
+    trace_file: str = "sharing.trace.gz",
+    id: Optional[str] = None,
+) -> Simulator:
+    """Create the simulator of a board with `MESITwoLevelCacheHierarchy`
+    that traces the coherence transitions of the region of interest. The
+    stats are dumped like with `create_roi_simulator` of `util/roi.py`.
+
+    :param trace_file: The name of the trace in the output directory.
+    :param id: The id of the simulator, as in `Simulator`.
+    """
+
+    def workbegin_handler():
+        print(f"Reached the region of interest. Tracing to {trace_file}")
+        m5.stats.dump()
+        m5.stats.reset()
+        trace.output(trace_file)
+        debug.flags["ProtocolTrace"].enable()
+        yield False
+
+    def workend_handler():
+        print("At workend. Stopping the trace")
+        debug.flags["ProtocolTrace"].disable()
+        m5.stats.dump()
+        m5.stats.reset()
+        yield False
+
+    simulator = Simulator(
+        board=board,
+        on_exit_event={
+            ExitEvent.WORKBEGIN: workbegin_handler(),
+            ExitEvent.WORKEND: workend_handler(),
+        },
+        id=id,
+    )
+    return simulator
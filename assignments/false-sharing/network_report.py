@@ -0,0 +1,212 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Report the on-chip network stats of runs with the garnet network.
+
+With `MESITwoLevelCacheHierarchy(..., network="garnet")`, gem5 records how
+many flits every router moved through its crossbar and how long the packets
+waited to enter the network (queueing latency) and to cross it (network
+latency). This prints them for every run, so the interconnect cost of the
+implementations can be compared, e.g., `array_sum_naive` and
+`array_sum_chunking`:
+
+- packets: the packets received over all virtual networks.
+- queue/net latency: the average queueing and network latency of a packet,
+  in ticks.
+- hops: the average number of routers a flit goes through.
+- link util: the average utilization of the links (gem5's
+  `avg_link_utilization`).
+- busiest/mean router: the flits per cycle through the crossbar of the
+  busiest router and the mean over all routers.
+
+With `--routers`, it also prints every router of every run.
+
+Usage
+-----
+
+```
+python network_report.py [m5out/naive m5out/chunking ...] [--routers]
+```
+
+Each argument is a `stats.txt` file, an output directory, or a directory
+with one output directory per run (by default, `m5out`). The stats are from
+the region of interest, so the runs have to be created with
+`create_roi_simulator` (or `create_sharing_profile_simulator`), unless
+`--dump` picks a dump. Runs without the stats dumps of `util/roi.py` are
+skipped.
+
+This script does not need gem5.
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+# util/roi.py is at the root of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "util"))
+import roi
+
+NETWORK = "board.cache_hierarchy.ruby_system.network"
+
+STAT = re.compile(r"^(\S+)\s+(-?[0-9.]+(?:e[-+]?[0-9]+)?|nan|inf)\s", re.M)
+ROUTER_STAT = re.compile(
+    r"^" + re.escape(NETWORK) + r"\.routers(\d+)\.(\w+)$"
+)
+VNET_QUEUEING = re.compile(
+    r"^" + re.escape(NETWORK) + r"\.average_packet_vqueue_latency::(\d+)$"
+)
+
+
+def get_stats_files(paths):
+    stats_files = []
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            stats_files.append(path)
+        elif (path / "stats.txt").exists():
+            stats_files.append(path / "stats.txt")
+        else:
+            stats_files += sorted(path.glob("*/stats.txt"))
+    return stats_files
+
+
+def get_dump(stats_file, index=None):
+    """Return the stats of one dump of `stats_file` by name, or None if it
+    does not have that dump.
+
+    :param index: The index of the dump, or None for the region of interest.
+    :raises ValueError: if `index` is None and `stats_file` does not have the
+    dumps of `util/roi.py` (see `roi.read_roi_dumps`).
+    """
+    if index is None:
+        dump = roi.get_roi_dump(stats_file)
+    else:
+        with open(stats_file) as stats:
+            dumps = stats.read().split(roi.BEGIN_MARKER)[1:]
+        if not -len(dumps) <= index < len(dumps):
+            return None
+        dump = dumps[index]
+    return {name: float(value) for name, value in STAT.findall(dump)}
+
+
+def get_network_stats(stats):
+    """Return the network stats of a dump, or None if it did not use
+    garnet.
+    """
+    routers = {}
+    vnet_queueing = {}
+    for name, value in stats.items():
+        match = ROUTER_STAT.match(name)
+        if match:
+            routers.setdefault(int(match[1]), {})[match[2]] = value
+        match = VNET_QUEUEING.match(name)
+        if match:
+            vnet_queueing[int(match[1])] = value
+    if not routers or f"{NETWORK}.average_hops" not in stats:
+        return None
+
+    # The routers run on the clock of the board.
+    clock = stats.get("board.clk_domain.clock")
+    cycles = stats["simTicks"] / clock if clock else None
+    for router in routers.values():
+        flits = router.get("crossbar_activity", 0)
+        router["flits_per_cycle"] = flits / cycles if cycles else float("nan")
+    utilizations = [router["flits_per_cycle"] for router in routers.values()]
+    return {
+        "packets": stats.get(f"{NETWORK}.packets_received::total", 0),
+        "queueing_latency": stats.get(
+            f"{NETWORK}.average_packet_queueing_latency", float("nan")
+        ),
+        "network_latency": stats.get(
+            f"{NETWORK}.average_packet_network_latency", float("nan")
+        ),
+        "hops": stats[f"{NETWORK}.average_hops"],
+        "link_utilization": stats.get(
+            f"{NETWORK}.avg_link_utilization", float("nan")
+        ),
+        "busiest_router": max(utilizations),
+        "mean_router": sum(utilizations) / len(utilizations),
+        "routers": routers,
+        "vnet_queueing_latency": vnet_queueing,
+    }
+
+
+def get_run_name(stats_file):
+    return stats_file.parent.name
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Report the garnet network stats of every run."
+    )
+    argparser.add_argument(
+        "paths",
+        type=Path,
+        nargs="*",
+        default=[Path("m5out")],
+        help="stats.txt files or output directories.",
+    )
+    argparser.add_argument(
+        "--dump",
+        type=int,
+        default=None,
+        help="The index of the stats dump to report, e.g., -1 for the last.",
+    )
+    argparser.add_argument(
+        "--routers", action="store_true", help="Print every router."
+    )
+    args = argparser.parse_args()
+
+    runs = []
+    for stats_file in get_stats_files(args.paths):
+        try:
+            stats = get_dump(stats_file, args.dump)
+        except ValueError as error:
+            print(f"Skipping {stats_file}: {error}")
+            continue
+        network = get_network_stats(stats) if stats else None
+        if network is None:
+            print(f"Skipping {stats_file}: no garnet network stats")
+            continue
+        runs.append((get_run_name(stats_file), network))
+
+    print(
+        f"{'run':<32} {'packets':>10} {'queue lat':>10} {'net lat':>10} "
+        f"{'hops':>6} {'link util':>9} {'busiest':>8} {'mean':>8}"
+    )
+    for name, network in runs:
+        print(
+            f"{name:<32} {network['packets']:>10.0f} "
+            f"{network['queueing_latency']:>10.1f} "
+            f"{network['network_latency']:>10.1f} {network['hops']:>6.2f} "
+            f"{network['link_utilization']:>9.3f} "
+            f"{network['busiest_router']:>8.3f} "
+            f"{network['mean_router']:>8.3f}"
+        )
+
+    if args.routers:
+        for name, network in runs:
+            print()
+            print(name)
+            vnets = network["vnet_queueing_latency"]
+            if vnets:
+                print(
+                    "    queueing latency by virtual network: "
+                    + ", ".join(
+                        f"{vnet}: {latency:.1f}"
+                        for vnet, latency in sorted(vnets.items())
+                    )
+                )
+            print(
+                f"    {'router':>6} {'buffer reads':>12} "
+                f"{'buffer writes':>13} {'flits':>10} {'flits/cycle':>11}"
+            )
+            for router_id, router in sorted(network["routers"].items()):
+                print(
+                    f"    {router_id:>6} "
+                    f"{router.get('buffer_reads', 0):>12.0f} "
+                    f"{router.get('buffer_writes', 0):>13.0f} "
+                    f"{router.get('crossbar_activity', 0):>10.0f} "
+                    f"{router['flits_per_cycle']:>11.3f}"
+                )
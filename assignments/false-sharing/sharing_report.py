@@ -0,0 +1,188 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Find the cache lines that bounce between the L1 caches.
+
+Run the workload with `create_sharing_profile_simulator` (see
+`components/sharing_profile.py`) so that the output directory has a trace of
+the coherence transitions of the region of interest. For every cache line,
+this counts
+
+- transfers: the times an L1 became the owner of the line (its state became
+  E or M) after another L1 owned it, i.e., the ping-pong of the line.
+- invalidations: the times an L1 lost a valid copy of the line (in S, E, M,
+  or SM) because another L1 wanted to write it (the `Inv` and `Fwd_GETX`
+  events of the MESI L1).
+- L1s: the number of L1 controllers that touched the line.
+
+and prints the lines with the most transfers and invalidations. If there is
+a line like this in `array_sum_naive`, it should be gone in the variants that
+remove the false sharing (e.g., `array_sum_race_optimized` and
+`array_sum_result_cache_optimized`).
+
+Remember that `l1_controllers0` is the extra core of `O3CPU` (unless it is
+created with `extra_core=None`).
+
+Usage
+-----
+
+```
+python sharing_report.py m5out/<run> [--top 20] [--npz sharing.npz]
+```
+
+With `--npz`, the counts of every line (sorted by address) are saved to a
+numpy file.
+
+This script does not need gem5.
+"""
+
+import argparse
+import gzip
+import re
+from pathlib import Path
+
+import numpy as np
+
+TRACE_FILE = "sharing.trace.gz"
+
+# The format of the transitions of the controllers in the ProtocolTrace:
+# tick, version, machine, event, state>next_state, line address, comment.
+TRANSITION = re.compile(
+    r"^\s*(\d+)\s+(\d+)\s+(\w+?)\s*(\w+)\s+(\w+)>(\w+)\s+\[?(0x[0-9a-fA-F]+)"
+)
+
+OWNED_STATES = {"E", "M"}
+# The events of the L1 that remove its copy for a write of another L1.
+INVALIDATION_EVENTS = {"Inv", "Fwd_GETX"}
+# The states of the L1 with a valid copy. In the transient states of a miss
+# (e.g., IS), the line is not valid yet, so an invalidation loses nothing.
+# SM is a valid shared copy that is waiting for its upgrade.
+VALID_STATES = {"S", "E", "M", "SM"}
+
+
+def get_trace_file(path):
+    path = Path(path)
+    if path.is_dir():
+        path = path / TRACE_FILE
+    return path
+
+
+def open_trace(trace_file):
+    if trace_file.suffix == ".gz":
+        return gzip.open(trace_file, "rt")
+    return open(trace_file)
+
+
+def get_line_counts(trace_file, machine="L1Cache"):
+    """Return the transfers, invalidations, and the L1s of every line in the
+    trace as a dict from the line address to a dict of counts.
+    """
+    lines = {}
+    owners = {}
+    with open_trace(trace_file) as trace:
+        for record in trace:
+            match = TRANSITION.match(record)
+            if not match or match[3] != machine:
+                continue
+            version = int(match[2])
+            event, state, next_state = match[4], match[5], match[6]
+            address = int(match[7], 16)
+            line = lines.setdefault(
+                address, {"transfers": 0, "invalidations": 0, "l1s": set()}
+            )
+            line["l1s"].add(version)
+
+            if next_state in OWNED_STATES and state not in OWNED_STATES:
+                owner = owners.get(address)
+                if owner is not None and owner != version:
+                    line["transfers"] += 1
+                owners[address] = version
+            if event in INVALIDATION_EVENTS and state in VALID_STATES:
+                line["invalidations"] += 1
+    return lines
+
+
+def get_arrays(lines):
+    """Return the counts of every line as numpy arrays sorted by address."""
+    addresses = sorted(lines)
+    return {
+        "addresses": np.array(addresses, dtype=np.uint64),
+        "transfers": np.array(
+            [lines[a]["transfers"] for a in addresses], dtype=np.int64
+        ),
+        "invalidations": np.array(
+            [lines[a]["invalidations"] for a in addresses], dtype=np.int64
+        ),
+        "l1s": np.array(
+            [len(lines[a]["l1s"]) for a in addresses], dtype=np.int64
+        ),
+    }
+
+
+def get_top_lines(lines, top):
+    """Return the `top` lines with the most transfers and invalidations."""
+    return sorted(
+        lines.items(),
+        key=lambda item: (
+            item[1]["transfers"] + item[1]["invalidations"],
+            -item[0],
+        ),
+        reverse=True,
+    )[:top]
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Report the cache lines with the most coherence traffic."
+    )
+    argparser.add_argument(
+        "path",
+        type=Path,
+        help=f"The output directory of one run or its trace ({TRACE_FILE}).",
+    )
+    argparser.add_argument(
+        "--top", type=int, default=20, help="The number of lines to print."
+    )
+    argparser.add_argument(
+        "--npz",
+        type=Path,
+        default=None,
+        help="Also save the counts of every line to this .npz file.",
+    )
+    args = argparser.parse_args()
+
+    lines = get_line_counts(get_trace_file(args.path))
+    if not lines:
+        print(
+            "Warning: no L1 transitions in the trace. Was it made with "
+            "create_sharing_profile_simulator and gem5.opt?"
+        )
+
+    total_transfers = sum(line["transfers"] for line in lines.values())
+    total_invalidations = sum(line["invalidations"] for line in lines.values())
+    contended = sum(
+        1
+        for line in lines.values()
+        if line["transfers"] or line["invalidations"]
+    )
+    print(
+        f"{len(lines)} lines, {contended} with transfers or invalidations, "
+        f"{total_transfers} transfers, {total_invalidations} invalidations"
+    )
+    print()
+    print(
+        f"{'line':>18} {'transfers':>10} {'invals':>10} {'share':>7} "
+        f"{'L1s':>4}  l1_controllers"
+    )
+    for address, line in get_top_lines(lines, args.top):
+        count = line["transfers"] + line["invalidations"]
+        share = count / ((total_transfers + total_invalidations) or 1)
+        print(
+            f"{address:#18x} {line['transfers']:>10} "
+            f"{line['invalidations']:>10} {share:>7.1%} "
+            f"{len(line['l1s']):>4}  "
+            + ",".join(str(version) for version in sorted(line["l1s"]))
+        )
+
+    if args.npz is not None:
+        np.savez(args.npz, **get_arrays(lines))
@@ -0,0 +1,170 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Pick the representative intervals of a program from its basic block
+vectors, like the SimPoint tool.
+
+gem5's SimPoint probe writes a basic block vector (BBV) for every interval
+of a fixed number of instructions to `simpoint.bb.gz`. Each BBV is
+normalized, projected to a few random dimensions, and the projected vectors
+are clustered with k-means. The number of clusters is the smallest one whose
+Bayesian information criterion (BIC) is within 90% of the best one. The
+interval closest to the center of each cluster represents it, with a weight
+of the fraction of all intervals in the cluster.
+
+This only needs NumPy, so it also works outside of gem5:
+
+```
+python bbv_cluster.py m5out/simpoint-profile-bfs_riscv_run/simpoint.bb.gz
+```
+"""
+
+import argparse
+import gzip
+import re
+
+import numpy as np
+
+BBV_ENTRY = re.compile(rb":(\d+):(\d+)")
+
+
+def read_bbv(path, dimensions=15, seed=0):
+    """Read a `simpoint.bb.gz` file.
+
+    :return: a (intervals x `dimensions`) array of the normalized BBVs
+    projected to random dimensions. The projection is the same for every
+    file with the same `seed`.
+    """
+    rows, blocks, counts = [], [], []
+    intervals = 0
+    with gzip.open(path, "rb") as bbv_file:
+        for line in bbv_file:
+            if not line.startswith(b"T"):
+                continue
+            entries = np.array(BBV_ENTRY.findall(line), dtype=np.int64)
+            if len(entries):
+                rows.append(np.full(len(entries), intervals))
+                blocks.append(entries[:, 0])
+                counts.append(entries[:, 1])
+            intervals += 1
+    if intervals == 0:
+        raise ValueError(f"{path} has no basic block vectors")
+    rows = np.concatenate(rows)
+    blocks = np.concatenate(blocks)
+    counts = np.concatenate(counts).astype(np.float64)
+    counts /= np.bincount(rows, weights=counts, minlength=intervals)[rows]
+
+    # Only the projection of the blocks that occur is needed.
+    block_ids, block_index = np.unique(blocks, return_inverse=True)
+    projection = np.random.default_rng(seed).uniform(
+        -1.0, 1.0, (block_ids.max() + 1, dimensions)
+    )[block_ids]
+    projected = np.zeros((intervals, dimensions))
+    np.add.at(projected, rows, counts[:, None] * projection[block_index])
+    return projected
+
+
+def kmeans(points, k, rng, iterations=100):
+    """Cluster `points` into `k` clusters, starting from k-means++ centers.
+
+    :return: the centers, the cluster of every point, and the sum of the
+    squared distances of the points to their centers.
+    """
+    centers = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        distances = np.min(
+            ((points[:, None] - np.array(centers)[None]) ** 2).sum(axis=2),
+            axis=1,
+        )
+        if distances.sum() == 0:
+            centers.append(points[rng.integers(len(points))])
+        else:
+            centers.append(
+                points[rng.choice(len(points), p=distances / distances.sum())]
+            )
+    centers = np.array(centers)
+    labels = None
+    for _ in range(iterations):
+        distances = ((points[:, None] - centers[None]) ** 2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        for cluster in range(k):
+            members = points[labels == cluster]
+            if len(members):
+                centers[cluster] = members.mean(axis=0)
+    distances = ((points - centers[labels]) ** 2).sum(axis=1)
+    return centers, labels, distances.sum()
+
+
+def get_bic(points, labels, sse, k):
+    """The BIC of a clustering, as in X-means and SimPoint."""
+    n, dimensions = points.shape
+    if n <= k:
+        return -np.inf
+    variance = max(sse / (dimensions * (n - k)), np.finfo(float).tiny)
+    sizes = np.bincount(labels, minlength=k)
+    sizes = sizes[sizes > 0]
+    log_likelihood = np.sum(
+        sizes * np.log(sizes)
+        - sizes * np.log(n)
+        - sizes * dimensions / 2 * np.log(2 * np.pi * variance)
+        - dimensions * (sizes - 1) / 2
+    )
+    parameters = k * (dimensions + 1)
+    return log_likelihood - parameters / 2 * np.log(n)
+
+
+def pick_simpoints(points, max_k=10, restarts=5, seed=0, bic_threshold=0.9):
+    """Cluster the projected BBVs and pick one interval per cluster.
+
+    :return: the indices of the representative intervals, in increasing
+    order, and their weights.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for k in range(1, min(max_k, len(points)) + 1):
+        best = min(
+            (kmeans(points, k, rng) for _ in range(restarts)),
+            key=lambda result: result[2],
+        )
+        results.append((k, best, get_bic(points, best[1], best[2], k)))
+
+    bics = np.array([bic for _, _, bic in results])
+    finite = bics[np.isfinite(bics)]
+    if len(finite):
+        threshold = finite.min() + bic_threshold * (
+            finite.max() - finite.min()
+        )
+        k, (centers, labels, _), _ = next(
+            result for result in results if result[2] >= threshold
+        )
+    else:
+        k, (centers, labels, _), _ = results[0]
+
+    simpoints = {}
+    for cluster in range(k):
+        members = np.flatnonzero(labels == cluster)
+        if len(members) == 0:
+            continue
+        distances = ((points[members] - centers[cluster]) ** 2).sum(axis=1)
+        simpoints[int(members[distances.argmin()])] = len(members) / len(
+            points
+        )
+    order = sorted(simpoints)
+    return order, [simpoints[interval] for interval in order]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pick SimPoints from a simpoint.bb.gz file."
+    )
+    parser.add_argument("bbv", help="The simpoint.bb.gz file.")
+    parser.add_argument(
+        "--max-k", type=int, default=10, help="The most clusters to try."
+    )
+    args = parser.parse_args()
+    simpoints, weights = pick_simpoints(read_bbv(args.bbv), args.max_k)
+    for interval, weight in zip(simpoints, weights):
+        print(f"{interval} {weight:.6f}")
@@ -7,7 +7,18 @@ from gem5.components.cachehierarchies.ruby.mesi_two_level_cache_hierarchy import
 )
 from gem5.components.memory.dram_interfaces.ddr4 import DDR4_2400_8x8
 from gem5.components.memory.memory import ChanneledMemory
-from .processors import OutOfOrderCPU
+from .processors import (
+    OutOfOrderCPU,
+    FastForwardOutOfOrderCPU,
+    get_area_score,
+)
+
+import sys
+from pathlib import Path
+
+# util/roi.py is at the root of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "util"))
+from roi import create_fast_forward_simulator
 
 RISCVBoard = SimpleBoard
 
@@ -44,4 +55,7 @@ __all__ = [
     "MESITwoLevelCache",
     "DDR4",
     "OutOfOrderCPU",
+    "FastForwardOutOfOrderCPU",
+    "get_area_score",
+    "create_fast_forward_simulator",
 ]
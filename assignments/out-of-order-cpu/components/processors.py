@@ -27,6 +27,13 @@
 from gem5.isas import ISA
 from gem5.components.processors.base_cpu_core import BaseCPUCore
 from gem5.components.processors.base_cpu_processor import BaseCPUProcessor
+from gem5.components.processors.cpu_types import CPUTypes
+from gem5.components.processors.simple_core import SimpleCore
+from gem5.components.boards.abstract_board import AbstractBoard
+from gem5.components.boards.mem_mode import MemMode
+from gem5.components.processors.switchable_processor import (
+    SwitchableProcessor,
+)
 
 from m5.objects import RiscvO3CPU
 from m5.objects.FuncUnitConfig import *
@@ -36,6 +43,25 @@ from m5.objects.BranchPredictor import (
 )
 
 
+def get_area_score(width, rob_size, num_int_regs, num_fp_regs):
+    """
+    get_area_score calculates the area score of a pipeline with the given
+    width, rob_size, num_int_regs, and num_fp_regs without building it, e.g.,
+    to rule out configurations before simulating them.
+
+    **IMPORTANT**: This is not a real area model.
+
+    :return: the area score of the pipeline.
+    """
+    return (
+        width * (2 * rob_size + num_int_regs + num_fp_regs)
+        + 4 * width
+        + 2 * rob_size
+        + num_int_regs
+        + num_fp_regs
+    )
+
+
 class OutOfOrderCPUCore(RiscvO3CPU):
     def __init__(self, width, rob_size, num_int_regs, num_fp_regs):
         """
@@ -129,11 +155,92 @@ class OutOfOrderCPU(BaseCPUProcessor):
         :return: the area score of a pipeline using its parameters width,
         rob_size, num_int_regs, and num_fp_regs.
         """
-        score = (
-            self._width * (2 * self._rob_size + self._num_int_regs + self._num_fp_regs)
-            + 4 * self._width
-            + 2 * self._rob_size
-            + self._num_int_regs
-            + self._num_fp_regs
+        return get_area_score(
+            self._width, self._rob_size, self._num_int_regs, self._num_fp_regs
+        )
+
+
+class FastForwardOutOfOrderCPU(SwitchableProcessor):
+    def __init__(
+        self,
+        width,
+        rob_size,
+        num_int_regs,
+        num_fp_regs,
+        fast_forward_type=CPUTypes.TIMING,
+    ):
+        """
+        FastForwardOutOfOrderCPU has the same out of order core as
+        OutOfOrderCPU and a simple core that runs the program up to the region
+        of interest much faster. It starts on the simple core and switches to
+        the out of order core with switch_to_detailed(). See
+        create_fast_forward_simulator in util/roi.py for a simulator that
+        switches at the workload's work begin annotation.
+
+        The simple core is a TimingSimpleCPU by default, since Ruby caches
+        (e.g., MESITwoLevelCache) do not support atomic accesses and there is
+        no KVM for RISC-V. Its memory accesses go through the same caches, so
+        they are warm when the out of order core takes over. Use
+        CPUTypes.ATOMIC only with a classic cache hierarchy.
+
+        :param width: sets the width of fetch, decode, raname, issue, wb, and
+        commit stages.
+        :param rob_size: determine the number of entries in the reorder buffer.
+        :param num_int_regs: determines the size of the integer register file.
+        :param num_int_regs: determines the size of the vector/floating point
+        register file.
+        :param fast_forward_type: the CPU type of the simple core.
+        """
+        # The cores are named after the keys in the stats, e.g.,
+        # board.processor.detailed.core.ipc, not board.processor.cores0.
+        super().__init__(
+            switchable_cores={
+                "detailed": [
+                    OutOfOrderCPUStdCore(
+                        width, rob_size, num_int_regs, num_fp_regs
+                    )
+                ],
+                "fast_forward": [
+                    SimpleCore(fast_forward_type, core_id=0, isa=ISA.RISCV)
+                ],
+            },
+            starting_cores="fast_forward",
+        )
+        self._fast_forward_type = fast_forward_type
+        self._width = width
+        self._rob_size = rob_size
+        self._num_int_regs = num_int_regs
+        self._num_fp_regs = num_fp_regs
+
+    def switch_to_detailed(self):
+        """
+        Switch from the simple core to the out of order core.
+        """
+        self.switch_to_processor("detailed")
+
+    def incorporate_processor(self, board: AbstractBoard) -> None:
+        super().incorporate_processor(board)
+        # Unlike SimpleSwitchableProcessor, SwitchableProcessor doesn't set
+        # the memory mode of the board, which is atomic by default. The
+        # detailed core needs the timing mode, and m5.switchCpus changes it
+        # when an atomic simple core switches to it.
+        if (
+            self._fast_forward_type == CPUTypes.ATOMIC
+            and not board.get_cache_hierarchy().is_ruby()
+        ):
+            board.set_mem_mode(MemMode.ATOMIC)
+        else:
+            board.set_mem_mode(MemMode.TIMING)
+
+    def get_area_score(self):
+        """
+        get_area_score calculates the area score of the out of order core. The
+        simple core does not count.
+
+        **IMPORTANT**: This is not a real area model.
+
+        :return: the area score of the out of order core.
+        """
+        return get_area_score(
+            self._width, self._rob_size, self._num_int_regs, self._num_fp_regs
         )
-        return score
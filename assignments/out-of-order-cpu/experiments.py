@@ -5,11 +5,19 @@ from components import (
     OutOfOrderCPU,
 )
 
-from gem5.simulate.simulator import Simulator
 from gem5.utils.multisim import multisim
 from gem5.resources.resource import obtain_resource
 
-multisim.set_num_processes(10)
+import sys
+from pathlib import Path
+
+# util/jobrunner.py is at the root of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "util"))
+import jobrunner
+import roi
+
+# As many processes as fit in the cores and memory of the host.
+multisim.set_num_processes(jobrunner.get_num_processes())
 
 def get_board(width, rob_size, num_int_regs, num_fp_regs):
     cache = MESITwoLevelCache()
@@ -37,5 +45,10 @@ for workload in obtain_resource("comparch-benchmarks"):
         config = configurations[name]
         board = get_board(**config)
         board.set_workload(workload)
-        simulator = Simulator(board=board, id=f"{name}-{workload.get_id()}")
-        multisim.add_simulator(simulator)
+        # The stats of the region of interest are the second dump.
+        simulator = roi.create_roi_simulator(
+            board, id=f"{name}-{workload.get_id()}"
+        )
+        # Skips the simulations that already finished with the same
+        # configuration.
+        jobrunner.add_job(simulator, config, workload, min_dumps=roi.NUM_DUMPS)
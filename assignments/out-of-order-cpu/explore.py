@@ -0,0 +1,339 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Search the OutOfOrderCPU design space for the best core within an area
+budget.
+
+The design space is every combination of `WIDTHS`, `ROB_SIZES`,
+`NUM_INT_REGS`, and `NUM_FP_REGS`. Configurations with an area score (see
+`get_area_score`) above the budget are dropped before anything is simulated.
+The remaining ones are narrowed down with successive halving:
+
+1. Simulate every candidate on the first few workloads of the
+   comparch-benchmarks.
+2. Keep the best 1/`eta` of the candidates by the geometric mean of their
+   IPC (or IPC per area) on those workloads.
+3. Simulate the survivors on `eta` times as many workloads and repeat until
+   the survivors have run every workload.
+
+Each step is one multisim run of this script with the simulations of that
+step in the `OOO_EXPLORE_POINTS` environment variable. The id of a
+simulation is its configuration and its workload (e.g.,
+`w4-rob32-int64-fp64-<workload>`), and its output is in `m5out/<id>`. These
+ids are not the ones of the "little" and "big" cores of `experiments.py`,
+so the searches only reuse each other's results. The region of interest is
+the second of the three stats dumps of `util/roi.py`. Simulations whose
+`stats.txt` has all three dumps are not run again, and the ones with any
+other number of dumps (e.g., interrupted or crashed ones) are, so an
+interrupted search can be restarted. A simulation that still does not
+finish scores 0 in that search.
+
+Usage
+-----
+
+```
+gem5 explore.py --budget <area score> [--eta 3] [--objective ipc|ipc_per_area]
+```
+
+For reference, the area score of the "little" core is 976 and of the "big"
+core is 23344. Set `GEM5` to the gem5 binary if it is not `gem5` on the
+`PATH`. The number of simulations to run at the same time is
+`jobrunner.get_num_processes()` of `util/jobrunner.py` (one per host core,
+as far as the memory allows), and `JOBRUNNER_PROCESSES` overrides it.
+"""
+
+from components import (
+    RISCVBoard,
+    MESITwoLevelCache,
+    DDR4,
+    OutOfOrderCPU,
+    get_area_score,
+)
+
+from gem5.utils.multisim import multisim
+from gem5.resources.resource import obtain_resource
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+# util/roi.py and util/jobrunner.py are at the root of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "util"))
+import jobrunner
+import roi
+
+# Widths below 4 can hit an assertion in gem5's out-of-order model, and both
+# register files need more than the 32 architectural registers.
+WIDTHS = [4, 6, 8, 10, 12]
+ROB_SIZES = [32, 64, 96, 128, 192, 256, 384]
+NUM_INT_REGS = [64, 96, 128, 192, 256, 384, 512]
+NUM_FP_REGS = [64, 96, 128, 192, 256, 384, 512]
+
+POINTS_VARIABLE = "OOO_EXPLORE_POINTS"
+
+
+def get_board(width, rob_size, num_int_regs, num_fp_regs):
+    cache = MESITwoLevelCache()
+    memory = DDR4()
+    cpu = OutOfOrderCPU(width, rob_size, num_int_regs, num_fp_regs)
+
+    board = RISCVBoard(
+        clk_freq="1GHz", processor=cpu, cache_hierarchy=cache, memory=memory
+    )
+
+    return board
+
+
+def get_config_name(config):
+    return (
+        f"w{config['width']}-rob{config['rob_size']}"
+        f"-int{config['num_int_regs']}-fp{config['num_fp_regs']}"
+    )
+
+
+def get_simulator_id(config, workload_id):
+    return f"{get_config_name(config)}-{workload_id}"
+
+
+def get_stats_file(simulator_id):
+    return Path("m5out") / simulator_id / "stats.txt"
+
+
+def is_complete(simulator_id):
+    """Whether a simulation finished, i.e., its `stats.txt` has all of the
+    dumps of `roi.create_roi_simulator`.
+    """
+    stats_file = get_stats_file(simulator_id)
+    if not stats_file.exists():
+        return False
+    try:
+        roi.read_roi_dumps(stats_file)
+    except ValueError:
+        return False
+    return True
+
+
+def get_candidates(budget):
+    """Return the configurations of the design space within the area
+    budget.
+    """
+    candidates = []
+    for width, rob_size, num_int_regs, num_fp_regs in itertools.product(
+        WIDTHS, ROB_SIZES, NUM_INT_REGS, NUM_FP_REGS
+    ):
+        config = {
+            "width": width,
+            "rob_size": rob_size,
+            "num_int_regs": num_int_regs,
+            "num_fp_regs": num_fp_regs,
+        }
+        if get_area_score(**config) <= budget:
+            candidates.append(config)
+    return candidates
+
+
+def get_ipc(simulator_id):
+    """Return the IPC of the region of interest of a simulation, or None if
+    it has not run.
+
+    :raises ValueError: if its stats do not have the dumps of a finished
+    `roi.create_roi_simulator` run (see `roi.read_roi_dumps`).
+    """
+    stats_file = get_stats_file(simulator_id)
+    if not stats_file.exists():
+        return None
+    dump = roi.get_roi_dump(stats_file)
+    match = re.search(
+        r"^board\.processor\.cores\d*\.core\.ipc\s+(\S+)", dump, re.MULTILINE
+    )
+    if match is None:
+        return None
+    return float(match.group(1))
+
+
+def get_score(config, workload_ids, objective):
+    """The geometric mean IPC of `config` on the workloads, divided by its
+    area score for the "ipc_per_area" objective. Configurations with a
+    failed simulation score 0.
+    """
+    try:
+        ipcs = [
+            get_ipc(get_simulator_id(config, workload_id))
+            for workload_id in workload_ids
+        ]
+    except ValueError as error:
+        print(f"Warning: {error}")
+        return 0.0
+    if any(ipc is None or ipc <= 0 for ipc in ipcs):
+        return 0.0
+    score = math.exp(sum(math.log(ipc) for ipc in ipcs) / len(ipcs))
+    if objective == "ipc_per_area":
+        score /= get_area_score(**config)
+    return score
+
+
+def run_round(points):
+    """Simulate the (config, workload id) points with multisim."""
+    environment = dict(os.environ)
+    environment[POINTS_VARIABLE] = json.dumps(
+        [
+            {"config": config, "workload": workload_id}
+            for config, workload_id in points
+        ]
+    )
+    result = subprocess.run(
+        [
+            os.environ.get("GEM5", "gem5"),
+            "-re",
+            "-m",
+            "gem5.utils.multisim",
+            __file__,
+        ],
+        env=environment,
+    )
+    if result.returncode != 0:
+        # The configurations of the failed simulations score 0.
+        print("Warning: some simulations of this round failed.")
+
+
+def successive_halving(
+    candidates, workload_ids, eta, min_workloads, objective
+):
+    """Narrow the candidates down with successive halving.
+
+    :return: the survivors ranked by their score on all of the workloads and
+    the number of simulations that were run.
+    """
+    num_workloads = min(min_workloads, len(workload_ids))
+    simulations = 0
+    rung = 0
+    while True:
+        rung_workloads = workload_ids[:num_workloads]
+        points = [
+            (config, workload_id)
+            for config in candidates
+            for workload_id in rung_workloads
+            if not is_complete(get_simulator_id(config, workload_id))
+        ]
+        print(
+            f"Rung {rung}: {len(candidates)} configurations on "
+            f"{len(rung_workloads)} workloads, {len(points)} new simulations"
+        )
+        if points:
+            run_round(points)
+            simulations += len(points)
+
+        scores = {
+            get_config_name(config): get_score(
+                config, rung_workloads, objective
+            )
+            for config in candidates
+        }
+        candidates = sorted(
+            candidates,
+            key=lambda config: scores[get_config_name(config)],
+            reverse=True,
+        )
+        if num_workloads == len(workload_ids):
+            return candidates, simulations
+        candidates = candidates[: max(1, math.ceil(len(candidates) / eta))]
+        num_workloads = min(num_workloads * eta, len(workload_ids))
+        rung += 1
+
+
+def get_inputs():
+    parser = argparse.ArgumentParser(
+        description="Search for the best OutOfOrderCPU within an area budget."
+    )
+    parser.add_argument(
+        "--budget",
+        type=int,
+        required=True,
+        help="The largest area score to simulate.",
+    )
+    parser.add_argument(
+        "--eta",
+        type=int,
+        default=3,
+        help="Keep 1/eta of the candidates in every round and run eta times "
+        "as many workloads.",
+    )
+    parser.add_argument(
+        "--min-workloads",
+        type=int,
+        default=1,
+        help="The number of workloads of the first round.",
+    )
+    parser.add_argument(
+        "--objective",
+        choices=["ipc", "ipc_per_area"],
+        default="ipc_per_area",
+        help="What to maximize.",
+    )
+    parser.add_argument(
+        "--initial",
+        type=int,
+        default=None,
+        help="Start from a random sample of this many candidates instead of "
+        "all of them.",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the random sample."
+    )
+    parser.add_argument(
+        "--top", type=int, default=5, help="The number of results to print."
+    )
+    return parser.parse_args()
+
+
+if POINTS_VARIABLE in os.environ:
+    # This is one round of the search, run by multisim.
+    multisim.set_num_processes(jobrunner.get_num_processes())
+    for point in json.loads(os.environ[POINTS_VARIABLE]):
+        board = get_board(**point["config"])
+        board.set_workload(obtain_resource(point["workload"]))
+        simulator = roi.create_roi_simulator(
+            board, id=get_simulator_id(point["config"], point["workload"])
+        )
+        multisim.add_simulator(simulator)
+else:
+    args = get_inputs()
+    suite = obtain_resource("comparch-benchmarks")
+    workload_ids = [workload.get_id() for workload in suite]
+    candidates = get_candidates(args.budget)
+    grid_size = len(WIDTHS) * len(ROB_SIZES) * len(NUM_INT_REGS) * len(
+        NUM_FP_REGS
+    )
+    print(
+        f"{len(candidates)} of {grid_size} configurations have an area score "
+        f"of at most {args.budget}"
+    )
+    full_sweep = len(candidates) * len(workload_ids)
+    if args.initial is not None and args.initial < len(candidates):
+        candidates = random.Random(args.seed).sample(candidates, args.initial)
+
+    ranked, simulations = successive_halving(
+        candidates,
+        workload_ids,
+        args.eta,
+        args.min_workloads,
+        args.objective,
+    )
+    print(
+        f"Ran {simulations} simulations. Running every configuration within "
+        f"the budget on every workload is {full_sweep} simulations."
+    )
+    print(f"Best configurations by {args.objective}:")
+    for config in ranked[: args.top]:
+        score = get_score(config, workload_ids, args.objective)
+        print(
+            f"    {get_config_name(config)}: area "
+            f"{get_area_score(**config)}, score {score:.6g}"
+        )
@@ -0,0 +1,83 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Run the configurations of `experiments.py` with fast-forwarding.
+
+Each simulation runs the initialization of the workload on a simple core and
+only `DETAILED_INSTRUCTIONS` of the region of interest on the out of order
+core (after `WARMUP_INSTRUCTIONS` to warm up the pipeline). The output is in
+`m5out/<config>-<workload>-ff`, and the second stats dump is the detailed
+window, so its IPC can be compared with the full run of `experiments.py`.
+
+Usage
+-----
+
+```
+gem5 -re -m gem5.utils.multisim fast_forward.py
+```
+"""
+
+from components import (
+    RISCVBoard,
+    MESITwoLevelCache,
+    DDR4,
+    FastForwardOutOfOrderCPU,
+    create_fast_forward_simulator,
+)
+
+from gem5.utils.multisim import multisim
+from gem5.resources.resource import obtain_resource
+
+import sys
+from pathlib import Path
+
+# util/jobrunner.py is at the root of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "util"))
+import jobrunner
+
+DETAILED_INSTRUCTIONS = 10_000_000
+WARMUP_INSTRUCTIONS = 1_000_000
+
+# As many processes as fit in the cores and memory of the host.
+multisim.set_num_processes(jobrunner.get_num_processes())
+
+
+def get_board(width, rob_size, num_int_regs, num_fp_regs):
+    cache = MESITwoLevelCache()
+    memory = DDR4()
+    cpu = FastForwardOutOfOrderCPU(width, rob_size, num_int_regs, num_fp_regs)
+
+    board = RISCVBoard(
+        clk_freq="1GHz", processor=cpu, cache_hierarchy=cache, memory=memory
+    )
+
+    return board
+
+
+configurations = {
+    "little": {
+        "width": 4,
+        "rob_size": 32,
+        "num_int_regs": 64,
+        "num_fp_regs": 64,
+    },
+    "big": {
+        "width": 12,
+        "rob_size": 384,
+        "num_int_regs": 512,
+        "num_fp_regs": 512,
+    },
+}
+
+for workload in obtain_resource("comparch-benchmarks"):
+    for name in ["little", "big"]:
+        config = configurations[name]
+        board = get_board(**config)
+        board.set_workload(workload)
+        simulator = create_fast_forward_simulator(
+            board,
+            detailed_instructions=DETAILED_INSTRUCTIONS,
+            warmup_instructions=WARMUP_INSTRUCTIONS,
+            id=f"{name}-{workload.get_id()}-ff",
+        )
+        multisim.add_simulator(simulator)
@@ -0,0 +1,428 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Estimate the IPC of OutOfOrderCPU configurations from SimPoints instead of
+running every workload to completion on the detailed core.
+
+The pipeline has four steps. The first two only run once per workload and
+are cached in `simpoints/<workload>`, so every core configuration reuses
+them.
+
+1. Profile: run the workload on an atomic core with gem5's SimPoint probe,
+   which writes a basic block vector for every `SIMPOINT_INTERVAL`
+   instructions. The intervals of the region of interest (between the
+   workload's gem5 work begin and work end annotations) are clustered with
+   `bbv_cluster.py` into `simpoints/<workload>/simpoints.json`.
+2. Checkpoint: run the workload on a Timing core with the same caches and
+   memory as `experiments.py` and take a checkpoint `WARMUP_INTERVAL`
+   instructions before each SimPoint. Ruby has no atomic mode and can only
+   restore checkpoints taken with the same Ruby caches, so this cannot use
+   the atomic core.
+3. Run: restore every checkpoint on every core configuration, warm up for
+   `WARMUP_INTERVAL` instructions, and simulate one interval. The output is
+   in `m5out/<config>-<workload>-simpoint<N>`.
+4. Report: the weighted IPC of every configuration and workload, i.e., the
+   total weight over the weighted sum of the CPI of the SimPoints. If the
+   full run of `experiments.py` or `explore.py` is in `m5out` too, its IPC
+   is printed next to it.
+
+Each simulation step is a multisim run of this script with the
+simulations of the step in the `SIMPOINT_POINTS` environment variable.
+Steps whose output already exists are skipped.
+
+Usage
+-----
+
+```
+gem5 simpoints.py [--configs little big w8-rob128-int128-fp128 ...]
+```
+
+The configurations are "little", "big", or names in the format of
+`explore.py`. Set `GEM5` to the gem5 binary if it is not `gem5` on the
+`PATH`, and `SIMPOINT_PROCESSES` to the number of simulations to run at the
+same time (the number of host cores by default). Delete
+`simpoints/<workload>` to profile a workload again.
+"""
+
+from components import (
+    RISCVBoard,
+    MESITwoLevelCache,
+    DDR4,
+    OutOfOrderCPU,
+)
+
+from gem5.components.cachehierarchies.classic.no_cache import NoCache
+from gem5.components.processors.cpu_types import CPUTypes
+from gem5.components.processors.simple_processor import SimpleProcessor
+from gem5.isas import ISA
+from gem5.resources.resource import SimpointResource, obtain_resource
+from gem5.simulate.exit_event import ExitEvent
+from gem5.simulate.exit_event_generators import (
+    simpoints_save_checkpoint_generator,
+)
+from gem5.simulate.simulator import Simulator
+from gem5.utils.multisim import multisim
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import m5
+
+# util/roi.py is at the root of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "util"))
+import roi
+
+SIMPOINT_INTERVAL = 10_000_000
+WARMUP_INTERVAL = 1_000_000
+MAX_K = 10
+
+SIMPOINT_DIR = Path("simpoints")
+STAGE_VARIABLE = "SIMPOINT_STAGE"
+POINTS_VARIABLE = "SIMPOINT_POINTS"
+
+CONFIGURATIONS = {
+    "little": {"width": 4, "rob_size": 32, "num_int_regs": 64, "num_fp_regs": 64},
+    "big": {"width": 12, "rob_size": 384, "num_int_regs": 512, "num_fp_regs": 512},
+}
+CONFIG_NAME = re.compile(r"^w(\d+)-rob(\d+)-int(\d+)-fp(\d+)$")
+
+
+def get_board(width, rob_size, num_int_regs, num_fp_regs):
+    cache = MESITwoLevelCache()
+    memory = DDR4()
+    cpu = OutOfOrderCPU(width, rob_size, num_int_regs, num_fp_regs)
+
+    board = RISCVBoard(
+        clk_freq="1GHz", processor=cpu, cache_hierarchy=cache, memory=memory
+    )
+
+    return board
+
+
+def get_config(name):
+    if name in CONFIGURATIONS:
+        return CONFIGURATIONS[name]
+    match = CONFIG_NAME.match(name)
+    if match is None:
+        raise ValueError(f"Invalid configuration {name}")
+    width, rob_size, num_int_regs, num_fp_regs = map(int, match.groups())
+    return {
+        "width": width,
+        "rob_size": rob_size,
+        "num_int_regs": num_int_regs,
+        "num_fp_regs": num_fp_regs,
+    }
+
+
+def get_binary_and_arguments(workload_id):
+    parameters = obtain_resource(workload_id).get_parameters()
+    return parameters["binary"], parameters.get("arguments", [])
+
+
+def get_profile_id(workload_id):
+    return f"simpoint-profile-{workload_id}"
+
+
+def get_checkpoint_dir(workload_id):
+    # gem5 resolves relative checkpoint paths against the output directory.
+    return (SIMPOINT_DIR / workload_id / "checkpoints").resolve()
+
+
+def get_run_id(config_name, workload_id, index):
+    return f"{config_name}-{workload_id}-simpoint{index}"
+
+
+def load_simpoints(workload_id):
+    with open(SIMPOINT_DIR / workload_id / "simpoints.json") as simpoints:
+        return json.load(simpoints)
+
+
+def get_simpoint_resource(simpoints):
+    return SimpointResource(
+        simpoint_interval=simpoints["interval"],
+        simpoint_list=simpoints["simpoints"],
+        weight_list=simpoints["weights"],
+        warmup_interval=simpoints["warmup"],
+    )
+
+
+def get_dumps(stats_file):
+    if not stats_file.exists():
+        return []
+    with open(stats_file) as stats:
+        return stats.read().split("Begin Simulation Statistics")[1:]
+
+
+def get_stat(dump, name):
+    match = re.search(rf"^{re.escape(name)}\s+(\S+)", dump, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def get_ipc(dump):
+    match = re.search(
+        r"^board\.processor\.cores\d*\.core\.ipc\s+(\S+)", dump, re.MULTILINE
+    )
+    return float(match.group(1)) if match else None
+
+
+def create_profile_simulator(workload_id):
+    """Run the workload on an atomic core and record its BBVs."""
+    processor = SimpleProcessor(
+        cpu_type=CPUTypes.ATOMIC, isa=ISA.RISCV, num_cores=1
+    )
+    processor.get_cores()[0].core.addSimPointProbe(SIMPOINT_INTERVAL)
+    board = RISCVBoard(
+        clk_freq="1GHz",
+        processor=processor,
+        cache_hierarchy=NoCache(),
+        memory=DDR4(),
+    )
+    board.set_workload(obtain_resource(workload_id))
+    # The dumps of the stats mark where the region of interest is.
+    return roi.create_roi_simulator(board, id=get_profile_id(workload_id))
+
+
+def create_checkpoint_simulator(workload_id):
+    """Take a checkpoint at the start of the warmup of every SimPoint."""
+    simpoints = load_simpoints(workload_id)
+    board = RISCVBoard(
+        clk_freq="1GHz",
+        processor=SimpleProcessor(
+            cpu_type=CPUTypes.TIMING, isa=ISA.RISCV, num_cores=1
+        ),
+        cache_hierarchy=MESITwoLevelCache(),
+        memory=DDR4(),
+    )
+    binary, arguments = get_binary_and_arguments(workload_id)
+    board.set_se_simpoint_workload(
+        binary=binary,
+        arguments=arguments,
+        simpoint=get_simpoint_resource(simpoints),
+    )
+    return Simulator(
+        board=board,
+        on_exit_event={
+            ExitEvent.SIMPOINT_BEGIN: simpoints_save_checkpoint_generator(
+                get_checkpoint_dir(workload_id), board.get_simpoint()
+            )
+        },
+        id=f"simpoint-checkpoint-{workload_id}",
+    )
+
+
+def create_run_simulator(config_name, workload_id, index):
+    """Restore the checkpoint of one SimPoint, warm up, and simulate one
+    interval. The stats of the interval are the second dump.
+    """
+    simpoints = load_simpoints(workload_id)
+    start = simpoints["simpoints"][index] * simpoints["interval"]
+    warmup = min(simpoints["warmup"], start)
+
+    board = get_board(**get_config(config_name))
+    binary, arguments = get_binary_and_arguments(workload_id)
+    board.set_se_binary_workload(
+        binary=binary,
+        arguments=arguments,
+        # The work items of the workload would dump and reset the stats.
+        exit_on_work_items=False,
+        checkpoint=get_checkpoint_dir(workload_id) / f"cpt.SimPoint{index}",
+    )
+
+    def max_insts_handler():
+        print("End of the warmup. Simulating the SimPoint.")
+        m5.stats.dump()
+        m5.stats.reset()
+        simulator.schedule_max_insts(simpoints["interval"])
+        yield False
+        print("End of the SimPoint.")
+        yield True
+
+    simulator = Simulator(
+        board=board,
+        on_exit_event={ExitEvent.MAX_INSTS: max_insts_handler()},
+        id=get_run_id(config_name, workload_id, index),
+    )
+    # There is no warmup at the start of the program.
+    simulator.schedule_max_insts(max(warmup, 1))
+    return simulator
+
+
+def cluster(workload_id):
+    """Pick the SimPoints of the region of interest of a profiled workload."""
+    from bbv_cluster import pick_simpoints, read_bbv
+
+    outdir = Path("m5out") / get_profile_id(workload_id)
+    points = read_bbv(outdir / "simpoint.bb.gz")
+    # The first dump ends where the region of interest starts and the
+    # second one has the instructions of the region of interest.
+    dumps = roi.read_roi_dumps(outdir / "stats.txt")
+    roi_start = int(get_stat(dumps[0], "simInsts"))
+    roi_end = roi_start + int(get_stat(dumps[roi.ROI_DUMP], "simInsts"))
+    first = roi_start // SIMPOINT_INTERVAL
+    last = min(-(-roi_end // SIMPOINT_INTERVAL), len(points))
+
+    simpoints, weights = pick_simpoints(points[first:last], MAX_K)
+    result = {
+        "interval": SIMPOINT_INTERVAL,
+        "warmup": WARMUP_INTERVAL,
+        "roi": [roi_start, roi_end],
+        "simpoints": [first + simpoint for simpoint in simpoints],
+        "weights": weights,
+    }
+    (SIMPOINT_DIR / workload_id).mkdir(parents=True, exist_ok=True)
+    with open(SIMPOINT_DIR / workload_id / "simpoints.json", "w") as output:
+        json.dump(result, output, indent=4)
+    return result
+
+
+def run_stage(stage, points):
+    environment = dict(os.environ)
+    environment[STAGE_VARIABLE] = stage
+    environment[POINTS_VARIABLE] = json.dumps(points)
+    result = subprocess.run(
+        [
+            os.environ.get("GEM5", "gem5"),
+            "-re",
+            "-m",
+            "gem5.utils.multisim",
+            __file__,
+        ],
+        env=environment,
+    )
+    if result.returncode != 0:
+        print(f"Warning: some {stage} simulations failed.")
+
+
+def get_weighted_ipc(config_name, workload_id):
+    """Return the weighted IPC of the SimPoints, or None if one is missing."""
+    simpoints = load_simpoints(workload_id)
+    cpi = 0.0
+    for index, weight in enumerate(simpoints["weights"]):
+        dumps = get_dumps(
+            Path("m5out")
+            / get_run_id(config_name, workload_id, index)
+            / "stats.txt"
+        )
+        ipc = get_ipc(dumps[1]) if len(dumps) >= 2 else None
+        if not ipc:
+            return None
+        cpi += weight / ipc
+    return sum(simpoints["weights"]) / cpi
+
+
+def get_full_ipc(config_name, workload_id):
+    """The IPC of the region of interest of a full run, if there is one.
+
+    :raises ValueError: if the full run does not have the stats dumps of
+    `roi.create_roi_simulator` (see `roi.read_roi_dumps`).
+    """
+    stats_file = Path("m5out") / f"{config_name}-{workload_id}" / "stats.txt"
+    if not stats_file.exists():
+        return None
+    return get_ipc(roi.get_roi_dump(stats_file))
+
+
+def get_inputs():
+    parser = argparse.ArgumentParser(
+        description="Estimate the IPC of OutOfOrderCPU configurations with "
+        "SimPoints."
+    )
+    parser.add_argument(
+        "--configs",
+        nargs="+",
+        default=["little", "big"],
+        help="The configurations to evaluate.",
+    )
+    return parser.parse_args()
+
+
+if STAGE_VARIABLE in os.environ:
+    # This is one step of the pipeline, run by multisim.
+    multisim.set_num_processes(
+        int(os.environ.get("SIMPOINT_PROCESSES", os.cpu_count()))
+    )
+    stage = os.environ[STAGE_VARIABLE]
+    for point in json.loads(os.environ[POINTS_VARIABLE]):
+        if stage == "profile":
+            multisim.add_simulator(create_profile_simulator(point))
+        elif stage == "checkpoint":
+            multisim.add_simulator(create_checkpoint_simulator(point))
+        elif stage == "run":
+            multisim.add_simulator(create_run_simulator(*point))
+else:
+    args = get_inputs()
+    for name in args.configs:
+        get_config(name)
+    suite = obtain_resource("comparch-benchmarks")
+    workload_ids = [workload.get_id() for workload in suite]
+
+    unprofiled = [
+        workload_id
+        for workload_id in workload_ids
+        if not (SIMPOINT_DIR / workload_id / "simpoints.json").exists()
+    ]
+    to_profile = [
+        workload_id
+        for workload_id in unprofiled
+        if not (
+            Path("m5out") / get_profile_id(workload_id) / "simpoint.bb.gz"
+        ).exists()
+    ]
+    if to_profile:
+        print(f"Profiling {len(to_profile)} workloads")
+        run_stage("profile", to_profile)
+    for workload_id in unprofiled:
+        simpoints = cluster(workload_id)
+        print(
+            f"{workload_id}: {len(simpoints['simpoints'])} SimPoints of "
+            f"{SIMPOINT_INTERVAL} instructions"
+        )
+
+    to_checkpoint = [
+        workload_id
+        for workload_id in workload_ids
+        if not all(
+            (
+                get_checkpoint_dir(workload_id) / f"cpt.SimPoint{index}"
+                / "m5.cpt"
+            ).exists()
+            for index in range(len(load_simpoints(workload_id)["simpoints"]))
+        )
+    ]
+    if to_checkpoint:
+        print(f"Taking the checkpoints of {len(to_checkpoint)} workloads")
+        run_stage("checkpoint", to_checkpoint)
+
+    to_run = [
+        [config_name, workload_id, index]
+        for config_name in args.configs
+        for workload_id in workload_ids
+        for index in range(len(load_simpoints(workload_id)["simpoints"]))
+        if len(
+            get_dumps(
+                Path("m5out")
+                / get_run_id(config_name, workload_id, index)
+                / "stats.txt"
+            )
+        )
+        < 2
+    ]
+    if to_run:
+        print(f"Running {len(to_run)} SimPoints")
+        run_stage("run", to_run)
+
+    print(f"{'config':<28} {'workload':<28} {'IPC':>8} {'full IPC':>9}")
+    for config_name in args.configs:
+        for workload_id in workload_ids:
+            ipc = get_weighted_ipc(config_name, workload_id)
+            full_ipc = get_full_ipc(config_name, workload_id)
+            print(
+                f"{config_name:<28} {workload_id:<28} "
+                f"{ipc if ipc is not None else float('nan'):>8.4f} "
+                f"{full_ipc if full_ipc is not None else float('nan'):>9.4f}"
+            )
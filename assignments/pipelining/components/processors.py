@@ -6,6 +6,12 @@ from gem5.components.processors.cpu_types import CPUTypes
 from gem5.components.processors.simple_processor import SimpleProcessor
 from gem5.components.processors.base_cpu_core import BaseCPUCore
 from gem5.components.processors.base_cpu_processor import BaseCPUProcessor
+from gem5.components.processors.simple_core import SimpleCore
+from gem5.components.boards.abstract_board import AbstractBoard
+from gem5.components.boards.mem_mode import MemMode
+from gem5.components.processors.switchable_processor import (
+    SwitchableProcessor,
+)
 
 from m5.objects import RiscvMinorCPU, MinorFUPool
 from m5.objects import MinorDefaultIntFU, MinorDefaultIntMulFU
@@ -220,6 +226,76 @@ class PipelinedCPU(BaseCPUProcessor):
         ]
         super().__init__(cores)
 
+class FastForwardPipelinedCPU(SwitchableProcessor):
+    def __init__(
+        self,
+        issue_latency: int = 1,
+        int_operation_latency: int = 1,
+        fp_operation_latency: int = 6,
+        fast_forward_type: CPUTypes = CPUTypes.TIMING,
+    ):
+        """
+        FastForwardPipelinedCPU has the same MinorCPU core as PipelinedCPU and
+        a simple core that runs the program up to the region of interest much
+        faster. It starts on the simple core and switches to the MinorCPU core
+        with switch_to_detailed(). See create_fast_forward_simulator in
+        util/roi.py for a simulator that switches at the workload's work
+        begin annotation.
+
+        The simple core is a TimingSimpleCPU by default, since Ruby caches
+        (e.g., MESITwoLevelCache) do not support atomic accesses and there is
+        no KVM for RISC-V. Its memory accesses go through the same caches, so
+        they are warm when the MinorCPU core takes over. Use CPUTypes.ATOMIC
+        only with a classic cache hierarchy.
+
+        :param issue_latency: number of cycles it takes to decode and issue
+        an instruction
+        :param int_operation_latency: number of cycles it takes to execute
+        an integer instruction
+        :param fp_operation_latency: number of cycles it takes to execute
+        a floating point/SIMD instruction
+        :param fast_forward_type: the CPU type of the simple core
+        """
+        # The cores are named after the keys in the stats, e.g.,
+        # board.processor.detailed.core.ipc, not board.processor.cores0.
+        super().__init__(
+            switchable_cores={
+                "detailed": [
+                    MinorCPUStdCore(
+                        int_operation_latency,
+                        issue_latency,
+                        fp_operation_latency,
+                        issue_latency,
+                    )
+                ],
+                "fast_forward": [
+                    SimpleCore(fast_forward_type, core_id=0, isa=ISA.RISCV)
+                ],
+            },
+            starting_cores="fast_forward",
+        )
+        self._fast_forward_type = fast_forward_type
+
+    def switch_to_detailed(self):
+        """
+        Switch from the simple core to the MinorCPU core.
+        """
+        self.switch_to_processor("detailed")
+
+    def incorporate_processor(self, board: AbstractBoard) -> None:
+        super().incorporate_processor(board)
+        # Unlike SimpleSwitchableProcessor, SwitchableProcessor doesn't set
+        # the memory mode of the board, which is atomic by default. The
+        # detailed core needs the timing mode, and m5.switchCpus changes it
+        # when an atomic simple core switches to it.
+        if (
+            self._fast_forward_type == CPUTypes.ATOMIC
+            and not board.get_cache_hierarchy().is_ruby()
+        ):
+            board.set_mem_mode(MemMode.ATOMIC)
+        else:
+            board.set_mem_mode(MemMode.TIMING)
+
 class SingleCycleCPU(SimpleProcessor):
     """
     SingleCycleCPU models a single core CPU with support for the Arm
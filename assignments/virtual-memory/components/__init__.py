@@ -1,11 +1,30 @@
 # Copyright (c) 2025 Jason Lowe-Power
 # SPDX-License-Identifier: BSD-3-Clause
 
-from .flexiblepwc import SmallPWCHierarchy, LargePWCHierarchy
+from .flexiblepwc import (
+    PageWalkCacheHierarchy,
+    SmallPWCHierarchy,
+    LargePWCHierarchy,
+)
 from .processors import create_processor
+from .simulation import (
+    HUGE_PAGE_WORKLOADS,
+    MULTITHREADED_WORKLOADS,
+    PAGE_SIZES,
+    create_board,
+    create_simulator,
+    get_simulator_id,
+)
 
 __all__ = [
+    "PageWalkCacheHierarchy",
     "SmallPWCHierarchy",
     "LargePWCHierarchy",
     "create_processor",
+    "create_board",
+    "create_simulator",
+    "get_simulator_id",
+    "PAGE_SIZES",
+    "HUGE_PAGE_WORKLOADS",
+    "MULTITHREADED_WORKLOADS",
 ]
@@ -0,0 +1,103 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""A cache of checkpoints of the booted full system.
+
+Booting the OS is the same for every TLB and page walk cache configuration,
+so it only has to happen once. The first FS run boots with KVM and saves a
+checkpoint when `after_boot.sh` starts. Every later run with the same kernel,
+disk image, readfile, kernel arguments, memory size, and number of cores
+restores from that checkpoint straight into the Timing CPU.
+
+The checkpoints are in `checkpoints/boot-<hash>`. Delete the directory to
+force a new boot.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import List
+
+import m5
+
+CHECKPOINT_DIR = Path("checkpoints")
+
+# Hashing a multi-gigabyte disk image takes a while, so the hash of every
+# file is remembered until its size or modification time changes.
+FILE_HASHES = CHECKPOINT_DIR / "file-hashes.json"
+
+
+def hash_file(path: Path) -> str:
+    path = Path(path).resolve()
+    stat = path.stat()
+    file_key = f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    with open(FILE_HASHES.with_suffix(".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        hashes = {}
+        if FILE_HASHES.exists():
+            with open(FILE_HASHES) as hashes_file:
+                hashes = json.load(hashes_file)
+        if file_key not in hashes:
+            digest = hashlib.sha256()
+            with open(path, "rb") as data:
+                for block in iter(lambda: data.read(1 << 24), b""):
+                    digest.update(block)
+            hashes[file_key] = digest.hexdigest()
+            with open(FILE_HASHES, "w") as hashes_file:
+                json.dump(hashes, hashes_file, indent=4)
+        return hashes[file_key]
+
+
+class BootCheckpoint:
+    """The checkpoint of a booted system.
+
+    The checkpoint is saved to a temporary directory and renamed into place,
+    so a run never sees a partial checkpoint. If several runs boot at the
+    same time (e.g., the first sweep), the first one to finish provides the
+    checkpoint.
+    """
+
+    def __init__(
+        self,
+        kernel: Path,
+        disk_image: Path,
+        readfile: Path,
+        kernel_args: List[str],
+        memory_size: str,
+        num_cores: int = 1,
+    ) -> None:
+        key = hashlib.sha256(
+            json.dumps(
+                {
+                    "kernel": hash_file(kernel),
+                    "disk_image": hash_file(disk_image),
+                    "readfile": hash_file(readfile),
+                    "kernel_args": list(kernel_args),
+                    "memory_size": memory_size,
+                    "num_cores": num_cores,
+                },
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()
+        # gem5 resolves relative checkpoint paths against the output
+        # directory, which is different for every run.
+        self.path = (CHECKPOINT_DIR / f"boot-{key[:16]}").resolve()
+
+    def exists(self) -> bool:
+        return (self.path / "m5.cpt").exists()
+
+    def save(self) -> None:
+        """Save the checkpoint of the running simulation."""
+        staging = self.path.with_name(f"{self.path.name}.tmp-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        m5.checkpoint(str(staging))
+        try:
+            staging.rename(self.path)
+        except OSError:
+            # Another run saved the same checkpoint first.
+            shutil.rmtree(staging, ignore_errors=True)
@@ -1,48 +1,109 @@
 # Copyright (c) 2025 Jason Lowe-Power
 # SPDX-License-Identifier: BSD-3-Clause
 
+from typing import Optional
+
 from gem5.components.cachehierarchies.classic.private_l1_private_l2_cache_hierarchy import (
     PrivateL1PrivateL2CacheHierarchy,
 )
 from gem5.components.boards.abstract_board import AbstractBoard
 from gem5.components.cachehierarchies.classic.caches.mmu_cache import MMUCache
 
+from m5.objects import L2XBar
+
 class PageWalkCacheHierarchy(PrivateL1PrivateL2CacheHierarchy):
     """
-    A cache hierarchy with configurable page walk cache sizes that extends
-    the PrivateL1PrivateL2CacheHierarchy
+    A cache hierarchy with configurable page walk caches that extends the
+    PrivateL1PrivateL2CacheHierarchy.
+
+    Each core has an instruction (iptw) and a data (dptw) page walk cache in
+    front of its L2 with their own size, associativity, and latency.
+    Optionally, both walker caches of a core share a second level page walk
+    cache between them and the L2.
     """
     def __init__(
         self,
         l1d_size: str,
         l1i_size: str,
         l2_size: str,
-        pwc_size: str = "8KiB"
+        pwc_size: str = "8KiB",
+        iptw_size: Optional[str] = None,
+        iptw_assoc: int = 4,
+        iptw_latency: int = 1,
+        dptw_size: Optional[str] = None,
+        dptw_assoc: int = 4,
+        dptw_latency: int = 1,
+        l2_pwc_size: Optional[str] = None,
+        l2_pwc_assoc: int = 8,
+        l2_pwc_latency: int = 4,
     ) -> None:
+        """
+        :param pwc_size: The size of the walker caches that are not given a
+            size of their own.
+        :param iptw_size: The size of the instruction page walk cache.
+        :param iptw_assoc: The associativity of the instruction page walk
+            cache.
+        :param iptw_latency: The tag, data, and response latency of the
+            instruction page walk cache in cycles.
+        :param dptw_size: The size of the data page walk cache.
+        :param dptw_assoc: The associativity of the data page walk cache.
+        :param dptw_latency: The tag, data, and response latency of the data
+            page walk cache in cycles.
+        :param l2_pwc_size: The size of the second level page walk cache
+            shared by the instruction and data walkers of a core. There is
+            no second level if this is None.
+        :param l2_pwc_assoc: The associativity of the second level page walk
+            cache.
+        :param l2_pwc_latency: The tag, data, and response latency of the
+            second level page walk cache in cycles.
+        """
         super().__init__(
             l1d_size=l1d_size,
             l1i_size=l1i_size,
             l2_size=l2_size,
         )
-        self._pwc_size = pwc_size
+        self._iptw_params = (iptw_size or pwc_size, iptw_assoc, iptw_latency)
+        self._dptw_params = (dptw_size or pwc_size, dptw_assoc, dptw_latency)
+        self._l2_pwc_params = (l2_pwc_size, l2_pwc_assoc, l2_pwc_latency)
+
+    def _create_pwc(self, size: str, assoc: int, latency: int) -> MMUCache:
+        return MMUCache(
+            size=size,
+            assoc=assoc,
+            tag_latency=latency,
+            data_latency=latency,
+            response_latency=latency,
+        )
 
     def incorporate_cache(self, board: AbstractBoard) -> None:
+        num_cores = board.get_processor().get_num_cores()
         # Then setup our custom-sized PTW caches
         self.iptw_caches = [
-            MMUCache(size=self._pwc_size)
-            for _ in range(board.get_processor().get_num_cores())
+            self._create_pwc(*self._iptw_params) for _ in range(num_cores)
         ]
         self.dptw_caches = [
-            MMUCache(size=self._pwc_size)
-            for _ in range(board.get_processor().get_num_cores())
+            self._create_pwc(*self._dptw_params) for _ in range(num_cores)
         ]
+        if self._l2_pwc_params[0] is not None:
+            self.l2_pwcs = [
+                self._create_pwc(*self._l2_pwc_params)
+                for _ in range(num_cores)
+            ]
+            self.l2_pwc_buses = [L2XBar() for _ in range(num_cores)]
 
         super().incorporate_cache(board)
 
-        # Connect the PTW caches to the L2 buses
+        # Connect the PTW caches to the L2 buses, through the second level
+        # page walk cache if there is one.
         for i, _ in enumerate(board.get_processor().get_cores()):
-            self.iptw_caches[i].mem_side = self.l2buses[i].cpu_side_ports
-            self.dptw_caches[i].mem_side = self.l2buses[i].cpu_side_ports
+            if self._l2_pwc_params[0] is not None:
+                pwc_bus = self.l2_pwc_buses[i]
+                pwc_bus.mem_side_ports = self.l2_pwcs[i].cpu_side
+                self.l2_pwcs[i].mem_side = self.l2buses[i].cpu_side_ports
+            else:
+                pwc_bus = self.l2buses[i]
+            self.iptw_caches[i].mem_side = pwc_bus.cpu_side_ports
+            self.dptw_caches[i].mem_side = pwc_bus.cpu_side_ports
 
     def _connect_table_walker(self, cpu_id: int, cpu) -> None:
         cpu.connect_walker_ports(
@@ -51,24 +112,27 @@ class PageWalkCacheHierarchy(PrivateL1PrivateL2CacheHierarchy):
         )
 
 class SmallPWCHierarchy(PageWalkCacheHierarchy):
-    def __init__(self) -> None:
+    def __init__(self, **pwc_options) -> None:
         super().__init__(
             l1d_size="32KiB",
             l1i_size="32KiB",
             l2_size="512KiB",
-            pwc_size="1KiB"
+            pwc_size="1KiB",
+            **pwc_options,
         )
 
 class LargePWCHierarchy(PageWalkCacheHierarchy):
-    def __init__(self) -> None:
+    def __init__(self, **pwc_options) -> None:
         super().__init__(
             l1d_size="32KiB",
             l1i_size="32KiB",
             l2_size="512KiB",
-            pwc_size="16KiB"
+            pwc_size="16KiB",
+            **pwc_options,
         )
 
 __all__ = [
+    "PageWalkCacheHierarchy",
     "SmallPWCHierarchy",
     "LargePWCHierarchy",
 ]
@@ -1,37 +1,119 @@
 # Copyright (c) 2025 Jason Lowe-Power
 # SPDX-License-Identifier: BSD-3-Clause
 
-from gem5.components.processors.cpu_types import CPUTypes
-from gem5.components.processors.simple_switchable_processor import SimpleSwitchableProcessor
+from typing import List, Optional
+
+from gem5.components.boards.abstract_board import AbstractBoard
+from gem5.components.processors.cpu_types import CPUTypes, get_mem_mode
+from gem5.components.processors.simple_core import SimpleCore
 from gem5.components.processors.simple_processor import SimpleProcessor
+from gem5.components.processors.switchable_processor import SwitchableProcessor
 from gem5.isas import ISA
 
-def create_processor(fs_mode: bool, tlb_entries: int):
+
+class StartSwitchProcessor(SwitchableProcessor):
+    """A switchable processor made of the given "start" and "switch" cores.
+
+    It is like `SimpleSwitchableProcessor`, but the cores are created by the
+    caller, which keeps references to them (e.g., to set their TLB sizes).
+    The processor starts on the start cores, and `switch()` switches between
+    the two lists.
+    """
+
+    def __init__(
+        self,
+        start_cores: List[SimpleCore],
+        switch_cores: List[SimpleCore],
+        starting_core_type: CPUTypes,
+    ):
+        self._current_is_start = True
+        self._mem_mode = get_mem_mode(starting_core_type)
+        super().__init__(
+            switchable_cores={"start": start_cores, "switch": switch_cores},
+            starting_cores="start",
+        )
+
+    def incorporate_processor(self, board: AbstractBoard) -> None:
+        super().incorporate_processor(board)
+        board.set_mem_mode(self._mem_mode)
+
+    def switch(self) -> None:
+        if self._current_is_start:
+            self.switch_to_processor("switch")
+        else:
+            self.switch_to_processor("start")
+        self._current_is_start = not self._current_is_start
+
+
+def create_cores(cpu_type: CPUTypes, num_cores: int) -> List[SimpleCore]:
+    return [
+        SimpleCore(cpu_type=cpu_type, core_id=i, isa=ISA.X86)
+        for i in range(num_cores)
+    ]
+
+
+def set_tlb_sizes(
+    cores, tlb_entries: int, itb_entries: Optional[int] = None
+) -> None:
+    """Set the number of data (and instruction) TLB entries of every core.
+
+    The X86 TLBs are fully associative, so the number of entries is the only
+    parameter. If `itb_entries` is None, the instruction TLB keeps its default
+    size.
+    """
+    for core in cores:
+        core.core.mmu.dtb.size = tlb_entries
+        if itb_entries is not None:
+            core.core.mmu.itb.size = itb_entries
+
+
+def create_processor(
+    fs_mode: bool,
+    tlb_entries: int,
+    itb_entries: Optional[int] = None,
+    num_cores: int = 1,
+    restore_checkpoint: bool = False,
+):
     """Create a processor based on the mode (FS or SE) and TLB entries.
 
     Args:
         fs_mode: If True, creates a switchable processor for FS mode
-        tlb_entries: Number of TLB entries to configure
+        tlb_entries: Number of data TLB entries to configure
+        itb_entries: Number of instruction TLB entries to configure, or None
+            for the default
+        num_cores: Number of cores
+        restore_checkpoint: If True, the FS mode processor starts with the
+            Timing CPU to continue from a checkpoint of the booted system
 
     Returns:
-        A configured processor (either SimpleSwitchableProcessor or SimpleProcessor)
+        A configured processor (either StartSwitchProcessor or SimpleProcessor)
     """
-    if fs_mode:
-        processor = SimpleSwitchableProcessor(
-            starting_core_type=CPUTypes.KVM,
-            switch_core_type=CPUTypes.TIMING,
-            isa=ISA.X86,
-            num_cores=1,
+    if fs_mode and restore_checkpoint:
+        # The checkpoint is taken before switching away from the KVM cores,
+        # so the cores to restore into have to be the starting cores.
+        start_cores = create_cores(CPUTypes.TIMING, num_cores)
+        switch_cores = create_cores(CPUTypes.TIMING, num_cores)
+        processor = StartSwitchProcessor(
+            start_cores, switch_cores, CPUTypes.TIMING
+        )
+        cores = start_cores + switch_cores
+    elif fs_mode:
+        start_cores = create_cores(CPUTypes.KVM, num_cores)
+        switch_cores = create_cores(CPUTypes.TIMING, num_cores)
+        for core in start_cores:
+            core.core.usePerf = False
+        processor = StartSwitchProcessor(
+            start_cores, switch_cores, CPUTypes.KVM
         )
-        for proc in processor.start:
-            proc.core.usePerf = False
-        processor._switchable_cores['switch'][0].core.mmu.dtb.size = tlb_entries
+        # Only the switch cores simulate the TLBs.
+        cores = switch_cores
     else:
         processor = SimpleProcessor(
             cpu_type=CPUTypes.TIMING,
             isa=ISA.X86,
-            num_cores=1,
+            num_cores=num_cores,
         )
-        processor.cores[0].core.mmu.dtb.size = tlb_entries
+        cores = processor.get_cores()
+    set_tlb_sizes(cores, tlb_entries, itb_entries)
 
     return processor
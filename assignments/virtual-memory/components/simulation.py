@@ -0,0 +1,326 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Builds the board and the simulator for one virtual memory experiment.
+
+This is shared by `run.py`, which runs one configuration, and `sweep.py`,
+which runs a grid of configurations with multisim.
+"""
+
+from gem5.components.boards.x86_board import X86Board
+from gem5.components.memory.single_channel import SingleChannelDDR4_2400
+from gem5.resources.resource import obtain_resource
+from gem5.simulate.exit_event import ExitEvent
+from gem5.simulate.simulator import Simulator
+
+from typing import Optional, Tuple
+
+import m5
+
+from .boot_checkpoint import BootCheckpoint
+from .flexiblepwc import SmallPWCHierarchy, LargePWCHierarchy
+from .processors import create_processor
+
+MEMORY_SIZE = "3GiB"
+
+# The page sizes that workloads can use and the suffix of the resources that
+# run a workload with that page size. The huge page resources are only
+# available in FS mode and for some of the workloads.
+PAGE_SIZES = {"4KiB": "", "2MiB": "_hugepages"}
+HUGE_PAGE_WORKLOADS = ["bfs", "bubble"]
+
+# Multithreaded workloads, which are the array_sum binaries. They only run in
+# SE mode, where every thread needs a core of its own, so they run one worker
+# thread on every core but the one of the main thread.
+MULTITHREADED_WORKLOADS = ["array_sum_naive", "array_sum_chunking"]
+# The largest array that array_sum accepts.
+ARRAY_SUM_LENGTH = 65536
+
+
+def get_pwc_name(pwc_size: str, pwc_options: Optional[dict] = None) -> str:
+    """A short name for a page walk cache configuration, e.g., "small" or
+    "small-dptw_assoc8-l2_pwc_size64KiB".
+    """
+    options = pwc_options or {}
+    return "-".join(
+        [pwc_size] + [f"{name}{options[name]}" for name in sorted(options)]
+    )
+
+
+def get_resource_ids(
+    workload_name: str, fs: bool, page_size: str = "4KiB"
+) -> Tuple[str, Optional[str]]:
+    """Return the ids of the workload resource and, in FS mode, of the
+    readfile resource of a workload, e.g., "bfs_hugepages_fs_run" and
+    "bfs_hugepages-fs". The resource of a multithreaded workload is its
+    binary.
+    """
+    if page_size not in PAGE_SIZES:
+        raise ValueError(f"Invalid page_size {page_size}")
+    if page_size != "4KiB" and not (
+        fs and workload_name in HUGE_PAGE_WORKLOADS
+    ):
+        raise ValueError(
+            f"{page_size} pages are only supported in FS mode for "
+            f"{', '.join(HUGE_PAGE_WORKLOADS)}"
+        )
+    if workload_name in MULTITHREADED_WORKLOADS:
+        if fs:
+            raise ValueError(f"{workload_name} only runs in SE mode")
+        return workload_name, None
+    if not fs:
+        return f"{workload_name}_x86_run", None
+    suffix = PAGE_SIZES[page_size]
+    return f"{workload_name}{suffix}_fs_run", f"{workload_name}{suffix}-fs"
+
+
+def get_simulator_id(
+    workload_name: str,
+    fs: bool,
+    tlb_entries: int,
+    pwc_size: str,
+    pwc_options: Optional[dict] = None,
+    page_size: str = "4KiB",
+    itb_entries: Optional[int] = None,
+    num_cores: int = 1,
+) -> str:
+    """The id of a configuration. Its output goes to `m5out/<id>`.
+
+    Runs with 4KiB pages keep the ids they had before the page size was
+    configurable. Other page sizes are part of the workload name, e.g.,
+    "fs-bfs_2MiB_pages-16-small_pwc". Likewise, the instruction TLB size is
+    only part of the id if it is set, e.g., "se-bfs-16-itb32-small_pwc", and
+    the number of cores if there is more than one, e.g.,
+    "se-array_sum_naive_4cores-16-small_pwc".
+    """
+    mode = "fs" if fs else "se"
+    if page_size != "4KiB":
+        workload_name = f"{workload_name}_{page_size}_pages"
+    if num_cores != 1:
+        workload_name = f"{workload_name}_{num_cores}cores"
+    tlb_name = str(tlb_entries)
+    if itb_entries is not None:
+        tlb_name += f"-itb{itb_entries}"
+    pwc_name = get_pwc_name(pwc_size, pwc_options)
+    return f"{mode}-{workload_name}-{tlb_name}-{pwc_name}_pwc"
+
+
+def create_board(
+    workload_name: str,
+    fs: bool,
+    tlb_entries: int,
+    pwc_size: str,
+    pwc_options: Optional[dict] = None,
+    page_size: str = "4KiB",
+    itb_entries: Optional[int] = None,
+    num_cores: int = 1,
+    restore_checkpoint: bool = False,
+) -> X86Board:
+    """Create the board for a configuration with its workload set.
+
+    :param pwc_options: Keyword arguments of `PageWalkCacheHierarchy` that
+    override the page walk caches of the `pwc_size` configuration.
+    :param page_size: The page size of the workload, "4KiB" or "2MiB".
+    :param itb_entries: The number of instruction TLB entries, or None for
+    the default.
+    :param num_cores: The number of cores, each with its own TLBs and page
+    walk caches.
+    :param restore_checkpoint: The FS mode board starts on the Timing CPU to
+    continue from a boot checkpoint.
+    """
+    pwc_options = pwc_options or {}
+    workload_id, readfile_id = get_resource_ids(workload_name, fs, page_size)
+    if workload_name in MULTITHREADED_WORKLOADS and num_cores < 2:
+        raise ValueError(f"{workload_name} needs at least 2 cores")
+    # Use the new FlexiblePWC class
+    if pwc_size == "small":
+        cache_hierarchy = SmallPWCHierarchy(**pwc_options)
+    elif pwc_size == "large":
+        cache_hierarchy = LargePWCHierarchy(**pwc_options)
+    else:
+        raise ValueError("Invalid pwc_size")
+
+    # Main memory
+    memory = SingleChannelDDR4_2400(size=MEMORY_SIZE)
+
+    # Use create_processor since we need to do something weird for FS mode
+    processor = create_processor(
+        fs_mode=fs,
+        tlb_entries=tlb_entries,
+        itb_entries=itb_entries,
+        num_cores=num_cores,
+        restore_checkpoint=restore_checkpoint,
+    )
+
+    board = X86Board(
+        clk_freq="3GHz",
+        processor=processor,
+        memory=memory,
+        cache_hierarchy=cache_hierarchy,
+    )
+
+    if workload_name in MULTITHREADED_WORKLOADS:
+        board.set_se_binary_workload(
+            obtain_resource(workload_id),
+            arguments=[str(ARRAY_SUM_LENGTH), str(num_cores - 1)],
+        )
+    else:
+        board.set_workload(obtain_resource(workload_id))
+    if fs:
+        # Hack to get around readfile being a string and not a FileResource
+        board.readfile = obtain_resource(readfile_id).get_local_path()
+
+    return board
+
+
+def get_boot_checkpoint(
+    workload_name: str, page_size: str = "4KiB", num_cores: int = 1
+) -> BootCheckpoint:
+    workload_id, readfile_id = get_resource_ids(workload_name, True, page_size)
+    parameters = obtain_resource(workload_id).get_parameters()
+    return BootCheckpoint(
+        kernel=parameters["kernel"].get_local_path(),
+        disk_image=parameters["disk_image"].get_local_path(),
+        readfile=obtain_resource(readfile_id).get_local_path(),
+        kernel_args=parameters.get("kernel_args", []),
+        memory_size=MEMORY_SIZE,
+        num_cores=num_cores,
+    )
+
+
+# Note: this is only used in FS mode.
+def exit_event_handler(processor, boot_checkpoint=None):
+    print("First exit: kernel booted")
+    yield False  # gem5 is now executing systemd startup
+    print("Second exit: Started `after_boot.sh` script")
+    # The after_boot.sh script is executed after the kernel and systemd have
+    # booted.
+    if boot_checkpoint is not None:
+        # Everything up to here is the same for every configuration.
+        boot_checkpoint.save()
+        print(f"Saved boot checkpoint to {boot_checkpoint.path}")
+        print("Switching to Timing CPU")
+        processor.switch()
+        yield False  # gem5 is now executing the `after_boot.sh` script
+        yield from after_boot_exit_event_handler()
+        return
+    yield False  # gem5 is now executing the `after_boot.sh` script
+
+    print("Switching to Timing CPU")
+    processor.switch()
+    yield False  # gem5 is now executing the program. The application_command
+    # has an extra exit command to switch CPUs
+    # This is required since we're using the instruction version
+    # of the gem5 hypercalls.
+
+    print("Third exit: Finished `after_boot.sh` script")
+    # The after_boot.sh script will run a script if it is passed via
+    # m5 readfile. This is the last exit event before the simulation exits.
+    yield True  # End the simulation
+
+
+# Note: this is only used in FS mode after the second exit, when the system
+# is already running on the Timing CPU (e.g., after restoring the boot
+# checkpoint).
+def after_boot_exit_event_handler():
+    print("Already on the Timing CPU")
+    yield False  # gem5 is now executing the program. The application_command
+    # has an extra exit command to switch CPUs, which we no longer need.
+
+    print("Third exit: Finished `after_boot.sh` script")
+    yield True  # End the simulation
+
+
+def workbegin_handler(stats_period: Optional[int] = None):
+    # Here we switch the CPU type to Timing.
+    m5.stats.reset()
+    print("reset stats at beginning of work")
+    if stats_period:
+        # The periodic dumps do not reset the stats, so each dump has the
+        # totals since the beginning of the work.
+        m5.stats.periodicStatDump(stats_period)
+        print(f"dumping stats every {stats_period} ticks")
+    yield False
+
+
+def workend_handler():
+    print("At workend. Exiting")
+    yield True  # End the simulation
+
+
+def create_simulator(
+    workload_name: str,
+    fs: bool,
+    tlb_entries: int,
+    pwc_size: str,
+    pwc_options: Optional[dict] = None,
+    page_size: str = "4KiB",
+    itb_entries: Optional[int] = None,
+    num_cores: int = 1,
+    boot_checkpoint: bool = False,
+    stats_period: Optional[int] = None,
+) -> Simulator:
+    """Create the simulator for a configuration.
+
+    :param workload_name: "bfs", "bubble", "mm_block_ik", or one of the
+    `MULTITHREADED_WORKLOADS`.
+    :param fs: Run in full system mode instead of syscall emulation mode.
+    :param tlb_entries: The number of data TLB entries.
+    :param pwc_size: The size of the page walk caches, "small" or "large".
+    :param pwc_options: Keyword arguments of `PageWalkCacheHierarchy` that
+    override parts of the `pwc_size` configuration, e.g., `dptw_assoc` or
+    `l2_pwc_size`.
+    :param page_size: "4KiB", or "2MiB" to run the huge page version of the
+    workload (FS mode and `HUGE_PAGE_WORKLOADS` only).
+    :param itb_entries: The number of instruction TLB entries, or None for
+    the default.
+    :param num_cores: The number of cores. The multithreaded workloads need
+    at least 2.
+    :param boot_checkpoint: In FS mode, restore from the cached checkpoint of
+    the booted system, or boot and create it if there is none yet.
+    :param stats_period: Dump the stats every `stats_period` ticks during the
+    region of interest, e.g., for `walk_timeline.py`.
+    """
+    checkpoint = None
+    restore = False
+    if fs and boot_checkpoint:
+        checkpoint = get_boot_checkpoint(workload_name, page_size, num_cores)
+        restore = checkpoint.exists()
+
+    board = create_board(
+        workload_name,
+        fs,
+        tlb_entries,
+        pwc_size,
+        pwc_options,
+        page_size,
+        itb_entries=itb_entries,
+        num_cores=num_cores,
+        restore_checkpoint=restore,
+    )
+    if restore:
+        print(f"Restoring boot checkpoint from {checkpoint.path}")
+        exit_handler = after_boot_exit_event_handler()
+    else:
+        exit_handler = exit_event_handler(board.get_processor(), checkpoint)
+    return Simulator(
+        board=board,
+        on_exit_event={
+            # Here we want override the default behavior for the first m5
+            # exit exit event.
+            ExitEvent.EXIT: exit_handler,
+            ExitEvent.WORKBEGIN: workbegin_handler(stats_period),
+            ExitEvent.WORKEND: workend_handler(),
+        },
+        checkpoint_path=checkpoint.path if restore else None,
+        id=get_simulator_id(
+            workload_name,
+            fs,
+            tlb_entries,
+            pwc_size,
+            pwc_options,
+            page_size,
+            itb_entries,
+            num_cores,
+        ),
+    )
@@ -8,8 +8,12 @@ designs, specifically analyzing the tradeoff between TLB size and page walk cach
 configuration. It supports both full system (FS) and syscall emulation (SE) modes,
 and allows configuration of:
 - TLB entries: Number of TLB entries (e.g., 16, 32)
+- ITB entries: Number of instruction TLB entries (gem5's default if not set)
 - Page walk cache size: Small or large configuration
-- Workloads: Different memory-intensive benchmarks (bfs, mm_block_ik)
+- Workloads: Different memory-intensive benchmarks (bfs, bubble, mm_block_ik)
+- Page size: 4KiB pages, or 2MiB huge pages (FS mode, bfs and bubble only)
+- Cores: Number of cores, each with its own TLBs and page walk caches. The
+  multithreaded array_sum workloads (SE mode only) run one thread per core.
 
 The script uses gem5's X86 board with a switchable processor that starts with KVM
 (for fast boot in FS mode) and switches to detailed timing mode for the workload
@@ -19,26 +23,45 @@ Usage
 -----
 
 ```
-gem5 run.py <workload_name> [--fs] [--tlb_entries entries] [--pwc_size large|small]
+gem5 run.py <workload_name> [--fs] [--tlb_entries entries] [--itb_entries entries] [--num_cores cores] [--pwc_size large|small] [--page_size 4KiB|2MiB] [--boot_checkpoint] [--stats_period ticks]
 ```
+
+The page walk caches of the `--pwc_size` configuration can be changed with
+`--{iptw,dptw}_{size,assoc,latency}`, and `--l2_pwc_{size,assoc,latency}`
+adds a second level page walk cache. The options that are set are part of
+the output directory name.
+
+With `--boot_checkpoint`, FS mode boots the OS only once and saves a
+checkpoint under `checkpoints/`. Later runs restore from it straight into the
+Timing CPU.
+
+With `--page_size 2MiB`, the workload runs on the huge page version of its
+disk image. The page size is part of the output directory name, e.g.,
+`m5out/fs-bfs_2MiB_pages-16-small_pwc`. Use `tlb_report.py` to compare the
+TLB miss rates and reach of the runs.
+
+With `--stats_period ticks`, the stats are dumped periodically during the
+region of interest. `walk_timeline.py` turns the dumps into the page walk
+rate, depth, and latency of each interval, so you can see when the walks of
+a workload get expensive.
+
+To run every configuration, use `sweep.py` instead.
 """
 
-from gem5.components.boards.x86_board import X86Board
-from gem5.components.memory.single_channel import SingleChannelDDR4_2400
-from gem5.resources.resource import obtain_resource
-from gem5.simulate.exit_event import ExitEvent
-from gem5.simulate.simulator import Simulator
-from components import SmallPWCHierarchy, LargePWCHierarchy
-from components.processors import create_processor
+from components import (
+    HUGE_PAGE_WORKLOADS,
+    MULTITHREADED_WORKLOADS,
+    PAGE_SIZES,
+    create_simulator,
+)
 
-import m5
 import argparse
 from pathlib import Path
 
 parser = argparse.ArgumentParser(description="Run gem5 simulation")
 parser.add_argument(
     "workload_name",
-    choices=["bfs", "mm_block_ik"],
+    choices=["bfs", "bubble", "mm_block_ik"] + MULTITHREADED_WORKLOADS,
     help="The workload to run.",
 )
 parser.add_argument(
@@ -53,6 +76,20 @@ parser.add_argument(
     default=16,
     help="The number of TLB entries to use.",
 )
+parser.add_argument(
+    "--itb_entries",
+    type=int,
+    default=None,
+    help="The number of instruction TLB entries to use. Uses the gem5 "
+    "default if not set.",
+)
+parser.add_argument(
+    "--num_cores",
+    type=int,
+    default=1,
+    help="The number of cores. The multithreaded workloads need at least 2: "
+    "one for the main thread and one per worker thread.",
+)
 parser.add_argument(
     "--pwc_size",
     type=str,
@@ -60,87 +97,98 @@ parser.add_argument(
     choices=["small", "large"],
     help="The size of the page walk cache.",
 )
-args = parser.parse_args()
-
-workload_name = args.workload_name
-
-# Use the new FlexiblePWC class
-if args.pwc_size == "small":
-    cache_hierarchy = SmallPWCHierarchy()
-elif args.pwc_size == "large":
-    cache_hierarchy = LargePWCHierarchy()
-else:
-    raise ValueError("Invalid pwc_size")
-
-# Main memory
-memory = SingleChannelDDR4_2400(size="3GiB")
-
-# Use create_processor since we need to do something weird for FS mode
-processor = create_processor(fs_mode=args.fs, tlb_entries=args.tlb_entries)
-
-board = X86Board(
-    clk_freq="3GHz",
-    processor=processor,
-    memory=memory,
-    cache_hierarchy=cache_hierarchy,
+for walker in ["iptw", "dptw"]:
+    parser.add_argument(
+        f"--{walker}_size",
+        type=str,
+        default=None,
+        help=f"Size of the {walker} page walk caches. Overrides --pwc_size.",
+    )
+    parser.add_argument(
+        f"--{walker}_assoc",
+        type=int,
+        default=None,
+        help=f"Associativity of the {walker} page walk caches.",
+    )
+    parser.add_argument(
+        f"--{walker}_latency",
+        type=int,
+        default=None,
+        help=f"Latency of the {walker} page walk caches in cycles.",
+    )
+parser.add_argument(
+    "--l2_pwc_size",
+    type=str,
+    default=None,
+    help="Size of a second level page walk cache shared by the iptw and "
+    "dptw caches of a core. No second level if not set.",
 )
-
-if args.fs:
-    workload_fs = obtain_resource(f"{workload_name}_fs_run")
-    board.set_workload(workload_fs)
-    # Hack to get around readfile being a string and not a FileResource
-    board.readfile = obtain_resource(f"{workload_name}-fs").get_local_path()
-else:
-    workload_se = obtain_resource(f"{workload_name}_x86_run")
-    board.set_workload(workload_se)
-
-
-# Note: this is only used in FS mode.
-def exit_event_handler():
-    print("First exit: kernel booted")
-    yield False  # gem5 is now executing systemd startup
-    print("Second exit: Started `after_boot.sh` script")
-    # The after_boot.sh script is executed after the kernel and systemd have
-    # booted.
-    yield False  # gem5 is now executing the `after_boot.sh` script
-
-    print("Switching to Timing CPU")
-    processor.switch()
-    yield False  # gem5 is now executing the program. The application_command
-    # has an extra exit command to switch CPUs
-    # This is required since we're using the instruction version
-    # of the gem5 hypercalls.
-
-    print("Third exit: Finished `after_boot.sh` script")
-    # The after_boot.sh script will run a script if it is passed via
-    # m5 readfile. This is the last exit event before the simulation exits.
-    yield True  # End the simulation
-
-
-def workbegin_handler():
-    # Here we switch the CPU type to Timing.
-    m5.stats.reset()
-    print("reset stats at beginning of work")
-    yield False
-
-
-def workend_handler():
-    print("At workend. Exiting")
-    yield True  # End the simulation
-
-
-simulator = Simulator(
-    board=board,
-    on_exit_event={
-        # Here we want override the default behavior for the first m5 exit
-        # exit event.
-        ExitEvent.EXIT: exit_event_handler(),
-        ExitEvent.WORKBEGIN: workbegin_handler(),
-        ExitEvent.WORKEND: workend_handler(),
-    },
-    id=f"{'fs' if args.fs else 'se'}-{workload_name}-{args.tlb_entries}-{args.pwc_size}_pwc",
+parser.add_argument(
+    "--l2_pwc_assoc",
+    type=int,
+    default=None,
+    help="Associativity of the second level page walk cache.",
+)
+parser.add_argument(
+    "--l2_pwc_latency",
+    type=int,
+    default=None,
+    help="Latency of the second level page walk cache in cycles.",
+)
+parser.add_argument(
+    "--page_size",
+    type=str,
+    default="4KiB",
+    choices=list(PAGE_SIZES),
+    help="The page size of the workload. Huge pages need --fs and one of "
+    f"{', '.join(HUGE_PAGE_WORKLOADS)}.",
+)
+parser.add_argument(
+    "--boot_checkpoint",
+    action="store_true",
+    default=False,
+    help="In FS mode, restore from a cached checkpoint of the booted OS "
+    "(and create it if there is none yet).",
+)
+parser.add_argument(
+    "--stats_period",
+    type=int,
+    default=None,
+    help="Dump the stats every this many ticks during the region of "
+    "interest (e.g., 100000000 for every 100 us).",
+)
+args = parser.parse_args()
+if args.page_size != "4KiB" and not (
+    args.fs and args.workload_name in HUGE_PAGE_WORKLOADS
+):
+    parser.error(
+        f"--page_size {args.page_size} needs --fs and one of "
+        f"{', '.join(HUGE_PAGE_WORKLOADS)}"
+    )
+if args.workload_name in MULTITHREADED_WORKLOADS and (
+    args.fs or args.num_cores < 2
+):
+    parser.error(f"{args.workload_name} needs SE mode and --num_cores >= 2")
+
+# Only the page walk cache parameters that are set override the defaults.
+pwc_options = {
+    name: value
+    for name, value in vars(args).items()
+    if name.split("_")[0] in ["iptw", "dptw", "l2"] and value is not None
+}
+
+simulator = create_simulator(
+    workload_name=args.workload_name,
+    fs=args.fs,
+    tlb_entries=args.tlb_entries,
+    itb_entries=args.itb_entries,
+    num_cores=args.num_cores,
+    pwc_size=args.pwc_size,
+    pwc_options=pwc_options,
+    page_size=args.page_size,
+    boot_checkpoint=args.boot_checkpoint,
+    stats_period=args.stats_period,
 )
 simulator.override_outdir(Path("m5out") / simulator.get_id())
 
 simulator.run()
-
@@ -0,0 +1,226 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Run the whole virtual memory design space in parallel.
+
+This script has one simulator for every point of the grid
+`WORKLOADS` x `MODES` x `TLB_ENTRIES` x `ITB_ENTRIES` x `PWC_SIZES` x
+`PWC_OPTIONS` x `PAGE_SIZES` x `NUM_CORES`. Each of them runs in its own
+`gem5 -re -m gem5.utils.multisim sweep.py` process, which only registers
+that simulator. Huge pages are only run for the FS mode points of the
+workloads that have a huge page disk image, and the multithreaded workloads
+only for the SE mode points with at least 2 cores. Each simulator has the
+same id as the equivalent `run.py` invocation, so the output of every point
+is in `m5out/<id>`.
+
+The simulations start longest first. A long simulation that starts last
+would keep a single core busy after all of the others are done, so the
+longest ones start first and the short ones fill in the gaps at the end. The
+length of a point is the host time of its previous run if it has a
+`stats.txt` in `m5out`, and an estimate otherwise. The processes are started
+by `schedule` of `util/jobrunner.py`, which also keeps them within the
+available memory. (multisim itself runs its simulators in no particular
+order, so registering them in order would not be enough.) The log of each
+simulation is in `m5out/<id>/jobrunner.log`.
+
+With `BOOT_CHECKPOINT`, the FS simulations restore from a checkpoint of the
+booted OS (see `components/boot_checkpoint.py`). There is one checkpoint per
+workload. Simulations that start before it exists boot the OS themselves, so
+to boot only once per workload, run one FS configuration of each workload
+with `run.py --fs --boot_checkpoint` before the first sweep.
+
+Usage
+-----
+
+```
+gem5 sweep.py
+```
+
+Set `SWEEP_PROCESSES` to the number of simulations to run at the same time.
+It defaults to the number of cores on the host. Set `GEM5` to the gem5
+binary if it is not `gem5` on the `PATH`.
+"""
+
+from gem5.utils.multisim import multisim
+from components import (
+    HUGE_PAGE_WORKLOADS,
+    MULTITHREADED_WORKLOADS,
+    create_simulator,
+    get_simulator_id,
+)
+
+import itertools
+import os
+import re
+import sys
+from pathlib import Path
+
+# util/jobrunner.py is at the root of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "util"))
+import jobrunner
+
+# Add the `MULTITHREADED_WORKLOADS` (e.g., "array_sum_chunking") and more
+# `NUM_CORES` to measure how translation scales with the number of cores.
+WORKLOADS = ["bfs", "mm_block_ik"]
+TLB_ENTRIES = [16, 32]
+# Instruction TLB entries. None keeps the gem5 default.
+ITB_ENTRIES = [None]
+PWC_SIZES = ["small", "large"]
+# Overrides of the page walk caches of each PWC size to try, as keyword
+# arguments of `PageWalkCacheHierarchy`, e.g., {"l2_pwc_size": "64KiB"}.
+PWC_OPTIONS = [{}]
+# Run in FS mode or not.
+MODES = [False, True]
+# Page sizes of the workloads, e.g., ["4KiB", "2MiB"] to compare huge pages.
+PAGE_SIZES = ["4KiB"]
+# Number of cores, e.g., [1, 2, 4, 8, 16].
+NUM_CORES = [1]
+# Boot FS mode once and restore every FS point from a checkpoint.
+BOOT_CHECKPOINT = True
+
+# Relative host time of each workload, used until a point has been run once.
+WORKLOAD_WEIGHTS = {
+    "bfs": 2.0,
+    "bubble": 1.0,
+    "mm_block_ik": 1.0,
+    "array_sum_naive": 0.5,
+    "array_sum_chunking": 0.5,
+}
+
+
+def get_previous_host_seconds(simulator_id: str):
+    """Return the host time of the last run of `simulator_id`, or None."""
+    stats_file = Path("m5out") / simulator_id / "stats.txt"
+    if not stats_file.exists():
+        return None
+    # With the stats reset at workbegin there is one dump per phase.
+    with open(stats_file) as stats:
+        times = re.findall(r"^hostSeconds\s+(\S+)", stats.read(), re.MULTILINE)
+    if not times:
+        return None
+    return sum(float(time) for time in times)
+
+
+def get_relative_cost(point):
+    """A rough estimate of how long a point takes relative to the others.
+
+    FS mode boots the OS first. Smaller TLBs and page walk caches cause more
+    page walks, which take longer to simulate. Huge pages cause fewer. Every
+    core is simulated by the same host thread.
+    """
+    cost = WORKLOAD_WEIGHTS.get(point["workload_name"], 1.0)
+    cost *= 2.0 if point["fs"] else 1.0
+    walks = 1.0 if point["page_size"] == "4KiB" else 0.1
+    cost *= 1.0 + walks / point["tlb_entries"]
+    cost *= 1.1 if point["pwc_size"] == "small" else 1.0
+    cost *= point["num_cores"]
+    return cost
+
+
+def get_point_id(point):
+    return get_simulator_id(**point)
+
+
+def is_supported(point):
+    if point["workload_name"] in MULTITHREADED_WORKLOADS:
+        return not point["fs"] and point["num_cores"] >= 2
+    return point["page_size"] == "4KiB" or (
+        point["fs"] and point["workload_name"] in HUGE_PAGE_WORKLOADS
+    )
+
+
+def get_points():
+    """Return the keyword arguments of `create_simulator` of every point."""
+    points = []
+    for values in itertools.product(
+        WORKLOADS,
+        MODES,
+        TLB_ENTRIES,
+        ITB_ENTRIES,
+        PWC_SIZES,
+        PWC_OPTIONS,
+        PAGE_SIZES,
+        NUM_CORES,
+    ):
+        point = dict(
+            zip(
+                [
+                    "workload_name",
+                    "fs",
+                    "tlb_entries",
+                    "itb_entries",
+                    "pwc_size",
+                    "pwc_options",
+                    "page_size",
+                    "num_cores",
+                ],
+                values,
+            )
+        )
+        if is_supported(point):
+            points.append(point)
+    return points
+
+
+def get_host_seconds(points):
+    """Return the expected host time of every point by its id.
+
+    Points that ran before take as long as last time. The relative cost of
+    the others is scaled by how long the measured points took relative to
+    their cost.
+    """
+    costs = {get_point_id(point): get_relative_cost(point) for point in points}
+    measured = {}
+    for point_id in costs:
+        seconds = get_previous_host_seconds(point_id)
+        if seconds is not None:
+            measured[point_id] = seconds
+    if measured:
+        scale = sum(measured.values()) / sum(costs[p] for p in measured)
+    else:
+        scale = 1.0
+    return {
+        point_id: measured.get(point_id, cost * scale)
+        for point_id, cost in costs.items()
+    }
+
+
+def get_job(point):
+    """The job of a point for `jobrunner.schedule`. The peak memory of a
+    point that never ran is expected to be like the other workloads with the
+    same configuration.
+    """
+    config = {
+        key: value for key, value in point.items() if key != "workload_name"
+    }
+    return {
+        "id": get_point_id(point),
+        "key": jobrunner.get_config_key(point),
+        "config_key": jobrunner.get_config_key(config),
+    }
+
+
+if jobrunner.JOB_VARIABLE in os.environ:
+    # One simulation of the sweep, run by multisim.
+    multisim.set_num_processes(1)
+    for point in get_points():
+        if get_point_id(point) == os.environ[jobrunner.JOB_VARIABLE]:
+            multisim.add_simulator(
+                create_simulator(**point, boot_checkpoint=BOOT_CHECKPOINT)
+            )
+else:
+    points = get_points()
+    host_seconds = get_host_seconds(points)
+    memory = jobrunner.get_available_memory()
+    if memory is None:
+        memory = float("inf")
+    else:
+        memory *= jobrunner.MEMORY_FRACTION
+    jobrunner.schedule(
+        __file__,
+        [get_job(point) for point in points],
+        int(os.environ.get("SWEEP_PROCESSES", os.cpu_count())),
+        memory,
+        jobrunner.DEFAULT_MEMORY_PER_JOB,
+        priority=lambda job: host_seconds[job["id"]],
+    )
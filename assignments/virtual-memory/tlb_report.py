@@ -0,0 +1,128 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Report the data TLB miss rate and TLB reach of every run.
+
+The TLB reach is the memory that the data TLB can map at once, i.e., the
+number of entries times the page size. Runs that only differ in their page
+size are printed next to each other, so the table shows how much of the
+translation overhead huge pages remove for each TLB size.
+
+The configuration of each run is read from its output directory name (see
+`get_simulator_id` in `components/simulation.py`) and the stats from the
+last dump of its `stats.txt`, which covers the region of interest.
+
+Usage
+-----
+
+```
+python tlb_report.py [m5out]
+```
+
+This script does not need gem5.
+"""
+
+import argparse
+import re
+from pathlib import Path
+
+# e.g., "fs-bfs_2MiB_pages-16-small_pwc", "se-mm_block_ik-32-itb64-large_pwc",
+# or "se-array_sum_naive_4cores-16-small_pwc"
+SIMULATOR_ID = re.compile(
+    r"^(?P<mode>fs|se)-(?P<workload>\w+?)(?:_(?P<page_size>\d+[KMG]iB)_pages)?"
+    r"(?:_(?P<num_cores>\d+)cores)?-(?P<tlb_entries>\d+)"
+    r"(?:-itb(?P<itb_entries>\d+))?-(?P<pwc>.+)_pwc$"
+)
+
+DTB_STAT = re.compile(
+    r"^\S+\.mmu\.dtb\.(rdAccesses|wrAccesses|rdMisses|wrMisses)\s+(\d+)",
+    re.MULTILINE,
+)
+
+BEGIN_MARKER = "---------- Begin Simulation Statistics ----------"
+
+UNITS = {"KiB": 1 << 10, "MiB": 1 << 20, "GiB": 1 << 30}
+
+
+def parse_size(size):
+    return int(size[:-3]) * UNITS[size[-3:]]
+
+
+def format_size(size):
+    for unit, scale in reversed(UNITS.items()):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{unit}"
+    return f"{size}B"
+
+
+def get_dtb_stats(stats_file):
+    """Return the data TLB accesses and misses of all cores in the last
+    stats dump of `stats_file`, or None if it has no dumps.
+    """
+    with open(stats_file) as stats:
+        dumps = stats.read().split(BEGIN_MARKER)[1:]
+    if not dumps:
+        return None
+    totals = {}
+    for name, value in DTB_STAT.findall(dumps[-1]):
+        totals[name] = totals.get(name, 0) + int(value)
+    accesses = totals.get("rdAccesses", 0) + totals.get("wrAccesses", 0)
+    misses = totals.get("rdMisses", 0) + totals.get("wrMisses", 0)
+    return accesses, misses
+
+
+def get_runs(outdir):
+    runs = []
+    for stats_file in sorted(Path(outdir).glob("*/stats.txt")):
+        match = SIMULATOR_ID.match(stats_file.parent.name)
+        if match is None:
+            continue
+        dtb_stats = get_dtb_stats(stats_file)
+        if dtb_stats is None:
+            continue
+        page_size = parse_size(match["page_size"] or "4KiB")
+        tlb_entries = int(match["tlb_entries"])
+        runs.append(
+            {
+                "id": stats_file.parent.name,
+                "config": (
+                    match["mode"],
+                    match["workload"],
+                    int(match["num_cores"] or 1),
+                    tlb_entries,
+                    int(match["itb_entries"] or 0),
+                    match["pwc"],
+                ),
+                "page_size": page_size,
+                "reach": tlb_entries * page_size,
+                "accesses": dtb_stats[0],
+                "misses": dtb_stats[1],
+            }
+        )
+    return sorted(runs, key=lambda run: (run["config"], run["page_size"]))
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Report the TLB miss rate and reach of every run."
+    )
+    argparser.add_argument(
+        "outdir",
+        type=Path,
+        nargs="?",
+        default=Path("m5out"),
+        help="Directory that holds one output directory per run.",
+    )
+    args = argparser.parse_args()
+
+    print(
+        f"{'run':<48} {'page':>6} {'reach':>8} {'accesses':>12} "
+        f"{'misses':>10} {'miss rate':>9}"
+    )
+    for run in get_runs(args.outdir):
+        miss_rate = run["misses"] / run["accesses"] if run["accesses"] else 0
+        print(
+            f"{run['id']:<48} {format_size(run['page_size']):>6} "
+            f"{format_size(run['reach']):>8} {run['accesses']:>12} "
+            f"{run['misses']:>10} {miss_rate:>9.2%}"
+        )
@@ -0,0 +1,197 @@
+# Copyright (c) 2025 Jason Lowe-Power
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Show how the cost of page walks changes over the region of interest.
+
+Run `run.py` with `--stats_period` so that `stats.txt` has a dump every
+period of the region of interest. Each dump has the totals since the stats
+reset at the beginning of the work, so the difference of two dumps is one
+interval. For every interval and for the data and instruction side, this
+prints
+
+- walks: the TLB misses, each of which starts a page walk.
+- depth: the page table entries read per walk, i.e., the accesses to the
+  page walk cache (dptw or iptw) per walk.
+- pwc miss: the miss rate of the page walk cache.
+- ns/walk: the time that the page walk cache misses of the interval took
+  per walk. The page walk cache hits add a few cycles on top of that.
+
+It then prints fixed-bucket histograms of the walks by the depth and the
+latency of the interval they are in.
+
+Usage
+-----
+
+```
+python walk_timeline.py m5out/<id> [--npz timeline.npz]
+```
+
+This script does not need gem5.
+"""
+
+import argparse
+import re
+from pathlib import Path
+
+import numpy as np
+
+BEGIN_MARKER = "---------- Begin Simulation Statistics ----------"
+
+# The sums of these over all cores (and all caches of the hierarchy).
+STATS = {
+    "dtb_misses": r"\.mmu\.dtb\.(?:rd|wr)Misses",
+    "itb_misses": r"\.mmu\.itb\.(?:rd|wr)Misses",
+    "dptw_accesses": r"\.dptw_caches\d*\.demandAccesses::total",
+    "dptw_misses": r"\.dptw_caches\d*\.demandMisses::total",
+    "dptw_miss_latency": r"\.dptw_caches\d*\.demandMissLatency::total",
+    "iptw_accesses": r"\.iptw_caches\d*\.demandAccesses::total",
+    "iptw_misses": r"\.iptw_caches\d*\.demandMisses::total",
+    "iptw_miss_latency": r"\.iptw_caches\d*\.demandMissLatency::total",
+}
+STAT_LINE = re.compile(
+    r"^\S*?(" + "|".join(f"(?:{pattern})" for pattern in STATS.values())
+    + r")\s+([0-9.e+-]+)",
+    re.MULTILINE,
+)
+
+DEPTH_BUCKETS = [0, 1, 2, 3, 4, 5, np.inf]
+LATENCY_BUCKETS_NS = [0, 5, 10, 20, 50, 100, 200, 500, np.inf]
+
+
+def parse_dumps(stats_file):
+    """Return the cumulative stats, simTicks, and simFreq of every dump."""
+    with open(stats_file) as stats:
+        dumps = stats.read().split(BEGIN_MARKER)[1:]
+    patterns = {name: re.compile(pattern) for name, pattern in STATS.items()}
+    totals = np.zeros((len(dumps), len(STATS)))
+    ticks = np.zeros(len(dumps))
+    freq = 1e12
+    for index, dump in enumerate(dumps):
+        for stat, value in STAT_LINE.findall(dump):
+            for column, pattern in enumerate(patterns.values()):
+                if pattern.fullmatch(stat):
+                    totals[index, column] += float(value)
+                    break
+        match = re.search(r"^simTicks\s+(\d+)", dump, re.MULTILINE)
+        ticks[index] = int(match.group(1)) if match else 0
+        match = re.search(r"^simFreq\s+(\d+)", dump, re.MULTILINE)
+        if match:
+            freq = int(match.group(1))
+    return totals, ticks, freq
+
+
+def get_intervals(totals, ticks, freq):
+    """Return the per-interval walks, depth, miss rate, and ns per walk of
+    the data ("d") and instruction ("i") side.
+    """
+    # Prepend zeros so the first dump is the first interval.
+    deltas = np.diff(totals, axis=0, prepend=0)
+    columns = {name: deltas[:, index] for index, name in enumerate(STATS)}
+    intervals = {
+        "start_us": np.concatenate([[0], ticks[:-1]]) / freq * 1e6,
+        "length_us": np.diff(ticks, prepend=0) / freq * 1e6,
+    }
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for side, tlb in [("d", "dtb"), ("i", "itb")]:
+            walks = columns[f"{tlb}_misses"]
+            accesses = columns[f"{side}ptw_accesses"]
+            intervals[f"{side}_walks"] = walks
+            intervals[f"{side}_depth"] = np.nan_to_num(accesses / walks)
+            intervals[f"{side}_pwc_miss_rate"] = np.nan_to_num(
+                columns[f"{side}ptw_misses"] / accesses
+            )
+            intervals[f"{side}_ns_per_walk"] = np.nan_to_num(
+                columns[f"{side}ptw_miss_latency"] / freq * 1e9 / walks
+            )
+    return intervals
+
+
+def get_histograms(intervals):
+    """Return the number of walks of each side in each depth and latency
+    bucket, counting every walk of an interval in that interval's bucket.
+    """
+    histograms = {}
+    for side in ["d", "i"]:
+        walks = intervals[f"{side}_walks"]
+        histograms[f"{side}_depth"], _ = np.histogram(
+            intervals[f"{side}_depth"], bins=DEPTH_BUCKETS, weights=walks
+        )
+        histograms[f"{side}_ns_per_walk"], _ = np.histogram(
+            intervals[f"{side}_ns_per_walk"],
+            bins=LATENCY_BUCKETS_NS,
+            weights=walks,
+        )
+    return histograms
+
+
+def print_histogram(title, counts, buckets):
+    print(title)
+    total = counts.sum() or 1
+    for low, high, count in zip(buckets[:-1], buckets[1:], counts):
+        label = f"[{low:g}, {high:g})"
+        bar = "#" * int(round(40 * count / total))
+        print(f"    {label:>12} {int(count):>12} {bar}")
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Show the page walk cost of every stats dump interval."
+    )
+    argparser.add_argument(
+        "outdir", type=Path, help="The output directory of one run."
+    )
+    argparser.add_argument(
+        "--npz",
+        type=Path,
+        default=None,
+        help="Also save the intervals and histograms to this .npz file.",
+    )
+    args = argparser.parse_args()
+
+    totals, ticks, freq = parse_dumps(args.outdir / "stats.txt")
+    if len(ticks) < 2:
+        print(
+            "Warning: only one stats dump. Use `run.py --stats_period` to "
+            "dump the stats periodically."
+        )
+    intervals = get_intervals(totals, ticks, freq)
+    histograms = get_histograms(intervals)
+
+    print(
+        f"{'start (us)':>11} | {'walks':>9} {'depth':>6} {'pwc miss':>9} "
+        f"{'ns/walk':>8} | {'i walks':>9} {'depth':>6} {'pwc miss':>9} "
+        f"{'ns/walk':>8}"
+    )
+    for index in range(len(ticks)):
+        print(
+            f"{intervals['start_us'][index]:>11.1f}",
+            *(
+                f"{intervals[f'{side}_walks'][index]:>9.0f} "
+                f"{intervals[f'{side}_depth'][index]:>6.2f} "
+                f"{intervals[f'{side}_pwc_miss_rate'][index]:>9.2%} "
+                f"{intervals[f'{side}_ns_per_walk'][index]:>8.1f}"
+                for side in ["d", "i"]
+            ),
+            sep=" | ",
+        )
+    print()
+    for side, name in [("d", "Data"), ("i", "Instruction")]:
+        print_histogram(
+            f"{name} walks by page table entries read per walk",
+            histograms[f"{side}_depth"],
+            DEPTH_BUCKETS,
+        )
+        print_histogram(
+            f"{name} walks by page walk cache miss time per walk (ns)",
+            histograms[f"{side}_ns_per_walk"],
+            LATENCY_BUCKETS_NS,
+        )
+
+    if args.npz is not None:
+        np.savez(
+            args.npz,
+            depth_buckets=DEPTH_BUCKETS,
+            latency_buckets_ns=LATENCY_BUCKETS_NS,
+            **intervals,
+            **{f"hist_{name}": counts for name, counts in histograms.items()},
+        )
@@ -0,0 +1,322 @@
+"""Ingest gem5 `stats.txt` files into a columnar store and query it.
+
+Every run script gives its `Simulator` an id and writes its output to
+`m5out/<id>`. `ingest` parses every `m5out/<id>/stats.txt` and stores all of
+the stats of all of the runs as one table with one row per stats dump and one
+column per stat. A run that resets the stats (e.g., in a `workbegin_handler`)
+or dumps them periodically has one row per dump.
+
+The store is a directory with
+
+- `rows.json`: the run id, dump index, and source file of every row.
+- `names.json`: the name of every column.
+- `values.npy`: a (columns x rows) float64 array. Each column is contiguous,
+  so a query memory maps the array and only reads the columns it asks for.
+  Stats that a dump does not have are NaN.
+
+Re-ingesting only parses the `stats.txt` files that changed. A store can
+hold the runs of several output directories: ingesting one of them only
+replaces the rows of that directory.
+
+Usage
+-----
+
+```
+python util/gem5stats.py ingest [m5out] [--store m5out/stats-store]
+python util/gem5stats.py query <stat pattern>... [--id <id pattern>] [--dump N]
+```
+
+Stat and id patterns are shell-style wildcards, e.g.,
+`'board.cache_hierarchy.ruby_system.l1_controllers*.L1Dcache.m_demand_hits'`.
+"""
+
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+import numpy as np
+
+BEGIN_MARKER = b"---------- Begin Simulation Statistics ----------"
+
+# The name and the first value of a stat. Distributions and vectors have
+# more columns (e.g., percentages) after the first value, which are skipped.
+STAT_LINE = re.compile(
+    rb"^(\S+)[ \t]+(-?(?:nan|inf|[0-9.]+(?:e[-+]?[0-9]+)?))[ \t%|#\n]"
+)
+
+DEFAULT_STORE = Path("m5out") / "stats-store"
+
+
+def parse_stats(path):
+    """Parse a `stats.txt` file.
+
+    The file is read line by line, so only the dump being parsed is held in
+    memory.
+
+    :return: a list with the stat names and a float64 array with the stat
+    values of every dump in the file.
+    """
+    dumps = []
+    names = values = None
+    with open(path, "rb") as stats_file:
+        for line in stats_file:
+            if line.startswith(BEGIN_MARKER):
+                if names is not None:
+                    dumps.append((names, np.array(values, dtype=np.float64)))
+                names = []
+                values = []
+                continue
+            if names is None:
+                continue
+            match = STAT_LINE.match(line)
+            if match:
+                names.append(match[1].decode())
+                values.append(float(match[2]))
+    if names is not None:
+        dumps.append((names, np.array(values, dtype=np.float64)))
+    return dumps
+
+
+def get_file_key(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class StatsStore:
+    """A columnar table of the stats of many gem5 runs."""
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = Path(path)
+        if (self.path / "rows.json").exists():
+            with open(self.path / "rows.json") as rows_file:
+                self.rows = json.load(rows_file)
+            with open(self.path / "names.json") as names_file:
+                self.names = json.load(names_file)
+            self.values = np.load(self.path / "values.npy", mmap_mode="r")
+        else:
+            self.rows = []
+            self.names = []
+            self.values = np.zeros((0, 0))
+        self.columns = {name: index for index, name in enumerate(self.names)}
+
+    def ingest(self, outdir, processes=None):
+        """Add the runs in `outdir` (one `<id>/stats.txt` per run) to the
+        store and drop the rows of the runs in `outdir` whose `stats.txt` is
+        gone. The rows of other output directories are kept as they are.
+
+        :return: the number of files that were parsed.
+        """
+        # The same runs are the same rows whether `outdir` is relative or
+        # absolute.
+        outdir = Path(outdir).resolve()
+        stats_files = sorted(outdir.glob("*/stats.txt"))
+        old_rows = {}
+        other_indices = []
+        for index, row in enumerate(self.rows):
+            if Path(row["path"]).parent.parent.resolve() == outdir:
+                old_rows.setdefault(row["path"], []).append(index)
+            else:
+                other_indices.append(index)
+
+        keep = []
+        parse = []
+        for stats_file in stats_files:
+            key = get_file_key(stats_file)
+            indices = old_rows.get(str(stats_file), [])
+            if indices and all(
+                self.rows[index]["file"] == key for index in indices
+            ):
+                keep.append((stats_file, indices))
+            else:
+                parse.append((stats_file, key))
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            parsed = list(
+                executor.map(
+                    parse_stats,
+                    [stats_file for stats_file, _ in parse],
+                    chunksize=4,
+                )
+            )
+
+        names = list(self.names)
+        columns = dict(self.columns)
+        new_rows = []
+        new_dumps = []
+        for (stats_file, key), dumps in zip(parse, parsed):
+            for dump, (dump_names, dump_values) in enumerate(dumps):
+                for name in dump_names:
+                    if name not in columns:
+                        columns[name] = len(names)
+                        names.append(name)
+                indices = np.fromiter(
+                    map(columns.__getitem__, dump_names),
+                    dtype=np.int64,
+                    count=len(dump_names),
+                )
+                new_rows.append(
+                    {
+                        "id": stats_file.parent.name,
+                        "dump": dump,
+                        "path": str(stats_file),
+                        "file": key,
+                    }
+                )
+                new_dumps.append((indices, dump_values))
+
+        kept_indices = other_indices + [
+            index for _, indices in keep for index in indices
+        ]
+        rows = [self.rows[index] for index in kept_indices] + new_rows
+        values = np.full((len(names), len(rows)), np.nan)
+        values[: len(self.names), : len(kept_indices)] = self.values[
+            :, kept_indices
+        ]
+        for row, (indices, dump_values) in enumerate(
+            new_dumps, len(kept_indices)
+        ):
+            values[indices, row] = dump_values
+
+        order = sorted(
+            range(len(rows)),
+            key=lambda row: (
+                rows[row]["id"],
+                rows[row]["path"],
+                rows[row]["dump"],
+            ),
+        )
+        self.rows = [rows[row] for row in order]
+        self.names = names
+        self.columns = columns
+        self.values = values[:, order]
+        self.save()
+        return len(parse)
+
+    def save(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Write the values first so that a store is never left with rows
+        # that point past the end of its values.
+        np.save(self.path / "values.npy", self.values)
+        with open(self.path / "names.json", "w") as names_file:
+            json.dump(self.names, names_file)
+        with open(self.path / "rows.json", "w") as rows_file:
+            json.dump(self.rows, rows_file, indent=1)
+        self.values = np.load(self.path / "values.npy", mmap_mode="r")
+
+    def get_names(self, pattern):
+        """Return the stat names that match the shell-style `pattern`."""
+        if pattern in self.columns:
+            return [pattern]
+        return [name for name in self.names if fnmatchcase(name, pattern)]
+
+    def query(self, patterns, ids="*", dump=None):
+        """Read the columns that match `patterns` for the selected rows.
+
+        :param ids: a shell-style pattern for the run ids.
+        :param dump: only return this dump of every run. Negative values
+        count from the last dump, e.g., -1 for the stats at the end of each
+        run.
+        :return: the selected rows and a dict from stat name to a float64
+        array with one value per row.
+        """
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        # Runs with the same id in different output directories are
+        # different runs.
+        dumps_per_run = {}
+        for row in self.rows:
+            dumps_per_run[row["path"]] = max(
+                dumps_per_run.get(row["path"], 0), row["dump"] + 1
+            )
+        selected = []
+        for index, row in enumerate(self.rows):
+            if not fnmatchcase(row["id"], ids):
+                continue
+            if dump is not None and row["dump"] != dump % dumps_per_run[
+                row["path"]
+            ]:
+                continue
+            selected.append(index)
+
+        columns = {}
+        for pattern in patterns:
+            for name in self.get_names(pattern):
+                columns[name] = np.asarray(
+                    self.values[self.columns[name]][selected]
+                )
+        return [self.rows[index] for index in selected], columns
+
+
+def format_value(value):
+    if np.isnan(value):
+        return "-"
+    if not np.isfinite(value):
+        return str(value)
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.6g}"
+
+
+def get_inputs():
+    argparser = argparse.ArgumentParser(
+        description="Ingest and query gem5 stats.txt files."
+    )
+    argparser.add_argument(
+        "--store",
+        type=Path,
+        default=DEFAULT_STORE,
+        help="Directory of the columnar stats store.",
+    )
+    subparsers = argparser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser(
+        "ingest", help="Parse new or changed stats.txt files."
+    )
+    ingest.add_argument(
+        "outdir",
+        type=Path,
+        nargs="?",
+        default=Path("m5out"),
+        help="Directory that holds one output directory per run.",
+    )
+    ingest.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Number of files to parse in parallel (all cores by default).",
+    )
+
+    query = subparsers.add_parser("query", help="Print stats of the runs.")
+    query.add_argument("patterns", nargs="+", help="Stat name patterns.")
+    query.add_argument(
+        "--id", type=str, default="*", help="Run id pattern."
+    )
+    query.add_argument(
+        "--dump",
+        type=int,
+        default=None,
+        help="Only show this dump of every run, e.g., -1 for the last one.",
+    )
+    args = argparser.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    args = get_inputs()
+    store = StatsStore(args.store)
+    if args.command == "ingest":
+        parsed = store.ingest(args.outdir, args.processes)
+        print(
+            f"Parsed {parsed} stats files. {args.store} has "
+            f"{len(store.rows)} dumps of {len(store.names)} stats."
+        )
+    elif args.command == "query":
+        rows, columns = store.query(args.patterns, args.id, args.dump)
+        for name, values in columns.items():
+            print(name)
+            for row, value in zip(rows, values):
+                print(f"    {row['id']}[{row['dump']}] {format_value(value)}")
@@ -0,0 +1,483 @@
+"""Run the simulations of a multisim script so that an interrupted or
+partially failed run can be resumed.
+
+A script registers its simulators with `add_job` instead of
+`multisim.add_simulator`. Each job has a cache key, which is a hash of the
+configuration of its board, the id and version of its workload, and the md5
+of the workload's files. `add_job` writes the key to `m5out/<id>/job.json`
+and skips the job if `m5out/<id>/stats.txt` is newer than that and has all
+of its stats dumps. Changing the configuration or the workload of a job
+changes its key, so it runs again.
+
+```python
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "util"))
+import jobrunner
+import roi
+
+multisim.set_num_processes(jobrunner.get_num_processes())
+...
+simulator = roi.create_roi_simulator(board, id=...)
+jobrunner.add_job(simulator, config, workload, min_dumps=roi.NUM_DUMPS)
+```
+
+Running this module schedules the jobs itself and retries the ones that
+failed:
+
+```
+python util/jobrunner.py experiments.py [--retries 2] [--processes N]
+```
+
+It runs the script under gem5 once to list the jobs that are not complete
+and then runs each of them in its own `gem5 -re -m gem5.utils.multisim
+experiments.py` process. The processes are packed into the cores and the
+available memory of the host by the peak memory of each job, which is
+measured every time a job runs and saved in `m5out/.jobrunner-history.json`.
+A job that never ran is expected to need as much as the largest run of the
+same configuration, or `--memory-per-job` GiB. This repeats until every job
+is complete or it ran `retries` more times. Set `GEM5` to the gem5 binary if
+it is not `gem5` on the `PATH`.
+
+This module only needs gem5 for `add_job`.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+OUTDIR = Path("m5out")
+MD5_CACHE = OUTDIR / ".jobrunner-md5.json"
+END_MARKER = b"---------- End Simulation Statistics   ----------"
+
+# Host memory to set aside for each simulation when choosing the number of
+# processes. Most of the assignments' SE mode simulations need less.
+DEFAULT_MEMORY_PER_JOB = 2 << 30
+
+# Only schedule simulations that fit in this fraction of the memory that is
+# available when the scheduler starts.
+MEMORY_FRACTION = 0.9
+# The peak memory of every job that `run` ran, by its cache key.
+HISTORY = OUTDIR / ".jobrunner-history.json"
+
+# Set by `run`. With `LIST_VARIABLE`, `add_job` only records the jobs that it
+# did not skip in the `PENDING_VARIABLE` file. With `JOB_VARIABLE`, it only
+# adds the job with that id.
+PENDING_VARIABLE = "JOBRUNNER_PENDING"
+LIST_VARIABLE = "JOBRUNNER_LIST"
+JOB_VARIABLE = "JOBRUNNER_JOB"
+PROCESSES_VARIABLE = "JOBRUNNER_PROCESSES"
+
+
+def get_available_memory():
+    """Return the available host memory in bytes, or None if unknown."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError):
+        return None
+
+
+def get_num_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_num_processes(memory_per_job=None):
+    """The number of simulations to run at the same time: one per core, but
+    no more than fit in the available memory with `memory_per_job` bytes
+    each. `JOBRUNNER_PROCESSES` overrides it.
+
+    :param memory_per_job: By default, the largest peak memory of the jobs
+    that `run` ran before, or `DEFAULT_MEMORY_PER_JOB` if it never ran.
+    """
+    if PROCESSES_VARIABLE in os.environ:
+        return int(os.environ[PROCESSES_VARIABLE])
+    if memory_per_job is None:
+        memory_per_job = max(
+            (job["max_rss"] for job in load_history().values()),
+            default=DEFAULT_MEMORY_PER_JOB,
+        )
+    processes = get_num_cores()
+    memory = get_available_memory()
+    if memory is not None:
+        processes = min(processes, memory // memory_per_job)
+    return max(1, processes)
+
+
+def get_md5(path):
+    """The md5 of a file or of all of the files in a directory."""
+    md5 = hashlib.md5()
+    path = Path(path)
+    if path.is_dir():
+        files = sorted(file for file in path.rglob("*") if file.is_file())
+    else:
+        files = [path]
+    for file in files:
+        if path.is_dir():
+            md5.update(str(file.relative_to(path)).encode())
+        with open(file, "rb") as data:
+            for chunk in iter(lambda: data.read(1 << 20), b""):
+                md5.update(chunk)
+    return md5.hexdigest()
+
+
+def get_cached_md5(path):
+    """`get_md5`, cached by the size and modification time of the path, so
+    that disk images are only hashed once.
+    """
+    stat = os.stat(path)
+    file_key = f"{Path(path).resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+    cache = {}
+    if MD5_CACHE.exists():
+        with open(MD5_CACHE) as cache_file:
+            cache = json.load(cache_file)
+    if file_key not in cache:
+        cache[file_key] = get_md5(path)
+        MD5_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        # Other processes of the same run may update the cache too.
+        with tempfile.NamedTemporaryFile(
+            "w", dir=MD5_CACHE.parent, delete=False
+        ) as cache_file:
+            json.dump(cache, cache_file)
+        os.replace(cache_file.name, MD5_CACHE)
+    return cache[file_key]
+
+
+def get_resource_files(resource):
+    """The local files of a resource and, for a workload, of the resources
+    it uses (e.g., its binary or its kernel and disk image).
+    """
+    resources = [resource]
+    if hasattr(resource, "get_parameters"):
+        resources += [
+            value
+            for value in resource.get_parameters().values()
+            if hasattr(value, "get_local_path")
+        ]
+    files = []
+    for dependency in resources:
+        if not hasattr(dependency, "get_local_path"):
+            continue
+        path = dependency.get_local_path()
+        if path is not None and Path(path).exists():
+            files.append(Path(path))
+    return files
+
+
+def get_config_key(config):
+    return hashlib.sha256(
+        json.dumps(config, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def get_cache_key(config, workload):
+    """Hash the configuration of a job and its workload.
+
+    :param config: Anything JSON serializable that describes the board,
+    e.g., the keyword arguments of the function that creates it.
+    :param workload: The workload resource of the job.
+    """
+    description = {
+        "config": config,
+        "workload": workload.get_id(),
+        "version": (
+            workload.get_resource_version()
+            if hasattr(workload, "get_resource_version")
+            else None
+        ),
+        "md5": {
+            file.name: get_cached_md5(file)
+            for file in get_resource_files(workload)
+        },
+    }
+    return hashlib.sha256(
+        json.dumps(description, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def get_num_dumps(stats_file):
+    with open(stats_file, "rb") as stats:
+        return stats.read().count(END_MARKER)
+
+
+def is_complete(simulator_id, key=None, min_dumps=1):
+    """Whether `m5out/<simulator_id>` has all of the stats of the job with
+    `key` (or of the last job with that id if `key` is None).
+    """
+    job_file = OUTDIR / simulator_id / "job.json"
+    stats_file = OUTDIR / simulator_id / "stats.txt"
+    if not job_file.exists() or not stats_file.exists():
+        return False
+    with open(job_file) as job:
+        job = json.load(job)
+    if key is not None and job["key"] != key:
+        return False
+    # A stats file older than the job is from a different configuration.
+    if stats_file.stat().st_mtime_ns < job_file.stat().st_mtime_ns:
+        return False
+    return get_num_dumps(stats_file) >= max(min_dumps, job["min_dumps"])
+
+
+def add_job(simulator, config, workload, min_dumps=1):
+    """Add `simulator` to multisim unless it already ran.
+
+    :param simulator: The simulator of the job. It must have an id.
+    :param config: The configuration of its board (see `get_cache_key`).
+    :param workload: The workload resource of its board.
+    :param min_dumps: The number of stats dumps of a complete run, e.g.,
+    `roi.NUM_DUMPS` for the simulators of `roi.py`. Don't count on the dumps
+    of gem5's default work begin and work end handlers, which depend on the
+    version of gem5.
+    :return: whether the job was added.
+    """
+    from gem5.utils.multisim import multisim
+
+    simulator_id = simulator.get_id()
+    if os.environ.get(JOB_VARIABLE, simulator_id) != simulator_id:
+        return False
+    key = get_cache_key(config, workload)
+    if is_complete(simulator_id, key, min_dumps):
+        return False
+
+    job_file = OUTDIR / simulator_id / "job.json"
+    job = {"key": key, "min_dumps": min_dumps, "config": config}
+    previous = None
+    if job_file.exists():
+        with open(job_file) as previous_job:
+            previous = json.load(previous_job)
+    # multisim imports the script once for every simulation, so only write
+    # the file when the job changed. Its modification time is when the job
+    # was queued.
+    if previous != job:
+        job_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(job_file, "w") as new_job:
+            json.dump(job, new_job, indent=4)
+    if PENDING_VARIABLE in os.environ:
+        with open(os.environ[PENDING_VARIABLE], "a") as pending:
+            pending_job = {
+                "id": simulator_id,
+                "key": key,
+                "config_key": get_config_key(config),
+            }
+            pending.write(json.dumps(pending_job) + "\n")
+    if LIST_VARIABLE in os.environ:
+        return True
+    multisim.add_simulator(simulator)
+    return True
+
+
+def load_history():
+    if not HISTORY.exists():
+        return {}
+    with open(HISTORY) as history:
+        return json.load(history)
+
+
+def save_history(history):
+    HISTORY.parent.mkdir(parents=True, exist_ok=True)
+    with open(HISTORY, "w") as history_file:
+        json.dump(history, history_file, indent=4)
+
+
+def estimate_memory(job, history, memory_per_job):
+    """The peak memory of a job in bytes.
+
+    It is the peak of the last run of the same job if there is one, or the
+    largest peak of the runs of the same configuration (with other
+    workloads), or `memory_per_job` for a configuration that never ran. The
+    first job of a new configuration calibrates the estimate of the others.
+    """
+    if job["key"] in history:
+        return history[job["key"]]["max_rss"]
+    same_config = [
+        run["max_rss"]
+        for run in history.values()
+        if run["config_key"] == job["config_key"]
+    ]
+    return max(same_config) if same_config else memory_per_job
+
+
+def format_memory(size):
+    return f"{size / (1 << 30):.2f} GiB"
+
+
+def list_jobs(script):
+    """Return the jobs of a script that are not complete."""
+    environment = dict(os.environ)
+    environment[LIST_VARIABLE] = "1"
+    with tempfile.NamedTemporaryFile("r", suffix=".pending") as pending:
+        environment[PENDING_VARIABLE] = pending.name
+        subprocess.run(
+            [os.environ.get("GEM5", "gem5"), str(script)],
+            env=environment,
+            stdout=subprocess.DEVNULL,
+        )
+        jobs = {}
+        for line in pending:
+            job = json.loads(line)
+            jobs[job["id"]] = job
+    return list(jobs.values())
+
+
+def schedule(script, jobs, processes, memory, memory_per_job, priority=None):
+    """Run every job in its own gem5 process, as many at the same time as
+    fit in `processes` and `memory` bytes.
+
+    The jobs are packed first fit decreasing: whenever a process finishes,
+    the largest queued jobs that still fit start. A job that does not fit
+    even on its own starts once nothing else is running. The peak memory of
+    every process that succeeds is measured when it exits and saved in the
+    history.
+
+    :param jobs: The jobs, dicts with the "id", "key", and "config_key" of
+    each job (see `add_job`).
+    :param priority: A function of a job. Of the queued jobs that fit, the
+    one with the highest priority starts first. By default, it is the
+    estimated peak memory of the job.
+    """
+    history = load_history()
+    if priority is None:
+
+        def priority(job):
+            return estimate_memory(job, history, memory_per_job)
+
+    queue = list(jobs)
+    running = {}
+    while queue or running:
+        queue.sort(key=priority, reverse=True)
+        used = sum(estimate for _, _, estimate in running.values())
+        start = None
+        if len(running) < processes:
+            for job in queue:
+                estimate = estimate_memory(job, history, memory_per_job)
+                if not running or used + estimate <= memory:
+                    start = job
+                    break
+        if start is not None:
+            queue.remove(start)
+            environment = dict(os.environ)
+            environment[JOB_VARIABLE] = start["id"]
+            environment[PROCESSES_VARIABLE] = "1"
+            log_file = OUTDIR / start["id"] / "jobrunner.log"
+            log_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(log_file, "w") as log:
+                process = subprocess.Popen(
+                    [
+                        os.environ.get("GEM5", "gem5"),
+                        "-re",
+                        "-m",
+                        "gem5.utils.multisim",
+                        str(script),
+                    ],
+                    env=environment,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                )
+            running[process.pid] = (start, process, estimate)
+            print(
+                f"Started {start['id']} (expecting "
+                f"{format_memory(estimate)}, {len(queue)} queued)"
+            )
+            continue
+
+        # The resource usage of a waited for process includes the processes
+        # that it waited for, i.e., the multisim worker that simulates.
+        pid, status, usage = os.wait4(-1, 0)
+        if pid not in running:
+            continue
+        job, process, _ = running.pop(pid)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in KiB, except on macOS.
+        scale = 1 if sys.platform == "darwin" else 1024
+        # A simulation that failed may not have reached its peak.
+        if process.returncode == 0:
+            history[job["key"]] = {
+                "id": job["id"],
+                "config_key": job["config_key"],
+                "max_rss": usage.ru_maxrss * scale,
+            }
+            save_history(history)
+        print(
+            f"Finished {job['id']} (exit code {process.returncode}, peak "
+            f"memory {format_memory(usage.ru_maxrss * scale)})"
+        )
+
+
+def run(script, retries=2, processes=None, memory_per_job=None):
+    """Run a multisim script that uses `add_job` until all of its jobs are
+    complete, retrying the ones that fail.
+
+    :param processes: The most simulations to run at the same time, by
+    default one per core.
+    :param memory_per_job: The memory to expect of a configuration that never
+    ran before, by default `DEFAULT_MEMORY_PER_JOB`.
+    :return: the ids of the jobs that still failed after the retries.
+    """
+    if processes is None:
+        processes = get_num_cores()
+    if memory_per_job is None:
+        memory_per_job = DEFAULT_MEMORY_PER_JOB
+    memory = get_available_memory()
+    memory = float("inf") if memory is None else memory * MEMORY_FRACTION
+    failed = []
+    for attempt in range(retries + 1):
+        jobs = list_jobs(script)
+        if not jobs:
+            print("Every job is complete")
+            return []
+        schedule(script, jobs, processes, memory, memory_per_job)
+        failed = [job["id"] for job in jobs if not is_complete(job["id"])]
+        print(
+            f"Attempt {attempt}: {len(jobs) - len(failed)} of "
+            f"{len(jobs)} jobs completed"
+        )
+        if not failed:
+            return []
+    return failed
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Run a multisim script and retry the failed jobs."
+    )
+    argparser.add_argument("script", type=Path, help="The multisim script.")
+    argparser.add_argument(
+        "--retries",
+        type=int,
+        default=2,
+        help="How many more times to run the failed jobs.",
+    )
+    argparser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="The most simulations to run at the same time (one per core by "
+        "default).",
+    )
+    argparser.add_argument(
+        "--memory-per-job",
+        type=float,
+        default=None,
+        help="GiB of memory to expect of a configuration that never ran "
+        f"before (default {DEFAULT_MEMORY_PER_JOB >> 30}).",
+    )
+    args = argparser.parse_args()
+
+    memory_per_job = None
+    if args.memory_per_job is not None:
+        memory_per_job = int(args.memory_per_job * (1 << 30))
+    failed = run(args.script, args.retries, args.processes, memory_per_job)
+    for simulator_id in failed:
+        print(f"Failed: m5out/{simulator_id}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,177 @@
+"""Simulate the region of interest of a workload, i.e., the part between its
+gem5 work begin and work end annotations.
+
+What gem5's default work begin and work end handlers do depends on the
+version of gem5 (e.g., some only reset the stats at the work begin), and so
+does the number of stats dumps of a run. The simulators of this module have
+their own handlers, so a run that reaches the end of the region of interest
+always has `NUM_DUMPS` dumps in its `stats.txt`:
+
+0. from the start of the simulation to the region of interest,
+1. the region of interest (`ROI_DUMP`),
+2. from the end of the region of interest to the end of the simulation.
+
+`create_roi_simulator` simulates the whole workload.
+`create_fast_forward_simulator` runs the board up to the region of interest
+on a simple core and only simulates a window of it on the detailed core,
+which is its region of interest. The processor of the board must have a
+`switch_to_detailed()` method, e.g., `FastForwardOutOfOrderCPU` or
+`FastForwardPipelinedCPU`.
+
+The scripts and components of the assignments import this module like this:
+
+```python
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "util"))
+import roi
+
+simulator = roi.create_roi_simulator(board, id=...)
+```
+
+`read_roi_dumps` and `get_roi_dump` read the dumps of such a run back, and
+raise an error for a `stats.txt` with any other number of dumps instead of
+guessing which dump is the region of interest.
+
+This module only needs gem5 for the functions that create simulators.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+NUM_DUMPS = 3
+ROI_DUMP = 1
+
+BEGIN_MARKER = "---------- Begin Simulation Statistics ----------"
+
+
+def read_roi_dumps(stats_file):
+    """Return the text of the `NUM_DUMPS` stats dumps of `stats_file`.
+
+    :raises ValueError: if it has another number of dumps, e.g., because the
+    simulation did not finish or did not use the handlers of this module.
+    """
+    with open(stats_file) as stats:
+        dumps = stats.read().split(BEGIN_MARKER)[1:]
+    if len(dumps) != NUM_DUMPS:
+        raise ValueError(
+            f"{stats_file} has {len(dumps)} stats dumps instead of "
+            f"{NUM_DUMPS}. Either the simulation did not finish, or it did "
+            "not use the work begin and work end handlers of util/roi.py. "
+            f"Delete {Path(stats_file).parent} to run it again."
+        )
+    return dumps
+
+
+def get_roi_dump(stats_file):
+    """Return the text of the stats dump of the region of interest of
+    `stats_file` (see `read_roi_dumps`).
+    """
+    return read_roi_dumps(stats_file)[ROI_DUMP]
+
+
+def get_roi_handlers():
+    """Return the work begin and work end handlers, which dump and reset the
+    stats at both ends of the region of interest, for the `on_exit_event` of
+    a `Simulator`.
+    """
+    from gem5.simulate.exit_event import ExitEvent
+
+    import m5
+
+    def workbegin_handler():
+        while True:
+            print("Reached the region of interest")
+            m5.stats.dump()
+            m5.stats.reset()
+            yield False
+
+    def workend_handler():
+        while True:
+            print("At the end of the region of interest")
+            m5.stats.dump()
+            m5.stats.reset()
+            yield False
+
+    return {
+        ExitEvent.WORKBEGIN: workbegin_handler(),
+        ExitEvent.WORKEND: workend_handler(),
+    }
+
+
+def create_roi_simulator(board, id: Optional[str] = None):
+    """Create a simulator that dumps the stats of the region of interest of
+    the workload of `board` as its second (`ROI_DUMP`) dump.
+
+    :param id: The id of the simulator, as in `Simulator`.
+    """
+    from gem5.simulate.simulator import Simulator
+
+    return Simulator(board=board, on_exit_event=get_roi_handlers(), id=id)
+
+
+def create_fast_forward_simulator(
+    board,
+    detailed_instructions: Optional[int] = None,
+    warmup_instructions: int = 0,
+    id: Optional[str] = None,
+):
+    """Create the simulator of a board with a fast-forwarding processor.
+
+    The board starts on the simple core. At the workload's work begin
+    annotation it switches to the detailed core, optionally warms up its
+    pipeline and branch predictor for `warmup_instructions`, and then
+    simulates `detailed_instructions` before it exits. The first stats dump
+    is the fast-forward, the second (`ROI_DUMP`) is the detailed window, and
+    the last one is whatever ran after it.
+
+    :param detailed_instructions: The number of instructions to simulate on
+    the detailed core, or None to simulate until the work end annotation.
+    :param warmup_instructions: The number of instructions to run on the
+    detailed core before the stats are reset.
+    :param id: The id of the simulator, as in `Simulator`.
+    """
+    from gem5.simulate.exit_event import ExitEvent
+    from gem5.simulate.simulator import Simulator
+
+    import m5
+
+    processor = board.get_processor()
+
+    def workbegin_handler():
+        print("Reached the region of interest. Switching to the detailed core")
+        m5.stats.dump()
+        m5.stats.reset()
+        processor.switch_to_detailed()
+        if warmup_instructions:
+            simulator.schedule_max_insts(warmup_instructions)
+        elif detailed_instructions:
+            simulator.schedule_max_insts(detailed_instructions)
+        yield False
+
+    def max_insts_handler():
+        if warmup_instructions:
+            print(f"Warmed up for {warmup_instructions} instructions")
+            m5.stats.reset()
+            if detailed_instructions:
+                simulator.schedule_max_insts(detailed_instructions)
+            yield False
+        print(f"Simulated {detailed_instructions} instructions. Exiting")
+        m5.stats.dump()
+        m5.stats.reset()
+        yield True
+
+    def workend_handler():
+        print("At workend. Exiting")
+        m5.stats.dump()
+        m5.stats.reset()
+        yield True
+
+    simulator = Simulator(
+        board=board,
+        on_exit_event={
+            ExitEvent.WORKBEGIN: workbegin_handler(),
+            ExitEvent.MAX_INSTS: max_insts_handler(),
+            ExitEvent.WORKEND: workend_handler(),
+        },
+        id=id,
+    )
+    return simulator
@@ -0,0 +1,84 @@
+"""Tests of `gem5stats.py`. Run them with `python -m pytest util`."""
+
+import math
+
+import numpy as np
+
+import gem5stats
+
+STATS = """
+---------- Begin Simulation Statistics ----------
+simSeconds                                   0.000100                       # Number of seconds simulated (Second)
+board.processor.cores.core.ipc               inf                            # IPC: instructions per cycle ((Count/Cycle))
+board.processor.cores.core.cpi               nan                            # CPI: cycles per instruction ((Cycle/Count))
+board.processor.cores.core.numCycles         1000                           # Number of cpu cycles simulated (Cycle)
+---------- End Simulation Statistics   ----------
+
+---------- Begin Simulation Statistics ----------
+simSeconds                                   0.000200                       # Number of seconds simulated (Second)
+board.processor.cores.core.numCycles         2000                           # Number of cpu cycles simulated (Cycle)
+---------- End Simulation Statistics   ----------
+"""
+
+
+def write_run(outdir, run_id):
+    run = outdir / run_id
+    run.mkdir(parents=True)
+    (run / "stats.txt").write_text(STATS)
+
+
+def test_parse_stats(tmp_path):
+    write_run(tmp_path, "run")
+    dumps = gem5stats.parse_stats(tmp_path / "run" / "stats.txt")
+    assert len(dumps) == 2
+    names, values = dumps[0]
+    assert names == [
+        "simSeconds",
+        "board.processor.cores.core.ipc",
+        "board.processor.cores.core.cpi",
+        "board.processor.cores.core.numCycles",
+    ]
+    assert values[1] == math.inf
+    assert np.isnan(values[2])
+    assert dumps[1][0] == [
+        "simSeconds",
+        "board.processor.cores.core.numCycles",
+    ]
+
+
+def test_query_inf(tmp_path):
+    write_run(tmp_path / "m5out", "run")
+    store = gem5stats.StatsStore(tmp_path / "store")
+    store.ingest(tmp_path / "m5out", processes=1)
+    rows, columns = store.query("board.*")
+    assert [(row["id"], row["dump"]) for row in rows] == [
+        ("run", 0),
+        ("run", 1),
+    ]
+    ipc = columns["board.processor.cores.core.ipc"]
+    assert [gem5stats.format_value(value) for value in ipc] == ["inf", "-"]
+    cycles = columns["board.processor.cores.core.numCycles"]
+    assert [gem5stats.format_value(value) for value in cycles] == [
+        "1000",
+        "2000",
+    ]
+
+
+def test_ingest_keeps_other_outdirs(tmp_path):
+    write_run(tmp_path / "first", "run")
+    write_run(tmp_path / "second", "run")
+    store = gem5stats.StatsStore(tmp_path / "store")
+    store.ingest(tmp_path / "first", processes=1)
+    store.ingest(tmp_path / "second", processes=1)
+    assert len(store.rows) == 4
+    rows, _ = store.query("simSeconds", dump=-1)
+    assert len(rows) == 2
+
+
+def test_ingest_relative_and_absolute(tmp_path, monkeypatch):
+    write_run(tmp_path / "m5out", "run")
+    monkeypatch.chdir(tmp_path)
+    store = gem5stats.StatsStore(tmp_path / "store")
+    assert store.ingest("m5out", processes=1) == 1
+    assert store.ingest(tmp_path / "m5out", processes=1) == 0
+    assert len(store.rows) == 2
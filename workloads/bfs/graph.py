@@ -1,15 +1,87 @@
 import argparse
+import sys
+import tempfile
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from datagen import add_format_argument, write_array
 
 
 def get_inputs():
     argparser = argparse.ArgumentParser()
     argparser.add_argument("graph_name", type=str)
+    argparser.add_argument(
+        "--stream",
+        action="store_true",
+        default=False,
+        help="Parse the edge list in chunks with bounded memory. Edges do "
+        "not need to be sorted by source in this mode.",
+    )
+    argparser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1 << 20,
+        help="Number of edges to parse at a time in --stream mode.",
+    )
+    add_format_argument(argparser)
     args = argparser.parse_args()
-    return args.graph_name
+    return args
 
 
-if __name__ == "__main__":
-    graph_name = get_inputs()
+def read_edge_chunks(graph_name, chunk_size):
+    """Yield the (src, dst) columns of the edge list, chunk_size edges at a
+    time. Lines starting with `#` (e.g., SNAP headers) are skipped.
+    """
+    with open(graph_name, "r") as graph:
+        while True:
+            lines = list(islice(graph, chunk_size))
+            if not lines:
+                return
+            edges = np.loadtxt(
+                lines, dtype=np.int64, usecols=(0, 1), comments="#", ndmin=2
+            )
+            if edges.size:
+                yield edges[:, 0], edges[:, 1]
+
+
+def count_degrees(graph_name, chunk_size):
+    """First pass: count the out-degree of every vertex.
+
+    The number of vertices is one more than the largest vertex id seen as
+    either a source or a destination.
+    """
+    degrees = np.zeros(0, dtype=np.int64)
+    max_vertex = -1
+    for src, dst in read_edge_chunks(graph_name, chunk_size):
+        chunk_degrees = np.bincount(src)
+        if len(chunk_degrees) > len(degrees):
+            degrees = np.pad(degrees, (0, len(chunk_degrees) - len(degrees)))
+        degrees[: len(chunk_degrees)] += chunk_degrees
+        max_vertex = max(max_vertex, int(src.max()), int(dst.max()))
+    return np.pad(degrees, (0, max_vertex + 1 - len(degrees)))
+
+
+def fill_edges(graph_name, chunk_size, columns, edges):
+    """Second pass: bucket every destination into its source's CSR slot.
+
+    Edges from the same source keep the order they have in the input, so a
+    sorted edge list produces the same CSR as the non-streaming path.
+    """
+    cursor = columns[:-1].copy()
+    for src, dst in read_edge_chunks(graph_name, chunk_size):
+        order = np.argsort(src, kind="stable")
+        src = src[order]
+        starts = np.flatnonzero(np.r_[True, src[1:] != src[:-1]])
+        run_lengths = np.diff(np.r_[starts, len(src)])
+        rank = np.arange(len(src)) - np.repeat(starts, run_lengths)
+        edges[cursor[src] + rank] = dst[order]
+        cursor[src[starts]] += run_lengths
+
+
+def convert(graph_name, output_format):
     columns = []
     edges = []
     with open(graph_name, "r") as graph:
@@ -31,49 +103,77 @@ if __name__ == "__main__":
             columns.append(prefix_sum)
     columns.append(len(edges))
 
-    lines = [f"int columns [{len(columns)}] = {{ \n"]
+    with open("graph.h", "w") as header_file:
+        header_file.write("#ifndef __BFS_GRAPH_H__\n")
+        header_file.write("#define __BFS__GRAPH_H__\n")
+        header_file.write("\n")
+        header_file.write(f"int visited [{len(columns) - 1}] = {{0}};\n")
+        header_file.write("\n")
+        write_array(
+            header_file,
+            "int",
+            "columns",
+            len(columns),
+            np.array(columns),
+            output_format,
+        )
+        write_array(
+            header_file,
+            "int",
+            "edges",
+            len(edges),
+            np.array(edges),
+            output_format,
+        )
+        header_file.write("#endif // __BFS_GRAPH_H__\n")
 
-    line = ""
-    for column in columns:
-        if line == "":
-            line = f"{column}"
-        else:
-            line += f", {column}"
-        if len(line) > 80:
-            line += ", \n"
-            lines.append(line)
-            line = ""
-    if line != "":
-        line += " \n"
-        lines.append(line)
-    lines.append("}; \n")
-    lines.append("\n")
-
-    lines.append(f"int edges [{len(edges)}] = {{ \n")
-    line = ""
-    for edge in edges:
-        if line == "":
-            line = f"{edge}"
+
+def convert_streaming(graph_name, chunk_size, output_format):
+    degrees = count_degrees(graph_name, chunk_size)
+    columns = np.zeros(len(degrees) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=columns[1:])
+    del degrees
+    num_edges = int(columns[-1])
+    if len(columns) > np.iinfo(np.int32).max:
+        raise ValueError("Graph has too many vertices for `int` indices")
+    if num_edges > np.iinfo(np.int32).max:
+        raise ValueError("Graph has too many edges for `int` indices")
+
+    # The edges are bucketed into a file-backed array so only the per-vertex
+    # arrays have to fit in memory.
+    with tempfile.TemporaryFile() as scratch:
+        if num_edges == 0:
+            edges = np.zeros(0, dtype=np.int32)
         else:
-            line += f", {edge}"
-        if len(line) > 80:
-            line += ", \n"
-            lines.append(line)
-            line = ""
-    if line != "":
-        line += " \n"
-        lines.append(line)
-    lines.append("}; \n")
-    lines.append("\n")
-    lines.append("#endif // __BFS_GRAPH_H__\n")
-
-    lines = [
-        "#ifndef __BFS_GRAPH_H__\n",
-        "#define __BFS__GRAPH_H__\n",
-        "\n",
-        f"int visited [{len(columns) - 1}] = {{0}};\n",
-        "\n",
-    ] + lines
+            edges = np.memmap(
+                scratch, dtype=np.int32, mode="w+", shape=(num_edges,)
+            )
+        fill_edges(graph_name, chunk_size, columns, edges)
 
-    with open("graph.h", "w") as header_file:
-        header_file.writelines(lines)
+        with open("graph.h", "w") as header_file:
+            header_file.write("#ifndef __BFS_GRAPH_H__\n")
+            header_file.write("#define __BFS__GRAPH_H__\n")
+            header_file.write("\n")
+            header_file.write(f"int visited [{len(columns) - 1}] = {{0}};\n")
+            header_file.write("\n")
+            write_array(
+                header_file,
+                "int",
+                "columns",
+                len(columns),
+                columns,
+                output_format,
+            )
+            write_array(
+                header_file, "int", "edges", num_edges, edges, output_format
+            )
+            header_file.write("#endif // __BFS_GRAPH_H__\n")
+        del edges
+
+
+if __name__ == "__main__":
+    args = get_inputs()
+    if args.stream:
+        convert_streaming(args.graph_name, args.chunk_size, args.format)
+    else:
+        convert(args.graph_name, args.format)
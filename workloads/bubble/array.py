@@ -1,45 +1,58 @@
 import argparse
-from numpy.random import randint
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from datagen import (
+    add_format_argument,
+    add_seed_arguments,
+    generate_cached,
+    get_rng,
+    write_array,
+)
 
 
 def get_inputs():
     argparser = argparse.ArgumentParser()
     argparser.add_argument("array_size", type=int)
+    add_format_argument(argparser)
+    add_seed_arguments(argparser)
     args = argparser.parse_args()
-    return args.array_size
+    return args
+
+
+def generate(output_dir, array_size, seed, output_format):
+    rng = get_rng(seed)
+    array = rng.integers(low=-100000000, high=1000000000, size=array_size)
+
+    with open(Path(output_dir) / "array.h", "w") as header_file:
+        header_file.write("#ifndef __BUBBLE_ARRAY_H__\n")
+        header_file.write("#define __BUBBLE_ARRAY_H__\n")
+        header_file.write("\n")
+        header_file.write(f"#define ARRAY_SIZE {array_size}\n")
+        header_file.write("\n")
+        write_array(
+            header_file, "int", "data", "ARRAY_SIZE", array, output_format
+        )
+        header_file.write("#endif // __BUBBLE_ARRAY_H__\n")
 
 
 if __name__ == "__main__":
-    array_size = get_inputs()
-
-    array = randint(low=-100000000, high=1000000000, size=array_size)
-
-    lines = ["int data [ARRAY_SIZE] = { \n"]
-    line = ""
-    for element in array:
-        if line == "":
-            line = f"{element}"
-        else:
-            line += f", {element}"
-        if len(line) > 80:
-            line += ", \n"
-            lines.append(line)
-            line = ""
-    if line != "":
-        line += " \n"
-        lines.append(line)
-    lines.append("}; \n")
-    lines.append("\n")
-
-    lines.append("#endif // __BUBBLE_ARRAY_H__\n")
-
-    lines = [
-        "#ifndef __BUBBLE_ARRAY_H__\n",
-        "#define __BUBBLE_ARRAY_H__\n",
-        "\n",
-        f"#define ARRAY_SIZE {array_size}\n",
-        "\n",
-    ] + lines
-
-    with open("array.h", "w") as header_file:
-        header_file.writelines(lines)
+    args = get_inputs()
+
+    if args.seed is None:
+        generate(".", args.array_size, None, args.format)
+    else:
+        generate_cached(
+            args.cache_dir,
+            ".",
+            {
+                "generator": "bubble/array.py",
+                "size": args.array_size,
+                "seed": args.seed,
+                "format": args.format,
+            },
+            lambda output_dir: generate(
+                output_dir, args.array_size, args.seed, args.format
+            ),
+        )
@@ -0,0 +1,251 @@
+"""Output backends shared by the workload dataset generators.
+
+`bfs/graph.py`, `bubble/array.py`, and `matmul/matrix.py` all emit C arrays
+into a header file. Two formats are supported:
+
+- `header` (default): the array is written as a C initializer list in the
+  header itself.
+- `binary`: the raw array is written to a `.bin` blob next to the header and
+  the header only contains a small `.incbin` stub that pulls the blob into
+  the `.data` section at assembly time. The compiler never has to parse the
+  data, which makes both generation and `make` fast for large datasets.
+
+The blob is referenced by its file name, so the workload has to be built from
+the directory that contains the header (which is what the Makefiles do).
+
+Randomly generated datasets can also be seeded and cached. Generated files are
+stored in a content-addressed cache keyed on the generator, its size, the
+seed, and the output format. Re-running a generator with the same parameters
+only compares hashes and leaves up-to-date files (and their timestamps)
+untouched, so the workload is not rebuilt.
+"""
+
+import hashlib
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+FORMATS = ["header", "binary"]
+
+# Element types of the generated arrays. All of our targets are little endian.
+DTYPES = {
+    "int": np.dtype("<i4"),
+    "double": np.dtype("<f8"),
+}
+
+CHUNK_SIZE = 1 << 16
+
+# Bump this when the generated output changes for the same parameters so that
+# stale cache entries are not reused.
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".datagen-cache"
+
+
+def add_format_argument(argparser):
+    argparser.add_argument(
+        "--format",
+        type=str,
+        default="header",
+        choices=FORMATS,
+        help="How to emit the arrays. `header` writes C initializers, "
+        "`binary` writes .bin blobs that the header pulls in with .incbin.",
+    )
+
+
+def add_seed_arguments(argparser):
+    argparser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed for the random number generator. Seeded runs are cached, "
+        "so re-running with the same parameters is a no-op.",
+    )
+    argparser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory that holds the cached datasets.",
+    )
+
+
+def get_rng(seed):
+    """Return a NumPy Generator for `seed`. Without a seed, a fresh one is
+    drawn and printed so the run can be reproduced later.
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+        print(f"No seed given. Using --seed {seed}")
+    return np.random.default_rng(seed)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as data:
+        for block in iter(lambda: data.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def generate_cached(cache_dir, output_dir, parameters, generate):
+    """Produce the output of `generate` in `output_dir` through the cache.
+
+    :param parameters: everything that determines the output, e.g., the
+    generator name, its size, the seed, and the output format.
+    :param generate: a callable that writes its files into the directory it
+    is passed.
+    """
+    key = hashlib.sha256(
+        json.dumps(
+            dict(parameters, cache_version=CACHE_VERSION), sort_keys=True
+        ).encode()
+    ).hexdigest()
+    entry = Path(cache_dir) / key
+    manifest_path = entry / "manifest.json"
+
+    if not manifest_path.exists():
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=cache_dir))
+        try:
+            generate(staging)
+            manifest = {
+                "parameters": parameters,
+                "files": {
+                    path.name: hash_file(path)
+                    for path in sorted(staging.iterdir())
+                },
+            }
+            with open(staging / "manifest.json", "w") as manifest_file:
+                json.dump(manifest, manifest_file, indent=4)
+            staging.rename(entry)
+        except OSError:
+            # Another generator filled this entry concurrently.
+            if not manifest_path.exists():
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    for name, digest in manifest["files"].items():
+        destination = Path(output_dir) / name
+        if destination.exists() and hash_file(destination) == digest:
+            print(f"{destination} is up to date")
+            continue
+        shutil.copyfile(entry / name, destination)
+        print(f"Wrote {destination}")
+
+
+def format_values(values):
+    """Format a chunk of values exactly like `f"{value}"` would.
+
+    :return: the list of formatted values and a NumPy array of their lengths.
+    """
+    if values.dtype.kind == "f":
+        # Generated floating point data is rounded, so there are only a
+        # handful of distinct values to format in each chunk.
+        unique, inverse = np.unique(values, return_inverse=True)
+        unique_strings = np.array(list(map(str, unique.tolist())), dtype=object)
+        unique_widths = np.array([len(string) for string in unique_strings])
+        return unique_strings[inverse].tolist(), unique_widths[inverse]
+    strings = list(map(str, values.tolist()))
+    widths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+    return strings, widths
+
+
+def write_text_array(header_file, ctype, name, length, values):
+    """Write `values` as a C initializer list wrapped at 80 columns.
+
+    A line is broken after the first element that makes it longer than 80
+    characters. The values are formatted and wrapped a chunk at a time, and
+    the elements of the last unfinished line of a chunk are carried over to
+    the next one.
+    """
+    header_file.write(f"{ctype} {name} [{length}] = {{ \n")
+    pending_strings = []
+    pending_widths = np.zeros(0, dtype=np.int64)
+    for start in range(0, len(values), CHUNK_SIZE):
+        strings, widths = format_values(
+            np.asarray(values[start : start + CHUNK_SIZE])
+        )
+        strings = pending_strings + strings
+        widths = np.concatenate([pending_widths, widths])
+
+        # offsets[i] is the length of the first i elements, each followed by
+        # ", ". The line starting at element s ends after element e - 1 where
+        # e is the first index with offsets[e] - offsets[s] - 2 > 80.
+        offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+        np.cumsum(widths + 2, out=offsets[1:])
+        line_ends = np.searchsorted(
+            offsets, offsets[:-1] + 82, side="right"
+        ).tolist()
+
+        # Joining with ", " and starting every line after the first with a
+        # newline produces the same text as terminating each line with
+        # ", \n".
+        num_strings = len(strings)
+        line_start = 0
+        while (
+            line_start < num_strings and line_ends[line_start] <= num_strings
+        ):
+            if line_start != 0:
+                strings[line_start] = "\n" + strings[line_start]
+            line_start = line_ends[line_start]
+        if line_start != 0:
+            header_file.write(", ".join(strings[:line_start]) + ", \n")
+
+        pending_strings = strings[line_start:]
+        pending_widths = widths[line_start:]
+    if pending_strings:
+        header_file.write(", ".join(pending_strings) + " \n")
+    header_file.write("}; \n")
+    header_file.write("\n")
+
+
+def get_blob_path(header_file, name):
+    header_path = Path(header_file.name)
+    return header_path.with_name(f"{header_path.stem}_{name}.bin")
+
+
+def write_binary_array(header_file, ctype, name, length, values):
+    """Write `values` to a blob and declare the array in the header with an
+    `.incbin` directive.
+    """
+    dtype = DTYPES[ctype]
+    blob_path = get_blob_path(header_file, name)
+    with open(blob_path, "wb") as blob:
+        for start in range(0, len(values), CHUNK_SIZE):
+            blob.write(
+                np.asarray(values[start : start + CHUNK_SIZE], dtype=dtype)
+                .tobytes()
+            )
+
+    header_file.write(f"extern {ctype} {name} [{length}];\n")
+    header_file.write("__asm__(\n")
+    header_file.write('    ".pushsection .data\\n"\n')
+    header_file.write(f'    ".balign {dtype.itemsize}\\n"\n')
+    header_file.write(f'    ".globl {name}\\n"\n')
+    header_file.write(f'    ".type {name}, %object\\n"\n')
+    header_file.write(f'    "{name}:\\n"\n')
+    header_file.write(f'    ".incbin \\"{blob_path.name}\\"\\n"\n')
+    header_file.write(f'    ".size {name}, . - {name}\\n"\n')
+    header_file.write('    ".popsection\\n"\n')
+    header_file.write(");\n")
+    header_file.write("\n")
+
+
+def write_array(header_file, ctype, name, length, values, output_format):
+    """Emit the array `name` of C type `ctype` in the requested format.
+
+    :param length: the array length as it should appear in the declaration,
+    e.g., a number or a macro such as `ARRAY_SIZE`.
+    """
+    if output_format == "header":
+        write_text_array(header_file, ctype, name, length, values)
+    elif output_format == "binary":
+        write_binary_array(header_file, ctype, name, length, values)
+    else:
+        raise ValueError(f"Unknown output format: {output_format}")
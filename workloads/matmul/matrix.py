@@ -1,65 +1,67 @@
 import argparse
-from numpy.random import uniform
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from datagen import (
+    add_format_argument,
+    add_seed_arguments,
+    generate_cached,
+    get_rng,
+    write_array,
+)
 
 
 def get_inputs():
     argparser = argparse.ArgumentParser()
     argparser.add_argument("mat_size", type=int)
+    add_format_argument(argparser)
+    add_seed_arguments(argparser)
     args = argparser.parse_args()
-    return args.mat_size
+    return args
 
 
-if __name__ == "__main__":
-    mat_size = get_inputs()
-    matrix_a = uniform(0.0, 1.0, mat_size * mat_size)
-    matrix_b = uniform(0.0, 1.0, mat_size * mat_size)
+def generate(output_dir, mat_size, seed, output_format):
+    rng = get_rng(seed)
+    matrix_a, matrix_b = np.round(
+        rng.uniform(0.0, 1.0, (2, mat_size * mat_size)), 2
+    )
 
-    lines = ["double A [NUM_ELEMENTS] = { \n"]
-    line = ""
-    for element in matrix_a:
-        printable = round(element, 2)
-        if line == "":
-            line = f"{printable}"
-        else:
-            line += f", {printable}"
-        if len(line) > 80:
-            line += ", \n"
-            lines.append(line)
-            line = ""
-    if line != "":
-        line += " \n"
-        lines.append(line)
-    lines.append("}; \n")
-    lines.append("\n")
+    with open(Path(output_dir) / "matrix.h", "w") as header_file:
+        header_file.write("#ifndef __MATMUL_MATRIX_H__\n")
+        header_file.write("#define __MATMUL_MATRIX_H__\n")
+        header_file.write("\n")
+        header_file.write(f"#define SIZE {mat_size}\n")
+        header_file.write(f"#define NUM_ELEMENTS {mat_size*mat_size}\n")
+        header_file.write(f"double C [NUM_ELEMENTS] = {{0}};\n")
+        header_file.write("\n")
+        write_array(
+            header_file, "double", "A", "NUM_ELEMENTS", matrix_a, output_format
+        )
+        write_array(
+            header_file, "double", "B", "NUM_ELEMENTS", matrix_b, output_format
+        )
+        header_file.write("#endif // __MATMUL_MATRIX_H__\n")
 
-    lines.append("double B [NUM_ELEMENTS] = { \n")
-    line = ""
-    for element in matrix_b:
-        printable = round(element, 2)
-        if line == "":
-            line = f"{printable}"
-        else:
-            line += f", {printable}"
-        if len(line) > 80:
-            line += ", \n"
-            lines.append(line)
-            line = ""
-    if line != "":
-        line += " \n"
-        lines.append(line)
-    lines.append("}; \n")
-    lines.append("\n")
-    lines.append("#endif // __MATMUL_MATRIX_H__\n")
 
-    lines = [
-        "#ifndef __MATMUL_MATRIX_H__\n",
-        "#define __MATMUL_MATRIX_H__\n",
-        "\n",
-        f"#define SIZE {mat_size}\n",
-        f"#define NUM_ELEMENTS {mat_size*mat_size}",
-        "\n",
-        f"double C [NUM_ELEMENTS] = {{0}};\n",
-        "\n",
-    ] + lines
-    with open("matrix.h", "w") as header_file:
-        header_file.writelines(lines)
+if __name__ == "__main__":
+    args = get_inputs()
+
+    if args.seed is None:
+        generate(".", args.mat_size, None, args.format)
+    else:
+        generate_cached(
+            args.cache_dir,
+            ".",
+            {
+                "generator": "matmul/matrix.py",
+                "size": args.mat_size,
+                "seed": args.seed,
+                "format": args.format,
+            },
+            lambda output_dir: generate(
+                output_dir, args.mat_size, args.seed, args.format
+            ),
+        )